@@ -26,6 +26,13 @@ async function setupPerspective() {
     const orderbook = await websocket.open_table("orderbook");
     console.log("[DEBUG] Opened 'orderbook' table from WebSocket.");
 
+    // Cumulative depth series, precomputed once on the server for every viewer.
+    // Absent when the server runs with DEPTH_CHART_LEVELS=0 or in process mode.
+    const hostedTables = await websocket.get_hosted_table_names();
+    const depthChart = hostedTables.includes("depth_chart")
+      ? await websocket.open_table("depth_chart")
+      : null;
+
     const req = await fetch("layout.json");
     console.log("[DEBUG] layout.json fetched successfully.");
     
@@ -35,6 +42,19 @@ async function setupPerspective() {
     workspace.tables.set("orderbook", orderbook);
     console.log("[DEBUG] orderbook table set in workspace.");
 
+    if (depthChart) {
+      workspace.tables.set("depth_chart", depthChart);
+    } else {
+      // Drop the Depth Chart widget and give its column to the bar chart alone
+      delete layout.viewers.PERSPECTIVE_ORDER_BOOK_DEPTH;
+      const main = layout.detail.main;
+      main.children = main.children.map((child) =>
+        child.type === "split-area"
+          ? child.children.find((area) => !area.widgets?.includes("PERSPECTIVE_ORDER_BOOK_DEPTH"))
+          : child
+      );
+    }
+
     await workspace.restore(layout);
     console.log("[DEBUG] Workspace layout restored.");
     
@@ -0,0 +1,72 @@
+"""
+Compares order book backends on depth diffs: updates/sec through
+`_apply_update` and top-10 read latency.
+
+Usage (from the stream directory):
+    python -m benchmarks.bench_book [--messages recorded.jsonl] [--count 20000]
+"""
+import argparse
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from benchmarks.corpus import corpus_from_args
+from src.binance import BinanceOrderBook
+from src.decoder import DepthUpdate, get_decoder
+
+
+def build_book(backend: str, snapshot: Optional[Dict[str, Any]], tick_size: float) -> BinanceOrderBook:
+    book = BinanceOrderBook(symbol="BTCUSDT", backend=backend, tick_size=tick_size)
+    if snapshot:
+        for price_str, amount_str in snapshot["bids"]:
+            book.bids.set(float(price_str), float(amount_str))
+        for price_str, amount_str in snapshot["asks"]:
+            book.asks.set(float(price_str), float(amount_str))
+    return book
+
+
+def bench_backend(backend: str, snapshot: Optional[Dict[str, Any]], updates: List[DepthUpdate], tick_size: float, reads: int) -> Dict[str, float]:
+    book = build_book(backend, snapshot, tick_size)
+    levels = sum(len(u.bids) + len(u.asks) for u in updates)
+
+    start = time.perf_counter()
+    for update in updates:
+        book._apply_update(update)
+    apply_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(reads):
+        book.get_bids(10)
+        book.get_asks(10)
+    read_seconds = time.perf_counter() - start
+
+    return {
+        "updates_per_sec": len(updates) / apply_seconds,
+        "levels_per_sec": levels / apply_seconds,
+        "top10_read_us": read_seconds / (2 * reads) * 1e6,
+        "bid_levels": len(book.bids),
+        "ask_levels": len(book.asks),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", help="Recorded raw depth messages, one JSON object per line.")
+    parser.add_argument("--count", type=int, default=20000, help="Synthetic diff count when no recording is given.")
+    parser.add_argument("--tick-size", type=float, default=0.01)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    snapshot, messages = corpus_from_args(args.messages, args.count)
+    decoder = get_decoder()
+    updates = [u for u in map(decoder.decode, messages) if u is not None]
+
+    print(f"{len(updates)} diffs, snapshot levels: {len(snapshot['bids']) if snapshot else 0}")
+    print(f"{'backend':<12}{'updates/s':>14}{'levels/s':>14}{'top10 read (us)':>18}{'bids':>8}{'asks':>8}")
+    for backend in ("sorteddict", "array"):
+        r = bench_backend(backend, snapshot, updates, args.tick_size, args.reads)
+        print(f"{backend:<12}{r['updates_per_sec']:>14,.0f}{r['levels_per_sec']:>14,.0f}{r['top10_read_us']:>18.2f}{r['bid_levels']:>8}{r['ask_levels']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Micro-benchmark for depth message decoding: the original per-message
+`json.loads` + int()/float() conversions versus each installed decoder.
+
+Usage (from the stream directory):
+    python -m benchmarks.bench_decoder [--messages recorded.jsonl] [--count 20000]
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+from benchmarks.corpus import corpus_from_args
+from src.decoder import DECODERS
+
+
+def legacy_decode(raw: str):
+    """The pre-decoder path: dict parse, then per-field int()/float() conversions."""
+    msg_data = json.loads(raw)
+    if msg_data.get('e') != 'depthUpdate':
+        return None
+    int(msg_data['U'])
+    int(msg_data['u'])
+    bids = [(float(p), float(q)) for p, q in msg_data.get('b', [])]
+    asks = [(float(p), float(q)) for p, q in msg_data.get('a', [])]
+    return bids, asks
+
+
+def time_decoder(decode: Callable, messages: List, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for raw in messages:
+            decode(raw)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", help="Recorded raw depth messages, one JSON object per line.")
+    parser.add_argument("--count", type=int, default=20000, help="Synthetic diff count when no recording is given.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _, messages = corpus_from_args(args.messages, args.count)
+    encoded = [m.encode() for m in messages] # Websocket frames arrive as str, but bytes is the natural input for msgspec/orjson
+    total_bytes = sum(len(m) for m in encoded)
+    print(f"{len(messages)} messages, {total_bytes / len(messages):.0f} bytes avg")
+    print(f"{'decoder':<16}{'input':<8}{'msgs/s':>14}{'us/msg':>10}{'MB/s':>10}")
+
+    candidates = [("legacy json", "str", legacy_decode, messages)]
+    for name, factory in DECODERS.items():
+        decoder = factory()
+        candidates.append((name, "str", decoder.decode, messages))
+        candidates.append((name, "bytes", decoder.decode, encoded))
+
+    for name, kind, decode, corpus in candidates:
+        seconds = time_decoder(decode, corpus, args.repeat)
+        print(f"{name:<16}{kind:<8}{len(corpus) / seconds:>14,.0f}{seconds / len(corpus) * 1e6:>10.2f}{total_bytes / seconds / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares `orderbook` update formats (see src.columnar.LadderEncoder): cost
+per row of encoding TopChanges and of `table.update()` for row dicts,
+column lists and Arrow IPC, at several ladder depths.
+
+Each publish changes `--changed` of the ladder's levels on both sides
+(1.0 = the whole ladder moved, e.g. after a price jump).
+
+Usage (from the stream directory):
+    python -m benchmarks.bench_publish [--levels 10,100,1000] [--publishes 200] [--changed 1.0]
+"""
+import argparse
+import logging
+import random
+import time
+from typing import Dict, List
+from perspective import Server
+from src.book import TopChanges
+from src.columnar import PUBLISH_FORMATS, LadderEncoder, pyarrow
+from src.perspective_server import ORDER_BOOK_SCHEMA
+
+
+def make_changes(levels: int, publishes: int, changed: float, seed: int = 7) -> List[TopChanges]:
+    rng = random.Random(seed)
+    count = max(1, int(levels * changed))
+    batches = []
+    for _ in range(publishes):
+        bids = sorted(rng.sample(range(levels), count))
+        asks = sorted(rng.sample(range(levels), count))
+        batches.append(TopChanges(
+            [(i, (60000.0 - i * 0.01, rng.uniform(0.001, 5.0))) for i in bids],
+            [(i, (60000.01 + i * 0.01, rng.uniform(0.001, 5.0))) for i in asks],
+            [], []
+        ))
+    return batches
+
+
+def bench_format(fmt: str, levels: int, batches: List[TopChanges]) -> Dict[str, float]:
+    client = Server().new_local_client()
+    table = client.table(ORDER_BOOK_SCHEMA, name=f"orderbook_{fmt}_{levels}", index="depth")
+    encoder = LadderEncoder(levels, fmt)
+    rows = sum(len(c.bids) + len(c.asks) for c in batches)
+    table.update(encoder.encode(batches[0])[0]) # Warm up
+
+    start = time.perf_counter()
+    encoded = [encoder.encode(changes)[0] for changes in batches]
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for data in encoded:
+        table.update(data)
+    update_seconds = time.perf_counter() - start
+    return {
+        "encode_us_per_row": encode_seconds / rows * 1e6,
+        "update_us_per_row": update_seconds / rows * 1e6,
+        "total_us_per_publish": (encode_seconds + update_seconds) / len(batches) * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="10,100,1000", help="Comma-separated ladder depths.")
+    parser.add_argument("--publishes", type=int, default=200)
+    parser.add_argument("--changed", type=float, default=1.0, help="Fraction of levels changed per publish.")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    formats = [f for f in PUBLISH_FORMATS if f != "arrow" or pyarrow is not None]
+    print(f"{args.publishes} publishes per run, {args.changed:.0%} of levels changed per publish")
+    print(f"{'levels':>8}  {'format':<10}{'encode (us/row)':>18}{'update (us/row)':>18}{'total (us/publish)':>21}")
+    for levels in (int(n) for n in args.levels.split(",") if n.strip()):
+        batches = make_changes(levels, args.publishes, args.changed)
+        for fmt in formats:
+            r = bench_format(fmt, levels, batches)
+            print(f"{levels:>8}  {fmt:<10}{r['encode_us_per_row']:>18.2f}{r['update_us_per_row']:>18.2f}{r['total_us_per_publish']:>21,.0f}")
+
+
+if __name__ == "__main__":
+    main()
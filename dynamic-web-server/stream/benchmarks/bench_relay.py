@@ -0,0 +1,221 @@
+"""
+Load test of the relay tier (src.relay.RelayTier): simulated viewers
+against the primary PerspectiveServer directly, then against relays.
+
+The primary publishes a changing top-N ladder to `orderbook` `--rate` times
+a second, plus the publish time to a one-row `bench_clock` table. Each
+viewer behaves like a browser: it re-reads its `orderbook` view on every
+update notification, and it times delivery with a row-mode subscription
+to `bench_clock`. Viewers run in `--viewer-processes` processes so they
+don't become the bottleneck themselves.
+
+Reported per run: delivered updates per viewer per second, publish->viewer
+latency percentiles, and the primary IOLoop's lag (how late a 10 ms timer
+fires), the delay a viewer spike adds to ingestion and publishing.
+
+Usage (from the stream directory):
+    python -m benchmarks.bench_relay [--viewers 50,200] [--relays 0,2,4] [--duration 10] [--rate 20]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing as mp
+import random
+import statistics
+import threading
+import time
+from typing import Any, Dict, List
+import perspective
+import tornado.ioloop
+from tornado.websocket import websocket_connect
+from src.columnar import pyarrow
+from src.perspective_server import PerspectiveServer
+from src.relay import RelayTier
+
+PRIMARY_PORT = 5301
+RELAY_PORT = 5302
+LEVELS = 10
+CLOCK_SCHEMA = {"key": str, "sent": float}
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _viewer(url: str, duration: float, latencies: List[float], counts: List[int]) -> None:
+    ws = await websocket_connect(url, max_message_size=1 << 30)
+
+    async def send(request: bytes) -> None:
+        await ws.write_message(request, binary=True)
+
+    client = perspective.AsyncClient(send)
+
+    async def read() -> None:
+        while True:
+            message = await ws.read_message()
+            if message is None:
+                return
+            await client.handle_response(message)
+
+    reader = asyncio.ensure_future(read())
+    book = await (await client.open_table("orderbook")).view()
+    clock = await (await client.open_table("bench_clock")).view()
+    refresh = asyncio.Event()
+    received = 0
+
+    def on_clock(_port_id: int, delta: bytes) -> None:
+        sent = pyarrow.ipc.open_stream(delta).read_all().column("sent")[0].as_py()
+        latencies.append(time.time() - sent)
+
+    await book.on_update(lambda *_: refresh.set())
+    await clock.on_update(on_clock, mode="row")
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            await asyncio.wait_for(refresh.wait(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            break
+        refresh.clear()
+        await book.to_columns_string() # What a browser does on each notification
+        received += 1
+    counts.append(received)
+    reader.cancel()
+    ws.close()
+
+
+def _run_viewers(url: str, viewers: int, duration: float, start_at: float, results: Any) -> None:
+    """Viewer process: `viewers` concurrent connections for `duration` seconds."""
+    latencies: List[float] = []
+    counts: List[int] = []
+
+    async def main() -> None:
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        outcomes = await asyncio.gather(
+            *(_viewer(url, duration, latencies, counts) for _ in range(viewers)), return_exceptions=True
+        )
+        errors = [o for o in outcomes if isinstance(o, Exception)]
+        if errors:
+            logging.warning(f"{len(errors)} viewers failed, e.g. {errors[0]!r}")
+
+    asyncio.run(main())
+    results.put((latencies, counts))
+
+
+class Primary:
+    """In-process primary: publishes a random-walk ladder and measures its own IOLoop lag."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.server = PerspectiveServer(port=PRIMARY_PORT)
+        self.clock = self.server.add_table("bench_clock", CLOCK_SCHEMA, index="key")
+        self.server.setup_routes()
+        self.server.start()
+        self.loop = self.server.get_loop()
+        self.lags: List[float] = []
+        self._expected = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._publish, name="BenchPublisherThread", daemon=True)
+
+    def _publish(self) -> None:
+        rng = random.Random(3)
+        mid = 60000.0
+        while not self._stop.wait(1.0 / self.rate):
+            mid += rng.uniform(-1, 1)
+            rows = [
+                {"depth": f"{side[0]}{i}", "side": side, "price": mid + (i + 1) * (0.01 if side == "ask" else -0.01), "amount": rng.uniform(0.1, 5)}
+                for side in ("bid", "ask") for i in range(LEVELS)
+            ]
+            sent = time.time()
+            self.loop.add_callback(self._apply, rows, sent)
+
+    def _apply(self, rows: List[Dict[str, Any]], sent: float) -> None:
+        self.server.table.update(rows)
+        self.clock.update([{"key": "clock", "sent": sent}])
+
+    def _tick(self) -> None:
+        now = time.monotonic()
+        if self._expected:
+            self.lags.append(max(0.0, now - self._expected))
+        self._expected = now + 0.01
+
+    def start(self) -> None:
+        self._thread.start()
+        self._timer = tornado.ioloop.PeriodicCallback(self._tick, 10)
+        self.loop.add_callback(self._timer.start)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.loop.add_callback(self._timer.stop)
+
+
+def run(primary: Primary, viewers: int, relays: int, duration: float, viewer_processes: int) -> Dict[str, float]:
+    ctx = mp.get_context("spawn")
+    tier = None
+    url = f"ws://127.0.0.1:{PRIMARY_PORT}/orderbook"
+    if relays:
+        tier = RelayTier(url, processes=relays, port=RELAY_PORT, tables=["orderbook", "bench_clock"])
+        tier.start()
+        url = f"ws://127.0.0.1:{RELAY_PORT}/orderbook"
+        time.sleep(3.0) # Relays connect and take their snapshots
+    results = ctx.Queue()
+    start_at = time.time() + 2.0
+    processes = []
+    per_process = [viewers // viewer_processes + (i < viewers % viewer_processes) for i in range(viewer_processes)]
+    for count in per_process:
+        if count:
+            process = ctx.Process(target=_run_viewers, args=(url, count, duration, start_at, results), daemon=True)
+            process.start()
+            processes.append(process)
+    primary.lags.clear()
+    latencies: List[float] = []
+    counts: List[int] = []
+    for _ in processes:
+        batch_latencies, batch_counts = results.get(timeout=duration + 60)
+        latencies.extend(batch_latencies)
+        counts.extend(batch_counts)
+    lags = list(primary.lags)
+    for process in processes:
+        process.join(timeout=5)
+    if tier:
+        tier.stop()
+    return {
+        "updates_per_viewer_s": statistics.mean(counts) / duration if counts else 0.0,
+        "viewers_ok": len(counts),
+        "latency_p50_ms": percentile(latencies, 0.5) * 1e3,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1e3,
+        "loop_lag_p99_ms": percentile(lags, 0.99) * 1e3,
+        "loop_lag_max_ms": max(lags, default=float("nan")) * 1e3,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", default="50,200", help="Comma-separated viewer counts.")
+    parser.add_argument("--relays", default="0,2", help="Comma-separated relay process counts (0 = viewers on the primary).")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds each viewer stays connected.")
+    parser.add_argument("--rate", type=float, default=20.0, help="Primary publishes per second.")
+    parser.add_argument("--viewer-processes", type=int, default=max(1, mp.cpu_count() // 2))
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    if pyarrow is None:
+        parser.error("pyarrow is required to read the viewers' timing deltas.")
+
+    primary = Primary(args.rate)
+    primary.start()
+    print(f"{args.rate:g} publishes/s, {args.duration:g}s per run, viewers in {args.viewer_processes} processes")
+    print(f"{'viewers':>8}{'relays':>8}{'ok':>6}{'upd/viewer/s':>14}{'p50 ms':>9}{'p99 ms':>9}{'loop lag p99':>14}{'max':>8}")
+    for viewers in (int(n) for n in args.viewers.split(",") if n.strip()):
+        for relays in (int(n) for n in args.relays.split(",") if n.strip()):
+            r = run(primary, viewers, relays, args.duration, args.viewer_processes)
+            print(
+                f"{viewers:>8}{relays:>8}{r['viewers_ok']:>6}{r['updates_per_viewer_s']:>14.1f}{r['latency_p50_ms']:>9.1f}"
+                f"{r['latency_p99_ms']:>9.1f}{r['loop_lag_p99_ms']:>14.1f}{r['loop_lag_max_ms']:>8.1f}"
+            )
+    primary.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Deterministic, network-free benchmarks driven by a recorded depth log:
+
+    1. `_apply_update` throughput: the log replayed at max speed into a fresh
+       BinanceOrderBook per backend.
+    2. The `run_processor` pipeline: the log replayed at `--speed` while
+       run_processor publishes changed top-of-book rows into a real
+       Perspective table; reports publishes, rows and `table.update` cost.
+       (E->publish latency is only meaningful live; recorded E values are old.)
+
+Without `--log`, a synthetic corpus is written to a temporary log first.
+
+Usage (from the stream directory):
+    python -m benchmarks.bench_replay [--log depth.bdrl.gz] [--speed 10] [--backend array]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+from perspective import Server
+from benchmarks.corpus import generate_corpus
+from src.app import run_processor
+from src.binance import BinanceOrderBook
+from src.columnar import PUBLISH_FORMATS, LadderEncoder
+from src.perspective_server import ORDER_BOOK_SCHEMA
+from src.publisher import PublishStats
+from src.replay import RECORD_SNAPSHOT, DepthRecorder, DepthReplayer, read_records
+
+
+def write_synthetic_log(path: str, count: int, interval: float = 0.1) -> None:
+    """Writes a snapshot plus `count` diffs, `interval` seconds apart, as a depth log."""
+    snapshot, messages = generate_corpus(count=count)
+    recorder = DepthRecorder(path)
+    start = 1_700_000_000.0
+    recorder.record_snapshot("BTCUSDT", json.dumps(snapshot), received_at=start)
+    for i, message in enumerate(messages):
+        recorder.record_frame(message, received_at=start + (i + 1) * interval)
+    recorder.close()
+
+
+def fresh_books(path: str, backend: str, tick_size: float) -> Dict[str, BinanceOrderBook]:
+    symbols = {r.symbol for r in read_records(path) if r.kind == RECORD_SNAPSHOT}
+    return {s: BinanceOrderBook(symbol=s, backend=backend, tick_size=tick_size, auto_resync=False) for s in symbols}
+
+
+class _InlineLoop:
+    """Runs IOLoop callbacks immediately on the caller's thread and times them."""
+
+    def __init__(self):
+        self.durations: List[float] = []
+
+    def add_callback(self, callback: Callable[..., Any], *args: Any) -> None:
+        start = time.perf_counter()
+        callback(*args)
+        self.durations.append(time.perf_counter() - start)
+
+
+def bench_apply(path: str, backend: str, tick_size: float) -> None:
+    books = fresh_books(path, backend, tick_size)
+    stats = DepthReplayer(path, speed=None).replay(books)
+    print(f"{backend:<12}{stats.frames:>10}{stats.elapsed_seconds:>12.3f}{stats.frames_per_second:>16,.0f}")
+
+
+def bench_pipeline(
+    path: str,
+    backend: str,
+    tick_size: float,
+    speed: float,
+    levels: int,
+    min_interval: float,
+    max_latency: float,
+    publish_format: str = "rows"
+) -> None:
+    books = fresh_books(path, backend, tick_size)
+    book = next(iter(books.values()))
+    table = Server().new_local_client().table(ORDER_BOOK_SCHEMA, name="orderbook", index="depth")
+    loop = _InlineLoop()
+    stop_event = threading.Event()
+    publish_stats = PublishStats()
+
+    processor = threading.Thread(
+        target=run_processor,
+        args=(book, loop, table, stop_event, levels, min_interval, max_latency, publish_stats),
+        kwargs={"encoder": LadderEncoder(levels, publish_format)},
+        name="DataProcessorThread",
+        daemon=True
+    )
+    processor.start()
+    stats = DepthReplayer(path, speed=speed).replay(books)
+    stop_event.set()
+    processor.join(timeout=5)
+
+    durations = sorted(d * 1e3 for d in loop.durations)
+    print(f"replayed {stats.frames} frames in {stats.elapsed_seconds:.2f}s at {speed}x "
+          f"(max lag {stats.max_lag_seconds * 1e3:.1f}ms)")
+    if not durations:
+        print("no table updates were published")
+        return
+    p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+    summary = publish_stats.summary()
+    print(f"{len(durations)} publishes ({len(durations) / stats.elapsed_seconds:.1f}/s, {summary['rows']} rows, "
+          f"{summary['removed_rows']} removals): "
+          f"median {statistics.median(durations):.3f}ms, p99 {p99:.3f}ms, max {durations[-1]:.3f}ms; "
+          f"table size {table.size()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", help="Depth log written by `python -m src.replay record`.")
+    parser.add_argument("--count", type=int, default=20000, help="Synthetic diff count when no log is given.")
+    parser.add_argument("--tick-size", type=float, default=0.01)
+    parser.add_argument("--speed", type=float, default=20.0, help="Playback multiplier for the pipeline run.")
+    parser.add_argument("--backend", default="sorteddict", help="Backend for the pipeline run.")
+    parser.add_argument("--levels", type=int, default=10)
+    parser.add_argument("--min-interval", type=float, default=0.02)
+    parser.add_argument("--max-latency", type=float, default=0.1)
+    parser.add_argument("--format", default="rows", choices=PUBLISH_FORMATS, help="orderbook update format for the pipeline run.")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    path = args.log
+    tmp_dir = None
+    if not path:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "synthetic.bdrl")
+        write_synthetic_log(path, args.count)
+
+    try:
+        print(f"{'backend':<12}{'frames':>10}{'seconds':>12}{'frames/s':>16}")
+        for backend in ("sorteddict", "array"):
+            bench_apply(path, backend, args.tick_size)
+        print()
+        bench_pipeline(path, args.backend, args.tick_size, args.speed, args.levels, args.min_interval, args.max_latency, args.format)
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
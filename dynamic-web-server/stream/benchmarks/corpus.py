@@ -0,0 +1,69 @@
+"""
+Depth message corpora for the stream benchmarks.
+
+Either loads recorded raw depth messages (one JSON message per line, as
+received from the `@depth` stream) or synthesises a Binance-shaped
+snapshot and diff sequence around a random-walking mid price.
+"""
+import json
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def load_messages(path: str) -> List[str]:
+    """Loads raw depth messages from a newline-delimited JSON file."""
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def generate_corpus(
+    count: int = 20000,
+    levels_per_diff: int = 20,
+    snapshot_levels: int = 1000,
+    mid: float = 60000.0,
+    tick_size: float = 0.01,
+    seed: int = 7
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Generates a REST-style depth snapshot and `count` consecutive depthUpdate
+    messages whose levels cluster near a slowly drifting mid price.
+
+    Returns:
+        Tuple[dict, list]: The snapshot payload and the raw diff messages.
+    """
+    rng = random.Random(seed)
+    decimals = max(0, len(f"{tick_size:f}".rstrip("0").split(".")[1]))
+    last_update_id = 1_000_000
+
+    def level(price: float, remove_probability: float) -> List[str]:
+        amount = 0.0 if rng.random() < remove_probability else rng.uniform(0.001, 5.0)
+        return [f"{price:.{decimals}f}", f"{amount:.8f}"]
+
+    snapshot = {
+        "lastUpdateId": last_update_id,
+        "bids": [level(mid - (i + 1) * tick_size, 0.0) for i in range(snapshot_levels)],
+        "asks": [level(mid + (i + 1) * tick_size, 0.0) for i in range(snapshot_levels)],
+    }
+
+    messages: List[str] = []
+    event_time = 1_700_000_000_000
+    for _ in range(count):
+        mid += rng.gauss(0, 2) * tick_size
+        first_update_id = last_update_id + 1
+        last_update_id += rng.randint(1, levels_per_diff)
+        event_time += 100
+        half = levels_per_diff // 2
+        bids = [level(mid - int(rng.expovariate(1 / 50) + 1) * tick_size, 0.3) for _ in range(half)]
+        asks = [level(mid + int(rng.expovariate(1 / 50) + 1) * tick_size, 0.3) for _ in range(levels_per_diff - half)]
+        messages.append(json.dumps({
+            "e": "depthUpdate", "E": event_time, "s": "BTCUSDT",
+            "U": first_update_id, "u": last_update_id, "b": bids, "a": asks,
+        }))
+    return snapshot, messages
+
+
+def corpus_from_args(path: Optional[str], count: int) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Returns a recorded corpus when `path` is given, else a synthetic one."""
+    if path:
+        return None, load_messages(path)
+    return generate_corpus(count=count)
@@ -0,0 +1,141 @@
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.book import BookSide, LevelChange, LevelListener, Price
+
+
+def analytics_schema(levels: int, bands_bps: Iterable[float]) -> Dict[str, Any]:
+    """Perspective schema for the `analytics` table (one row per symbol)."""
+    schema: Dict[str, Any] = {
+        "symbol": str,
+        "event_time": datetime.datetime,
+        "best_bid": float,
+        "best_ask": float,
+        "mid": float,
+        "spread": float,
+        "microprice": float,
+        f"bid_depth_{levels}": float,
+        f"ask_depth_{levels}": float,
+        f"imbalance_{levels}": float,
+        "bid_depth_total": float,
+        "ask_depth_total": float,
+        "bid_notional_total": float,
+        "ask_notional_total": float,
+        "is_stale": bool,
+    }
+    for bps in bands_bps:
+        schema[f"bid_notional_{bps:g}bps"] = float
+        schema[f"ask_notional_{bps:g}bps"] = float
+    return schema
+
+
+class BookAnalytics(LevelListener):
+    """
+    Running order book aggregates for one BinanceOrderBook.
+
+    Whole-book cumulative depth and notional per side are maintained from
+    the (previous, new) amount of every changed level, so each diff costs
+    O(changed levels) and the totals never need a re-scan. Window metrics
+    (top-N depth and imbalance, microprice, notional within X bps of the
+    touch) only read the levels inside their window, and only when compute()
+    is called by the publisher rather than on every diff.
+    """
+
+    def __init__(self, levels: int = 10, bands_bps: Iterable[float] = (10, 50, 100)):
+        """
+        Args:
+            levels (int): Depth N for top-N depth and imbalance.
+            bands_bps (Iterable[float]): Distances from the best price, in basis
+                points, for the notional-to-move-the-price metrics.
+        """
+        self.levels = levels
+        self.bands_bps: Tuple[float, ...] = tuple(sorted(bands_bps))
+        self.bid_qty = 0.0
+        self.bid_notional = 0.0
+        self.ask_qty = 0.0
+        self.ask_notional = 0.0
+
+    def reset(self, bids: BookSide, asks: BookSide) -> None:
+        """Recomputes the totals from scratch, e.g. after a snapshot replaced the sides."""
+        self.bid_qty = self.bid_notional = self.ask_qty = self.ask_notional = 0.0
+        for price, amount in bids.items():
+            self.bid_qty += amount
+            self.bid_notional += price * amount
+        for price, amount in asks.items():
+            self.ask_qty += amount
+            self.ask_notional += price * amount
+
+    def on_levels(self, bid_changes: List[LevelChange], ask_changes: List[LevelChange]) -> None:
+        qty = notional = 0.0
+        for price, previous, amount in bid_changes:
+            delta = amount - previous
+            qty += delta
+            notional += delta * price
+        self.bid_qty += qty
+        self.bid_notional += notional
+
+        qty = notional = 0.0
+        for price, previous, amount in ask_changes:
+            delta = amount - previous
+            qty += delta
+            notional += delta * price
+        self.ask_qty += qty
+        self.ask_notional += notional
+
+    def _band_notional(self, side: BookSide, best: Price, descending: bool) -> Dict[float, float]:
+        """Notional resting between the best price and each band edge."""
+        bands = self.bands_bps
+        edges = [best * (1 - b / 1e4) if descending else best * (1 + b / 1e4) for b in bands]
+        totals = [0.0] * len(bands)
+        band = 0
+        notional = 0.0
+        # Levels past the widest band's edge are never read
+        for price, amount in side.items_within(edges[-1]):
+            while band < len(bands) and (price < edges[band] if descending else price > edges[band]):
+                totals[band] = notional
+                band += 1
+            if band == len(bands):
+                break
+            notional += price * amount
+        for i in range(band, len(bands)):
+            totals[i] = notional
+        return dict(zip(bands, totals))
+
+    def compute(self, symbol: str, bids: BookSide, asks: BookSide, event_time: Optional[int], is_stale: bool) -> Optional[Dict[str, Any]]:
+        """
+        Builds one `analytics` table row from the current book.
+
+        Returns:
+            dict | None: The row, or None while either side is empty.
+        """
+        best_bid, best_ask = bids.best(), asks.best()
+        if best_bid is None or best_ask is None:
+            return None
+        (bid_price, bid_qty), (ask_price, ask_qty) = best_bid, best_ask
+        n = self.levels
+        bid_depth = sum(amount for _, amount in bids.top(n))
+        ask_depth = sum(amount for _, amount in asks.top(n))
+        depth = bid_depth + ask_depth
+
+        row: Dict[str, Any] = {
+            "symbol": symbol,
+            "event_time": event_time,
+            "best_bid": bid_price,
+            "best_ask": ask_price,
+            "mid": (bid_price + ask_price) / 2,
+            "spread": ask_price - bid_price,
+            # Touch-size-weighted mid: leans towards the side with less resting size
+            "microprice": (bid_price * ask_qty + ask_price * bid_qty) / (bid_qty + ask_qty),
+            f"bid_depth_{n}": bid_depth,
+            f"ask_depth_{n}": ask_depth,
+            f"imbalance_{n}": (bid_depth - ask_depth) / depth if depth else 0.0,
+            "bid_depth_total": self.bid_qty,
+            "ask_depth_total": self.ask_qty,
+            "bid_notional_total": self.bid_notional,
+            "ask_notional_total": self.ask_notional,
+            "is_stale": is_stale,
+        }
+        for bps, notional in self._band_notional(bids, bid_price, descending=True).items():
+            row[f"bid_notional_{bps:g}bps"] = notional
+        for bps, notional in self._band_notional(asks, ask_price, descending=False).items():
+            row[f"ask_notional_{bps:g}bps"] = notional
+        return row
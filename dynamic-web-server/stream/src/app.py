@@ -1,17 +1,505 @@
-import pandas as pd
+import os
+import asyncio
+import datetime
 import threading
-import multiprocessing as mp
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from src.analytics import analytics_schema
 from src.binance import BinanceOrderBook
-from src.perspective_server import PerspectiveServer
+from src.binance_async import AsyncBinanceOrderBook
+from src.book import TopChanges
+from src.buckets import bucket_schema, bucket_table_name
+from src.columnar import LadderEncoder
+from src.candles import candle_schema, interval_label
+from src.depth_chart import DepthChart, depth_chart_schema
+from src.diagnostics import Diagnostics
+from src.history import BookHistories
+from src.manager import OrderBookManager
+from src.metrics import LatencyMetrics
+from src.parquet_sink import ParquetSink
+from src.perspective_server import ORDER_BOOK_SCHEMA, PerspectiveServer
+from src.shared_book import OrderBookProcess
+from src.relay import RelayTier
+from src.publisher import PublishStats, log_publish_stats, wait_for_batch, wait_for_batch_async
+from src.trades import TradeStream
 import logging
 import signal
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(threadName)s - %(levelname)s: %(message)s")
+# Imported modules may have configured logging already; the hot path should not pay for DEBUG records
+logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
-BINANCE_SYMBOL = "BTCUSDT"
+# Every symbol shares one combined stream; the first one is published to the viewer
+BINANCE_SYMBOLS = [s.strip().upper() for s in os.getenv("BINANCE_SYMBOLS", "BTCUSDT").split(",") if s.strip()]
+DISPLAY_SYMBOL = os.getenv("DISPLAY_SYMBOL", BINANCE_SYMBOLS[0]).upper()
 ORDER_BOOK_SNAPSHOT_LIMIT = 1000
+MAX_CONCURRENT_SNAPSHOTS = int(os.getenv("MAX_CONCURRENT_SNAPSHOTS", "4"))
 TOP_N_LEVELS = 10
-UPDATE_INTERVAL_SECONDS = 0.1
+# Bounded book window: levels beyond the best BOOK_MAX_LEVELS per side, or further than
+# BOOK_MAX_DISTANCE_PCT from mid, are trimmed so memory stays flat over long sessions
+BOOK_MAX_LEVELS = int(os.getenv("BOOK_MAX_LEVELS", "5000")) or None
+BOOK_MAX_DISTANCE_PCT = float(os.getenv("BOOK_MAX_DISTANCE_PCT", "0")) or None
+# Warm restarts (threaded and process modes): books are saved to memory-mapped files in
+# BOOK_STORE_DIR every BOOK_PERSIST_SECONDS and resumed on start while the stream still follows on
+BOOK_STORE_DIR = os.getenv("BOOK_STORE_DIR")
+BOOK_PERSIST_SECONDS = float(os.getenv("BOOK_PERSIST_SECONDS", "5"))
+# Second table, `analytics`: microprice, imbalance, cumulative depth and notional within these bands
+ANALYTICS_BANDS_BPS = [float(b) for b in os.getenv("ANALYTICS_BANDS_BPS", "10,50,100").split(",") if b.strip()]
+# One `buckets_<size>` table per width: whole-book depth aggregated into price buckets
+BUCKET_SIZES = [float(b) for b in os.getenv("BUCKET_SIZES", "1,10,100").split(",") if b.strip()]
+# `depth_chart`: cumulative amount/notional by price for the best DEPTH_CHART_LEVELS levels per side,
+# computed once per publish for every viewer; 0 disables. Not in process mode.
+DEPTH_CHART_LEVELS = int(os.getenv("DEPTH_CHART_LEVELS", "100"))
+# Threaded mode also offers every other symbol's top-N as `orderbook_<SYMBOL>`. Those tables are
+# only created once a viewer connects, and dropped again after TABLE_IDLE_SECONDS without one.
+TABLE_IDLE_SECONDS = float(os.getenv("TABLE_IDLE_SECONDS", "300"))
+# Per-viewer flow control: beyond CLIENT_HIGH_WATER_KB of unflushed websocket data a viewer's updates
+# are queued and conflated; it is disconnected once CLIENT_MAX_BUFFER_MB are queued or its oldest
+# queued update is CLIENT_MAX_LAG_SECONDS old (0 disables either cutoff). Stats on GET /clients.
+CLIENT_HIGH_WATER_KB = int(os.getenv("CLIENT_HIGH_WATER_KB", "1024"))
+CLIENT_MAX_BUFFER_MB = int(os.getenv("CLIENT_MAX_BUFFER_MB", "64"))
+CLIENT_MAX_LAG_SECONDS = float(os.getenv("CLIENT_MAX_LAG_SECONDS", "30"))
+# Relay tier: RELAY_PROCESSES processes mirror the tables (RELAY_TABLES, default all) over loopback
+# websockets and serve viewers on the shared RELAY_PORT, keeping browser load off this process; 0 disables.
+RELAY_PROCESSES = int(os.getenv("RELAY_PROCESSES", "0"))
+RELAY_PORT = int(os.getenv("RELAY_PORT", "5002"))
+RELAY_TABLES = [t.strip() for t in os.getenv("RELAY_TABLES", "").split(",") if t.strip()] or None
+# Columnar top-of-book history (best bid/ask, sizes, spread, imbalance) of the last HISTORY_CAPACITY
+# touch changes per symbol, queried by time range on GET /history; 0 disables. Not in process mode.
+HISTORY_CAPACITY = int(os.getenv("HISTORY_CAPACITY", "100000"))
+# Offline capture: published top-N changes, analytics rows and closed candles are written to
+# time-partitioned Parquet files under PARQUET_DIR (unset disables; needs pyarrow). Files rotate
+# every PARQUET_ROTATE_SECONDS or PARQUET_ROTATE_MB; batches beyond PARQUET_QUEUE_SIZE are dropped.
+PARQUET_DIR = os.getenv("PARQUET_DIR")
+PARQUET_ROTATE_SECONDS = float(os.getenv("PARQUET_ROTATE_SECONDS", "3600"))
+PARQUET_ROTATE_MB = int(os.getenv("PARQUET_ROTATE_MB", "128"))
+PARQUET_QUEUE_SIZE = int(os.getenv("PARQUET_QUEUE_SIZE", "10000"))
+PARQUET_FLUSH_SECONDS = float(os.getenv("PARQUET_FLUSH_SECONDS", "5"))
+# OHLCV + VWAP candles from each symbol's trade stream ("aggTrade" or "trade"; empty disables):
+# closed candles append to `candles_<interval>` (the last CANDLE_HISTORY per symbol), in-progress
+# ones are upserted into `candles_live`
+TRADE_STREAM = os.getenv("TRADE_STREAM", "aggTrade")
+CANDLE_INTERVALS = [int(i) for i in os.getenv("CANDLE_INTERVALS", "1,60,300").split(",") if i.strip()]
+CANDLE_HISTORY = int(os.getenv("CANDLE_HISTORY", "1000"))
+# Publishing is event-driven: back-to-back updates are merged into one table update, published
+# no more often than every PUBLISH_MIN_INTERVAL_SECONDS and at most PUBLISH_MAX_LATENCY_SECONDS
+# after the first change it carries (see src.publisher.wait_for_batch).
+PUBLISH_MIN_INTERVAL_SECONDS = float(os.getenv("PUBLISH_MIN_INTERVAL_SECONDS", "0.02"))
+PUBLISH_MAX_LATENCY_SECONDS = float(os.getenv("PUBLISH_MAX_LATENCY_SECONDS", "0.1"))
+PUBLISH_STATS_LOG_SECONDS = 10.0
+# How `orderbook` updates are handed to Perspective: "auto" (Arrow IPC for large batches, column
+# lists for small ones), "arrow" (Arrow IPC from reused buffers), "columns" (dict of column lists)
+# or "rows" (list of row dicts). "auto" and "arrow" need pyarrow; see benchmarks/bench_publish.py
+PUBLISH_FORMAT = os.getenv("PUBLISH_FORMAT", "auto")
+# Table/publisher stats are sampled off the hot path and served on GET /diagnostics; 0 disables
+DIAGNOSTICS_SAMPLE_SECONDS = float(os.getenv("DIAGNOSTICS_SAMPLE_SECONDS", "1.0"))
+# Per-stage, per-symbol latency histograms on GET /metrics (?format=prometheus); 0 disables.
+# In process mode only the publish stages are measured, ingestion runs in the child.
+LATENCY_METRICS = int(os.getenv("LATENCY_METRICS", "1"))
+# "threaded": websocket-client threads + processor thread (default).
+# "async": DISPLAY_SYMBOL's book and the processor run as tasks on the Perspective IOLoop.
+# "process": the books run in a child process that shares DISPLAY_SYMBOL's top-N via shared memory.
+STREAM_MODE = os.getenv("STREAM_MODE", "threaded")
+ASYNC_QUEUE_SIZE = int(os.getenv("ASYNC_QUEUE_SIZE", "1000"))
+ASYNC_OVERFLOW_POLICY = os.getenv("ASYNC_OVERFLOW_POLICY", "resync")
+# Point at `python -m src.fake_exchange` for offline load tests, e.g.
+# BINANCE_WSS_URL=ws://127.0.0.1:9443 BINANCE_API_URL=http://127.0.0.1:9443/api/v3
+BINANCE_WSS_URL = os.getenv("BINANCE_WSS_URL") # Host root; "/ws" or "/stream" is appended
+BINANCE_API_URL = os.getenv("BINANCE_API_URL")
+
+def make_encoder() -> LadderEncoder:
+    """Builds the `orderbook` update encoder for PUBLISH_FORMAT, falling back to "columns" without pyarrow."""
+    try:
+        return LadderEncoder(TOP_N_LEVELS, PUBLISH_FORMAT)
+    except RuntimeError as e:
+        logging.warning(f"{e} Publishing column lists instead.")
+        return LadderEncoder(TOP_N_LEVELS, "columns")
+
+def publish_changes(
+    psp_table,
+    data: Optional[Any],
+    removed: List[str],
+    changes: TopChanges,
+    stats: Optional[PublishStats],
+    metrics: Optional[LatencyMetrics] = None,
+    symbol: str = "",
+    scheduled_at: Optional[float] = None
+) -> None:
+    """
+    Applies a batch of changed rows (row dicts, column lists or Arrow IPC
+    bytes, see LadderEncoder) to the table; runs on the Perspective loop.
+    """
+    started_at = time.time() if metrics is not None else 0.0
+    if removed:
+        psp_table.remove(removed)
+    if data:
+        psp_table.update(data)
+    if stats:
+        stats.record(changes, len(changes.bids) + len(changes.asks), len(removed))
+    if metrics is not None:
+        metrics.record_publish(
+            symbol, changes.last_event_time, changes.last_applied_at, scheduled_at, started_at, time.time(), changes.first_event_time
+        )
+
+def orderbook_history_schema() -> Dict[str, Any]:
+    """Columns of the `orderbook` Parquet dataset: published rows plus their symbol and event time."""
+    return {"depth": str, "side": str, "price": float, "amount": float, "symbol": str, "event_time": datetime.datetime}
+
+def record_changes(
+    sink: ParquetSink,
+    symbol: str,
+    changes: TopChanges,
+    data: Optional[Any],
+    removed: List[str],
+    encoder: LadderEncoder
+) -> None:
+    """
+    Queues a published batch for the `orderbook` dataset, reusing the rows or
+    column lists encoded for the table; removed rows are written with amount 0.
+    """
+    if isinstance(data, (list, dict)):
+        batch = data
+    elif data is not None:
+        # Arrow IPC bytes: the encoder's column lists are cheaper than decoding them again
+        batch = encoder.columns(changes)
+    else:
+        batch = {"depth": [], "side": [], "price": [], "amount": []}
+    if removed:
+        sides = ["bid" if key[0] == "b" else "ask" for key in removed]
+        # New lists: the encoded batch may still be queued for the Perspective loop
+        if isinstance(batch, list):
+            batch = batch + [
+                {"depth": key, "side": side, "price": None, "amount": 0.0} for key, side in zip(removed, sides)
+            ]
+        else:
+            batch = {
+                "depth": batch["depth"] + removed,
+                "side": batch["side"] + sides,
+                "price": batch["price"] + [None] * len(removed),
+                "amount": batch["amount"] + [0.0] * len(removed),
+            }
+    sink.submit("orderbook", batch, {"symbol": symbol, "event_time": changes.last_event_time})
+
+def make_parquet_sink(analytics_columns: Dict[str, Any]) -> Optional[ParquetSink]:
+    """Builds the Parquet sink when PARQUET_DIR is set and pyarrow is available."""
+    if not PARQUET_DIR:
+        return None
+    try:
+        sink = ParquetSink(
+            PARQUET_DIR,
+            max_queue=PARQUET_QUEUE_SIZE,
+            flush_interval=PARQUET_FLUSH_SECONDS,
+            rotate_seconds=PARQUET_ROTATE_SECONDS,
+            rotate_bytes=PARQUET_ROTATE_MB * 1024 * 1024
+        )
+    except RuntimeError as e:
+        logging.warning(f"Parquet capture disabled: {e}")
+        return None
+    sink.add_dataset("orderbook", orderbook_history_schema())
+    sink.add_dataset("analytics", analytics_columns)
+    sink.add_dataset("candles", candle_schema())
+    return sink
+
+def publish_bucket_changes(bucket_tables: Dict[float, Any], bucket_changes: Dict[float, Tuple[List[Dict[str, Any]], List[str]]]) -> None:
+    """Applies changed price buckets to their `buckets_<size>` tables; runs on the Perspective loop."""
+    for size, (rows, removed) in bucket_changes.items():
+        table = bucket_tables[size]
+        if removed:
+            table.remove(removed)
+        if rows:
+            table.update(rows)
+
+def publish_depth_chart(depth_table, columns: Dict[str, List[Any]], removed: List[str]) -> None:
+    """Applies changed `depth_chart` rows; runs on the Perspective loop."""
+    if removed:
+        depth_table.remove(removed)
+    if columns:
+        depth_table.update(columns)
+
+def create_bucket_tables(psp_server: PerspectiveServer, sizes: List[float]) -> Dict[float, Any]:
+    """Creates one `buckets_<size>` table per bucket width, indexed on the bucket key."""
+    return {size: psp_server.add_table(bucket_table_name(size), bucket_schema(), index="key") for size in sizes}
+
+def client_limits() -> Dict[str, Any]:
+    """Viewer flow-control settings for PerspectiveServer (the primary's and each relay's)."""
+    return {
+        "client_high_water_bytes": CLIENT_HIGH_WATER_KB * 1024,
+        "client_max_buffer_bytes": CLIENT_MAX_BUFFER_MB * 2**20 or None,
+        "client_max_lag_seconds": CLIENT_MAX_LAG_SECONDS or None,
+    }
+
+def symbol_table_name(symbol: str) -> str:
+    return f"orderbook_{symbol}"
+
+def register_symbol_tables(psp_server: PerspectiveServer, order_books: OrderBookManager, symbols: List[str]) -> None:
+    """
+    Registers a lazy `orderbook_<SYMBOL>` table per symbol. When a table gets
+    its first view it is cleared of rows left from earlier viewers and the
+    book's top-N diff restarts, so the next publish is the full ladder.
+    """
+    def reseed(table, book: BinanceOrderBook) -> None:
+        table.clear()
+        book.reset_top_changes(TOP_N_LEVELS)
+
+    for symbol in symbols:
+        book = order_books.get_book(symbol)
+        psp_server.register_table(
+            symbol_table_name(symbol), ORDER_BOOK_SCHEMA, index="depth", lazy=True,
+            idle_seconds=TABLE_IDLE_SECONDS, on_first_view=lambda table, book=book: reseed(table, book)
+        )
+
+def run_symbol_tables_processor(
+    order_books: OrderBookManager,
+    symbols: List[str],
+    psp_server: PerspectiveServer,
+    stop_event: threading.Event,
+    levels: int,
+    min_interval: float,
+    max_latency: float,
+    fmt: str = "rows"
+):
+    """
+    Publishes each symbol's top-N changes to its `orderbook_<SYMBOL>` table,
+    skipping symbols whose table has no open views (never opened, no longer
+    watched, or dropped while idle), so their books cost nothing here. Like
+    run_processor it waits for updates and coalesces bursts (see
+    wait_for_batch), here across all of the manager's books at once.
+    """
+    logging.info(f"Starting per-symbol table loop for {', '.join(symbols)}.")
+    psp_loop = psp_server.get_loop()
+    encoders = {symbol: LadderEncoder(levels, fmt) for symbol in symbols}
+    last_publish = 0.0
+    while wait_for_batch(order_books, stop_event, min_interval, max_latency, last_publish):
+        for symbol in symbols:
+            name = symbol_table_name(symbol)
+            if not psp_server.has_views(name):
+                continue
+            try:
+                data, removed = encoders[symbol].encode(order_books.get_top_changes(symbol, levels))
+                if data or removed:
+                    psp_loop.add_callback(psp_server.update_table, name, data, removed)
+            except Exception as e:
+                logging.error(f"Error publishing {symbol} order book: {e}", exc_info=False)
+        last_publish = time.monotonic()
+    logging.info("Per-symbol table loop finished.")
+
+def create_candle_tables(psp_server: PerspectiveServer, intervals: List[int], symbols: int) -> Dict[str, Any]:
+    """
+    Creates one append-only `candles_<interval>` table per interval, capped at
+    CANDLE_HISTORY rows per symbol, plus `candles_live` keyed on "<symbol>@<interval>".
+    """
+    tables = {
+        interval_label(i): psp_server.add_table(f"candles_{interval_label(i)}", candle_schema(), limit=CANDLE_HISTORY * symbols)
+        for i in intervals
+    }
+    tables["live"] = psp_server.add_table("candles_live", candle_schema(), index="key")
+    return tables
+
+def publish_candle_changes(candle_tables: Dict[str, Any], closed: Dict[str, List[Dict[str, Any]]], live: List[Dict[str, Any]]) -> None:
+    """Appends closed candles and upserts live ones; runs on the Perspective loop."""
+    for label, rows in closed.items():
+        candle_tables[label].update(rows)
+    if live:
+        candle_tables["live"].update(live)
+
+def run_candle_processor(
+    trade_stream: TradeStream,
+    psp_loop,
+    candle_tables: Dict[str, Any],
+    stop_event: threading.Event,
+    max_latency: float,
+    sink: Optional[ParquetSink] = None
+):
+    """
+    Publishes candle changes at most every `max_latency` seconds while trades
+    flow. Waking on the timeout as well closes candles on the wall clock when
+    a symbol goes quiet.
+    """
+    logging.info("Starting candle processing loop.")
+    while not stop_event.is_set():
+        trade_stream.wait_for_update(timeout=max_latency)
+        if stop_event.is_set():
+            break
+        try:
+            closed, live = trade_stream.get_candle_changes()
+            if closed or live:
+                psp_loop.add_callback(publish_candle_changes, candle_tables, closed, live)
+            if sink is not None:
+                for rows in closed.values():
+                    sink.submit("candles", rows)
+        except Exception as e:
+            logging.error(f"Error publishing candles: {e}", exc_info=False)
+        # Coalesce the trades of the next interval into one publish
+        stop_event.wait(max_latency)
+    logging.info("Candle processing loop finished.")
+
+async def run_async_processor(
+    order_book: AsyncBinanceOrderBook,
+    psp_table,
+    stop_event: threading.Event,
+    levels: int,
+    min_interval: float,
+    max_latency: float,
+    stats: Optional[PublishStats] = None,
+    analytics_table=None,
+    bucket_tables: Optional[Dict[float, Any]] = None,
+    metrics: Optional[LatencyMetrics] = None,
+    sink: Optional[ParquetSink] = None,
+    encoder: Optional[LadderEncoder] = None,
+    depth_table=None,
+    depth_levels: int = 100
+):
+    """
+    Event-loop counterpart of run_processor: waits for the book's update
+    signal and updates the Perspective table directly, since both live on
+    the same loop.
+    """
+    logging.info("Starting async data processing loop.")
+    encoder = encoder or LadderEncoder(levels, "rows")
+    depth_chart = DepthChart(depth_levels) if depth_table is not None else None
+    last_publish = 0.0
+    last_stats_log = time.monotonic()
+    while await wait_for_batch_async(order_book, stop_event, min_interval, max_latency, last_publish):
+        try:
+            changes = order_book.get_top_changes(levels)
+            data, removed = encoder.encode(changes)
+            if data or removed:
+                # Same loop, so `loop_queue` is ~0 and the wait shows up as `coalesce`
+                scheduled_at = time.time() if metrics is not None else None
+                publish_changes(psp_table, data, removed, changes, stats, metrics, order_book.symbol, scheduled_at)
+                last_publish = time.monotonic()
+                if sink is not None:
+                    record_changes(sink, order_book.symbol, changes, data, removed, encoder)
+            if analytics_table is not None:
+                analytics = order_book.get_analytics()
+                if analytics:
+                    analytics_table.update([analytics])
+                    if sink is not None:
+                        sink.submit("analytics", [analytics])
+            if bucket_tables:
+                bucket_changes = order_book.get_bucket_changes()
+                if bucket_changes:
+                    publish_bucket_changes(bucket_tables, bucket_changes)
+            if depth_chart is not None:
+                columns, removed = depth_chart.apply(order_book.get_top_changes(depth_levels, consume_event_times=False))
+                if columns or removed:
+                    publish_depth_chart(depth_table, columns, removed)
+        except Exception as e:
+            logging.error(f"Error processing order book data: {e}", exc_info=False)
+        if stats and time.monotonic() - last_stats_log >= PUBLISH_STATS_LOG_SECONDS:
+            log_publish_stats(stats)
+            last_stats_log = time.monotonic()
+    logging.info("Async data processing loop finished.")
+
+def run_processor(
+    current_order_book: BinanceOrderBook,
+    current_psp_loop,
+    current_psp_table,
+    stop_event: threading.Event,
+    levels: int,
+    min_interval: float,
+    max_latency: float,
+    stats: Optional[PublishStats] = None,
+    analytics_table=None,
+    bucket_tables: Optional[Dict[float, Any]] = None,
+    metrics: Optional[LatencyMetrics] = None,
+    sink: Optional[ParquetSink] = None,
+    encoder: Optional[LadderEncoder] = None,
+    depth_table=None,
+    depth_levels: int = 100
+):
+    """
+    Waits for the order book to signal changes at the top of the book,
+    coalesces bursts (see wait_for_batch) and schedules the changed rows
+    onto the Perspective table via its event loop. Quiet markets cost no
+    wakeups beyond a periodic stop check. When `analytics_table` is given,
+    the book's analytics row is refreshed alongside each publish, and
+    likewise the changed price buckets for each of `bucket_tables`. With
+    `metrics`, the coalesce, loop-queue, table.update and end-to-end stages
+    of each publish are recorded. With `sink`, published changes and
+    analytics rows are also queued for Parquet capture. `encoder` picks the
+    update format (row dicts when None). With `depth_table`, the cumulative
+    depth series of the best `depth_levels` levels is kept current there.
+    (Module level so benchmarks can drive it against replayed books)
+    """
+    thread_name = threading.current_thread().name
+    logging.info(f"Starting data processing loop in thread '{thread_name}'.")
+    encoder = encoder or LadderEncoder(levels, "rows")
+    depth_chart = DepthChart(depth_levels) if depth_table is not None else None
+    last_publish = 0.0
+    last_stats_log = time.monotonic()
+
+    while wait_for_batch(current_order_book, stop_event, min_interval, max_latency, last_publish):
+        try:
+            # Fetch only the top-N rows that changed since the last publish
+            changes = current_order_book.get_top_changes(levels)
+            update_data, removed = encoder.encode(changes)
+
+            if update_data or removed:
+                scheduled_at = time.time() if metrics is not None else None
+                current_psp_loop.add_callback(
+                    publish_changes, current_psp_table, update_data, removed, changes, stats,
+                    metrics, current_order_book.symbol, scheduled_at
+                )
+                last_publish = time.monotonic()
+                if sink is not None:
+                    record_changes(sink, current_order_book.symbol, changes, update_data, removed, encoder)
+
+            # Analytics ride along with each publish; the book keeps them current per diff
+            if analytics_table is not None:
+                analytics = current_order_book.get_analytics()
+                if analytics:
+                    current_psp_loop.add_callback(analytics_table.update, [analytics])
+                    if sink is not None:
+                        sink.submit("analytics", [analytics])
+
+            # Only buckets touched since the last publish; the book adjusts them per diff
+            if bucket_tables:
+                bucket_changes = current_order_book.get_bucket_changes()
+                if bucket_changes:
+                    current_psp_loop.add_callback(publish_bucket_changes, bucket_tables, bucket_changes)
+
+            # Cumulative depth is derived here once, not per viewer; only levels from the shallowest change out are sent
+            if depth_chart is not None:
+                depth_columns, depth_removed = depth_chart.apply(
+                    current_order_book.get_top_changes(depth_levels, consume_event_times=False)
+                )
+                if depth_columns or depth_removed:
+                    current_psp_loop.add_callback(publish_depth_chart, depth_table, depth_columns, depth_removed)
+
+        except Exception as e:
+            if stop_event.is_set():
+                logging.info(f"[{thread_name}] Error during shutdown in processing loop, ignoring: {e}")
+                break
+            else:
+                logging.error(f"[{thread_name}] Error processing order book data: {e}", exc_info=False)
+
+        if stats and time.monotonic() - last_stats_log >= PUBLISH_STATS_LOG_SECONDS:
+            log_publish_stats(stats, f"[{thread_name}] ")
+            last_stats_log = time.monotonic()
+
+    logging.info(f"Data processing loop finished in thread '{thread_name}'.")
+
+def make_diagnostics(psp_table, publish_stats: PublishStats, order_book) -> Optional[Diagnostics]:
+    """Builds the sampled diagnostics subsystem, unless disabled by DIAGNOSTICS_SAMPLE_SECONDS=0."""
+    if DIAGNOSTICS_SAMPLE_SECONDS <= 0:
+        return None
+    return Diagnostics(psp_table, publish_stats, order_book, sample_interval=DIAGNOSTICS_SAMPLE_SECONDS)
+
+def extra_routes(
+    diagnostics: Optional[Diagnostics],
+    metrics: Optional[LatencyMetrics],
+    histories: Optional[BookHistories] = None
+) -> List[Any]:
+    """Tornado routes for the optional /diagnostics, /metrics and /history endpoints."""
+    routes: List[Any] = []
+    if diagnostics:
+        routes.extend(diagnostics.routes())
+    if metrics:
+        routes.extend(metrics.routes())
+    if histories:
+        routes.extend(histories.routes())
+    return routes
 
 def main():
     """
@@ -22,78 +510,26 @@ def main():
     shutdown_event = threading.Event()
     signal.signal(signal.SIGINT, lambda signum, _: (logging.info(f"Received signal {signal.Signals(signum).name}. Initiating shutdown..."), shutdown_event.set()))
 
-    order_book = None
+    order_books = None
+    ingestion = None
+    async_order_book = None
     psp_server = None
     processor_thread = None
-
-    def run_processor(
-        current_order_book: BinanceOrderBook,
-        current_psp_loop,
-        current_psp_table,
-        stop_event: threading.Event,
-        levels: int,
-        interval: float
-    ):
-        """
-        Continuously fetches order book data, formats it, and schedules
-        updates for the Perspective table via its event loop.
-        (Defined inside main to avoid separate top-level function)
-        """
-        thread_name = threading.current_thread().name
-        logging.info(f"Starting data processing loop in thread '{thread_name}'.")
-
-        while not stop_event.is_set():
-            try:
-                if stop_event.is_set(): break
-
-                # Fetch data
-                bids = current_order_book.get_bids(levels)
-                asks = current_order_book.get_asks(levels)
-
-                if bids and asks:
-                    bids_data = [
-                        {"depth": f'b{i}', "side": "bid", "price": price, "amount": amount}
-                        for i, (price, amount) in enumerate(bids)
-                    ]
-                    asks_data = [
-                        {"depth": f'a{i}', "side": "ask", "price": price, "amount": amount}
-                        for i, (price, amount) in enumerate(asks)
-                    ]
-                    update_data = bids_data + asks_data
-
-                    if update_data:
-                        current_psp_loop.add_callback(current_psp_table.update, update_data)
-                        logging.debug(f"[{thread_name}] Scheduled update for {len(update_data)} rows.")
-                    else:
-                        logging.debug(f"[{thread_name}] No data formatted for update.")
-
-                    # ----
-                    logging.info("Inspecting Perspective table contents...")
-                    try:
-                        view = current_psp_table.view()
-                        table_data = view.to_records()
-                        df = pd.DataFrame(table_data)
-                        logging.info(df)
-                        view.delete()
-                    except Exception as e:
-                        logging.error(f"Failed to inspect perspective table: {e}")
-                    # ----
-
-                elif not stop_event.is_set():
-                    logging.warning(f"[{thread_name}] Order book data not available or empty. Retrying...")
-
-            except Exception as e:
-                if stop_event.is_set():
-                    logging.info(f"[{thread_name}] Error during shutdown in processing loop, ignoring: {e}")
-                    break
-                else:
-                    logging.error(f"[{thread_name}] Error processing order book data: {e}", exc_info=False)
-
-            # Wait for the next interval or until shutdown is signaled
-            if stop_event.wait(interval):
-                break
-
-        logging.info(f"Data processing loop finished in thread '{thread_name}'.")
+    symbol_tables_thread = None
+    trade_stream = None
+    candle_thread = None
+    diagnostics = None
+    analytics_table = None
+    bucket_tables = None
+    depth_table = None
+    candle_tables = None
+    relays = None
+    metrics = LatencyMetrics() if LATENCY_METRICS else None
+    publish_stats = PublishStats(metrics)
+    histories = BookHistories(HISTORY_CAPACITY) if HISTORY_CAPACITY > 0 else None
+    sink = make_parquet_sink(analytics_schema(TOP_N_LEVELS, ANALYTICS_BANDS_BPS))
+    if sink:
+        sink.start()
 
     # Function to handle termination signals
     def signal_handler(signum, _):
@@ -104,30 +540,178 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
 
     try:
-        # 1. Initialize Binance Order Book (a thread basically here?)
-        logging.info(f"Initializing BinanceOrderBook for {BINANCE_SYMBOL}...")
-        order_book = BinanceOrderBook(symbol=BINANCE_SYMBOL, snapshot_limit=ORDER_BOOK_SNAPSHOT_LIMIT)
-        order_book.start()
-        logging.info("BinanceOrderBook started.")
-
-        # 2. Start Perspective Server IOLoop in a background thread
-        logging.info("Initializing Perspective server.")
-        psp_server = PerspectiveServer()
-        psp_server.setup_routes()
-        psp_server.start()
-
-        psp_loop = psp_server.get_loop()
-        psp_table = psp_server.get_table()
-
-        # 3. Start the Data Processing Thread (using the nested function)
-        logging.info("Starting data processor thread.")
-        processor_thread = threading.Thread(
-            target=run_processor,
-            args=(order_book, psp_loop, psp_table, shutdown_event, TOP_N_LEVELS, UPDATE_INTERVAL_SECONDS),
-            name="DataProcessorThread",
-            daemon=False
-        )
-        processor_thread.start()
+        if STREAM_MODE == "async":
+            async_order_book = AsyncBinanceOrderBook(
+                symbol=DISPLAY_SYMBOL,
+                snapshot_limit=ORDER_BOOK_SNAPSHOT_LIMIT,
+                max_queue_size=ASYNC_QUEUE_SIZE,
+                overflow=ASYNC_OVERFLOW_POLICY,
+                base_wss_url=f"{BINANCE_WSS_URL}/ws" if BINANCE_WSS_URL else None,
+                base_api_url=BINANCE_API_URL,
+                max_levels=BOOK_MAX_LEVELS,
+                max_distance_pct=BOOK_MAX_DISTANCE_PCT,
+                metrics=metrics
+            )
+
+            # 1. Start Perspective Server IOLoop in a background thread; everything else runs on it
+            logging.info("Initializing Perspective server.")
+            psp_server = PerspectiveServer(**client_limits())
+            psp_table = psp_server.get_table()
+            async_order_book.enable_analytics(TOP_N_LEVELS, ANALYTICS_BANDS_BPS)
+            analytics_table = psp_server.add_table("analytics", analytics_schema(TOP_N_LEVELS, ANALYTICS_BANDS_BPS), index="symbol")
+            async_order_book.enable_buckets(BUCKET_SIZES)
+            if histories:
+                async_order_book.enable_history(histories.for_symbol(DISPLAY_SYMBOL))
+            bucket_tables = create_bucket_tables(psp_server, BUCKET_SIZES)
+            if DEPTH_CHART_LEVELS > 0:
+                depth_table = psp_server.add_table("depth_chart", depth_chart_schema(), index="key")
+            if TRADE_STREAM:
+                candle_tables = create_candle_tables(psp_server, CANDLE_INTERVALS, 1)
+            diagnostics = make_diagnostics(psp_table, publish_stats, async_order_book)
+            psp_server.setup_routes(extra_routes(diagnostics, metrics, histories))
+            psp_server.start()
+
+            psp_loop = psp_server.get_loop()
+
+            # 2. Start the async order book as tasks on the Perspective loop
+            logging.info(f"Starting AsyncBinanceOrderBook for {DISPLAY_SYMBOL}...")
+            asyncio.run_coroutine_threadsafe(async_order_book.start(), psp_loop.asyncio_loop).result(timeout=30)
+            logging.info("AsyncBinanceOrderBook started.")
+
+            # 3. Start the processor coroutine on the same loop
+            asyncio.run_coroutine_threadsafe(
+                run_async_processor(
+                    async_order_book, psp_table, shutdown_event, TOP_N_LEVELS,
+                    PUBLISH_MIN_INTERVAL_SECONDS, PUBLISH_MAX_LATENCY_SECONDS, publish_stats, analytics_table, bucket_tables, metrics, sink, make_encoder(),
+                    depth_table, DEPTH_CHART_LEVELS
+                ),
+                psp_loop.asyncio_loop
+            )
+        else:
+            # 1. Initialize the order books over a single combined Binance stream
+            if STREAM_MODE == "process":
+                logging.info(f"Starting order book ingestion process for {', '.join(BINANCE_SYMBOLS)}...")
+                ingestion = OrderBookProcess(
+                    symbols=BINANCE_SYMBOLS,
+                    display_symbol=DISPLAY_SYMBOL,
+                    levels=TOP_N_LEVELS,
+                    snapshot_limit=ORDER_BOOK_SNAPSHOT_LIMIT,
+                    max_concurrent_snapshots=MAX_CONCURRENT_SNAPSHOTS,
+                    base_wss_url=f"{BINANCE_WSS_URL}/stream" if BINANCE_WSS_URL else None,
+                    base_api_url=BINANCE_API_URL,
+                    max_levels=BOOK_MAX_LEVELS,
+                    max_distance_pct=BOOK_MAX_DISTANCE_PCT,
+                    store_dir=BOOK_STORE_DIR,
+                    persist_interval=BOOK_PERSIST_SECONDS
+                )
+                ingestion.start()
+                # Reads the shared top-of-book; same publisher-facing API as BinanceOrderBook
+                order_book = ingestion.reader
+            else:
+                logging.info(f"Initializing OrderBookManager for {', '.join(BINANCE_SYMBOLS)}...")
+                order_books = OrderBookManager(
+                    symbols=BINANCE_SYMBOLS,
+                    snapshot_limit=ORDER_BOOK_SNAPSHOT_LIMIT,
+                    max_concurrent_snapshots=MAX_CONCURRENT_SNAPSHOTS,
+                    base_wss_url=f"{BINANCE_WSS_URL}/stream" if BINANCE_WSS_URL else None,
+                    base_api_url=BINANCE_API_URL,
+                    max_levels=BOOK_MAX_LEVELS,
+                    max_distance_pct=BOOK_MAX_DISTANCE_PCT,
+                    store_dir=BOOK_STORE_DIR,
+                    persist_interval=BOOK_PERSIST_SECONDS,
+                    metrics=metrics
+                )
+                order_books.start()
+                display_symbol = DISPLAY_SYMBOL
+                if display_symbol not in order_books.books:
+                    # start() drops symbols that never synchronized; show the first one that did
+                    display_symbol = order_books.symbols[0]
+                    logging.error(f"{DISPLAY_SYMBOL} failed to synchronize; displaying {display_symbol} instead.")
+                order_book = order_books.get_book(display_symbol)
+                order_book.enable_analytics(TOP_N_LEVELS, ANALYTICS_BANDS_BPS)
+                order_book.enable_buckets(BUCKET_SIZES)
+                if histories:
+                    for symbol, book in order_books.books.items():
+                        book.enable_history(histories.for_symbol(symbol))
+                logging.info("OrderBookManager started.")
+
+            # 2. Start Perspective Server IOLoop in a background thread
+            logging.info("Initializing Perspective server.")
+            other_symbols = [symbol for symbol in order_books.symbols if symbol != display_symbol] if order_books else []
+            psp_server = PerspectiveServer(**client_limits())
+            psp_table = psp_server.get_table()
+            if order_books:
+                # The shared-memory reader only carries the top-N ladder, so analytics and buckets need the in-process book
+                analytics_table = psp_server.add_table("analytics", analytics_schema(TOP_N_LEVELS, ANALYTICS_BANDS_BPS), index="symbol")
+                bucket_tables = create_bucket_tables(psp_server, BUCKET_SIZES)
+                if DEPTH_CHART_LEVELS > 0:
+                    depth_table = psp_server.add_table("depth_chart", depth_chart_schema(), index="key")
+                register_symbol_tables(psp_server, order_books, other_symbols)
+            if TRADE_STREAM:
+                candle_tables = create_candle_tables(psp_server, CANDLE_INTERVALS, len(BINANCE_SYMBOLS))
+            diagnostics = make_diagnostics(psp_table, publish_stats, order_book)
+            # The shared-memory reader has no full book to record history from
+            psp_server.setup_routes(extra_routes(diagnostics, metrics, histories if order_books else None))
+            psp_server.start()
+
+            psp_loop = psp_server.get_loop()
+
+            # 3. Start the Data Processing Thread
+            logging.info("Starting data processor thread.")
+            processor_thread = threading.Thread(
+                target=run_processor,
+                args=(
+                    order_book, psp_loop, psp_table, shutdown_event, TOP_N_LEVELS,
+                    PUBLISH_MIN_INTERVAL_SECONDS, PUBLISH_MAX_LATENCY_SECONDS, publish_stats, analytics_table, bucket_tables, metrics, sink, make_encoder(),
+                    depth_table, DEPTH_CHART_LEVELS
+                ),
+                name="DataProcessorThread",
+                daemon=False
+            )
+            processor_thread.start()
+
+            if order_books and other_symbols:
+                symbol_tables_thread = threading.Thread(
+                    target=run_symbol_tables_processor,
+                    args=(
+                        order_books, other_symbols, psp_server, shutdown_event, TOP_N_LEVELS,
+                        PUBLISH_MIN_INTERVAL_SECONDS, PUBLISH_MAX_LATENCY_SECONDS, make_encoder().format
+                    ),
+                    name="SymbolTablesThread",
+                    daemon=False
+                )
+                symbol_tables_thread.start()
+
+        if candle_tables:
+            # Independent of the depth pipeline, so the same in every STREAM_MODE
+            trade_stream = TradeStream(
+                [DISPLAY_SYMBOL] if STREAM_MODE == "async" else BINANCE_SYMBOLS,
+                stream=TRADE_STREAM,
+                intervals=CANDLE_INTERVALS,
+                capacity=CANDLE_HISTORY,
+                base_wss_url=f"{BINANCE_WSS_URL}/stream" if BINANCE_WSS_URL else None
+            )
+            trade_stream.start()
+            candle_thread = threading.Thread(
+                target=run_candle_processor,
+                args=(trade_stream, psp_server.get_loop(), candle_tables, shutdown_event, PUBLISH_MAX_LATENCY_SECONDS, sink),
+                name="CandleProcessorThread",
+                daemon=False
+            )
+            candle_thread.start()
+
+        if diagnostics:
+            diagnostics.start()
+
+        if RELAY_PROCESSES > 0:
+            relays = RelayTier(
+                f"ws://127.0.0.1:{psp_server.port}/orderbook",
+                processes=RELAY_PROCESSES,
+                port=RELAY_PORT,
+                tables=RELAY_TABLES,
+                **client_limits()
+            )
+            relays.start()
 
         logging.info("Application started. Press Ctrl+C to exit.")
         while not shutdown_event.is_set():
@@ -143,12 +727,37 @@ def main():
         logging.info("Starting final cleanup...")
         shutdown_event.set() # Ensure event is set for all threads
 
+        if diagnostics:
+            diagnostics.stop()
+
         # Wait for the data processor thread to exit first
         if processor_thread and processor_thread.is_alive():
             logging.info("Waiting for data processor thread to finish...")
             processor_thread.join(timeout=5.0)
             if processor_thread.is_alive(): 
                 logging.warning("Data processor thread timed out.")
+        if symbol_tables_thread and symbol_tables_thread.is_alive():
+            symbol_tables_thread.join(timeout=5.0)
+            if symbol_tables_thread.is_alive():
+                logging.warning("Per-symbol table thread timed out.")
+        if candle_thread and candle_thread.is_alive():
+            candle_thread.join(timeout=5.0)
+            if candle_thread.is_alive():
+                logging.warning("Candle processor thread timed out.")
+        if trade_stream:
+            trade_stream.stop()
+
+        # The async book lives on the Perspective loop, so stop it before the loop goes away
+        if async_order_book and psp_server:
+            logging.info("Stopping async Binance order book...")
+            try:
+                asyncio.run_coroutine_threadsafe(async_order_book.stop(), psp_server.get_loop().asyncio_loop).result(timeout=5.0)
+            except Exception as e:
+                logging.error(f"Error stopping async order book: {e}", exc_info=True)
+
+        # Relays are the primary's clients; stop them before the server goes away
+        if relays:
+            relays.stop()
 
         # Stop the Perspective server thread
         if psp_server:
@@ -159,12 +768,19 @@ def main():
                 logging.error(f"Error calling psp_server.stop(): {e_stop}")
 
         # Stop the order book fetcher
-        logging.info("Stopping Binance order book...")
+        logging.info("Stopping Binance order books...")
         try:
-            order_book.stop()
+            if order_books:
+                order_books.stop()
+            if ingestion:
+                ingestion.stop()
         except Exception as e:
             logging.error(f"Error stopping order book: {e}", exc_info=True)
 
+        # Last, so everything the processors queued is written and the files are closed
+        if sink:
+            sink.stop()
+
         logging.info("Cleanup complete. Main thread exiting.")
 
 if __name__ == "__main__":
@@ -7,17 +7,19 @@ import requests
 import json
 import ssl
 import threading
+import time
 from collections import deque
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Any, Dict, Iterable, List, Tuple, Optional, Type, Union
+import numpy as np
 from websocket import WebSocketApp
-from sortedcontainers import SortedDict
-
-
-# Define type aliases for clarity
-Price = float
-Amount = float
-PriceLevel = Tuple[Price, Amount]
-OrderBookSide = SortedDict # Type alias for the SortedDict structure used for bids/asks
+from src.analytics import BookAnalytics
+from src.book_store import BookStore
+from src.buckets import PriceBuckets
+from src.book import BookSide, LevelListener, Price, Amount, PriceLevel, TopChanges, TopNTracker, resolve_backend
+from src.decoder import DepthUpdate, get_decoder
+from src.history import TopOfBookHistory
+from src.metrics import LatencyMetrics
+from src.replay import DepthRecorder
 
 
 class BinanceOrderBook:
@@ -32,33 +34,94 @@ class BinanceOrderBook:
     4. Process buffered events that occurred during snapshot fetch,
        ensuring continuity using `U`, `u`, and `lastUpdateId`.
     5. Continuously process incoming WebSocket events.
+
+    If a gap is detected in the live stream, the book re-enters buffering mode
+    and repeats steps 3-4 in the background while readers are served the last
+    consistent book (with `is_stale` set).
     """
     _BASE_WSS_URL = "wss://stream.binance.com:9443/ws"
     _BASE_API_URL = "https://api.binance.com/api/v3"
-
-    def __init__(self, symbol: str = "BTCUSDT", snapshot_limit: int = 1000):
+    _RESYNC_BACKOFF_SECONDS = 0.5
+    _RESYNC_MAX_BACKOFF_SECONDS = 30.0
+    _RESYNC_HISTORY = 100 # Number of recent resync durations kept for stats
+    _TRIM_INTERVAL_UPDATES = 50 # Applied updates between window trims
+    _WARM_START_MAX_AGE_SECONDS = 300.0 # Older persisted books are not worth resuming from
+
+    def __init__(
+        self,
+        symbol: str = "BTCUSDT",
+        snapshot_limit: int = 1000,
+        backend: Union[str, Type[BookSide]] = "sorteddict",
+        tick_size: Optional[float] = None,
+        decoder: str = "auto",
+        snapshot_slots: Optional[threading.Semaphore] = None,
+        recorder: Optional[DepthRecorder] = None,
+        auto_resync: bool = True,
+        base_wss_url: Optional[str] = None,
+        base_api_url: Optional[str] = None,
+        max_levels: Optional[int] = None,
+        max_distance_pct: Optional[float] = None,
+        store: Optional[BookStore] = None,
+        metrics: Optional[LatencyMetrics] = None,
+        update_event: Optional[threading.Event] = None
+    ):
         """
         Initializes the BinanceOrderBook instance.
 
         Args:
             symbol (str): The trading symbol (e.g., "BTCUSDT").
             snapshot_limit (int): The number of levels for the initial snapshot (max 1000).
+            backend (str | Type[BookSide]): Storage for each book side, "sorteddict" (default)
+                or "array" for the integer-tick array engine, or a BookSide subclass.
+            tick_size (float, optional): Price tick size. Backends that store integer ticks
+                fetch it from exchangeInfo on start() when not given.
+            decoder (str): Depth message decoder, "msgspec", "orjson", "json" or "auto"
+                (fastest installed).
+            snapshot_slots (threading.Semaphore, optional): Shared limit on concurrent
+                REST snapshot requests across books (initial syncs and resyncs).
+            recorder (DepthRecorder, optional): Appends every raw frame and snapshot
+                to a log for later replay.
+            auto_resync (bool): Fetch a new snapshot when a gap is detected. Replays
+                disable this and wait for the next recorded snapshot instead.
+            base_wss_url (str, optional): Overrides _BASE_WSS_URL, e.g. "ws://127.0.0.1:9443/ws"
+                for the local fake exchange.
+            base_api_url (str, optional): Overrides _BASE_API_URL, e.g. "http://127.0.0.1:9443/api/v3".
+            max_levels (int, optional): Keep at most this many levels per side; worse
+                levels are dropped. None keeps every level the stream sends.
+            max_distance_pct (float, optional): Drop levels more than this percentage
+                away from the mid price.
+            store (BookStore, optional): Persisted books to warm-start from; synchronize()
+                resumes from this book's saved levels when the stream still follows on
+                from them, and only fetches a REST snapshot otherwise.
+            metrics (LatencyMetrics, optional): Records receive/decode/apply latencies
+                for frames passed to feed(), and apply times for the publisher.
+            update_event (threading.Event, optional): Also set whenever the publisher is
+                woken, so one thread can wait on several books (see OrderBookManager).
         """
         if not isinstance(symbol, str) or not symbol:
             raise ValueError("Symbol must be a non-empty string.")
         if not isinstance(snapshot_limit, int) or not (0 < snapshot_limit <= 1000):
              raise ValueError("Snapshot limit must be an integer between 1 and 1000.")
+        if max_levels is not None and max_levels < 1:
+            raise ValueError("max_levels must be at least 1.")
+        if max_distance_pct is not None and max_distance_pct <= 0:
+            raise ValueError("max_distance_pct must be positive.")
 
         self.symbol = symbol.upper()
         self.snapshot_limit = snapshot_limit
-        self._stream_url = f"{self._BASE_WSS_URL}/{self.symbol.lower()}@depth@100ms"
-        self._snapshot_url = f"{self._BASE_API_URL}/depth"
+        self.base_wss_url = (base_wss_url or self._BASE_WSS_URL).rstrip("/")
+        self.base_api_url = (base_api_url or self._BASE_API_URL).rstrip("/")
+        self._stream_url = f"{self.base_wss_url}/{self.symbol.lower()}@depth@100ms"
+        self._snapshot_url = f"{self.base_api_url}/depth"
+        self._exchange_info_url = f"{self.base_api_url}/exchangeInfo"
 
-        # Use SortedDict for efficient sorted operations.
         # Bids are sorted descending by price (highest bid first).
         # Asks are sorted ascending by price (lowest ask first).
-        self.bids: OrderBookSide = SortedDict(lambda k: -Price(k))
-        self.asks: OrderBookSide = SortedDict(lambda k: Price(k))
+        self._backend = resolve_backend(backend)
+        self.tick_size = tick_size
+        self.bids: BookSide = self._backend(descending=True, tick_size=tick_size)
+        self.asks: BookSide = self._backend(descending=False, tick_size=tick_size)
+        self._decoder = get_decoder(decoder)
 
         self.last_update_id: Optional[int] = None # Last update ID from the snapshot or stream
         self._ws: Optional[WebSocketApp] = None
@@ -66,19 +129,104 @@ class BinanceOrderBook:
 
         # State management for initialization synchronization
         self._is_buffering: bool = True # Start in buffering state
-        self._message_queue: deque = deque() # Queue for messages arriving during snapshot fetch
+        self._message_queue: deque = deque() # Queue for decoded updates arriving during snapshot fetch
         self._lock = threading.Lock() # Lock for thread-safe access to order book data
         self._stop_event = threading.Event() # Event to signal stopping
+        self._snapshot_slots = snapshot_slots
+        self._recorder = recorder
+        self.auto_resync = auto_resync
+
+        # Gap recovery: readers keep the last consistent book, flagged stale, until resync completes
+        self.is_stale: bool = True # Not in sync with the stream until the first snapshot is replayed
+        self.resync_count: int = 0
+        self._resync_durations: deque = deque(maxlen=self._RESYNC_HISTORY)
+        self._resync_started: Optional[float] = None
+        self._resync_running: bool = False
+        self._resync_thread: Optional[threading.Thread] = None
+
+        # Incremental top-N publishing: (bid, ask) trackers keyed by ladder depth
+        self._top_trackers: Dict[int, Tuple[TopNTracker, TopNTracker]] = {}
+        # Publisher wake-up: set whenever an applied update may have changed a published ladder
+        self._updated = threading.Event()
+        self._update_event = update_event
+        self._pending_first_event_time: Optional[int] = None
+        self._pending_last_event_time: Optional[int] = None
+        self._last_event_time: Optional[int] = None
+
+        # Running aggregates fed every level change; see enable_analytics() and enable_buckets()
+        self._level_listeners: List[LevelListener] = []
+        self.analytics: Optional[BookAnalytics] = None
+        self.buckets: Dict[float, PriceBuckets] = {}
+        # Top-of-book history recorded per applied update; see enable_history()
+        self.history: Optional[TopOfBookHistory] = None
+
+        # Bounded window: levels far from the touch are trimmed every _TRIM_INTERVAL_UPDATES updates
+        self.max_levels = max_levels
+        self.max_distance_pct = max_distance_pct
+        self._updates_since_trim = 0
+        self.trimmed_levels: int = 0
+        self.trim_passes: int = 0
+
+        # Warm start: a resumed book stays stale until a live update proves it contiguous
+        self._store = store
+        self._unconfirmed: bool = False
+        self.warm_starts: int = 0
+
+        # Latency instrumentation; no timestamps are taken when None
+        self._metrics = metrics
+        self._pending_last_applied_at: Optional[float] = None
+
+    def _fetch_tick_size(self) -> float:
+        """Fetches the symbol's price tick size from the exchangeInfo PRICE_FILTER."""
+        logging.info(f"Fetching tick size for {self.symbol}...")
+        try:
+            response = requests.get(self._exchange_info_url, params={"symbol": self.symbol}, timeout=10)
+            response.raise_for_status()
+            exchange_info = response.json()
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Failed to fetch exchange info: {e}")
+            raise ConnectionError(f"Failed to fetch exchange info: {e}") from e
+        except json.JSONDecodeError as e:
+            logging.error(f"Failed to parse exchange info JSON: {e}")
+            raise ValueError(f"Failed to parse exchange info JSON: {e}") from e
+        return self._parse_tick_size(exchange_info)
 
-    def _fetch_depth_snapshot(self) -> None:
-        """Fetches the initial order book snapshot via REST API."""
+    def _parse_tick_size(self, exchange_info: Dict[str, Any]) -> float:
+        """Extracts the PRICE_FILTER tick size from an exchangeInfo response."""
+        try:
+            filters = exchange_info['symbols'][0]['filters']
+            tick_size = next(float(f['tickSize']) for f in filters if f['filterType'] == 'PRICE_FILTER')
+        except (KeyError, IndexError, StopIteration) as e:
+            logging.error(f"Exchange info missing PRICE_FILTER tick size: {e!r}")
+            raise ValueError(f"Exchange info missing PRICE_FILTER tick size: {e!r}") from e
+
+        logging.info(f"Tick size for {self.symbol}: {tick_size}")
+        return tick_size
+
+    def _fetch_depth_snapshot(self) -> Tuple[BookSide, BookSide, int]:
+        """
+        Fetches an order book snapshot via REST API into fresh book sides.
+
+        The live sides are not touched, so readers keep seeing the current
+        book while the request is in flight.
+
+        Returns:
+            Tuple[BookSide, BookSide, int]: New bid and ask sides and the snapshot's lastUpdateId.
+        """
         logging.info(f"Fetching depth snapshot for {self.symbol} (limit: {self.snapshot_limit})...")
         params = {"symbol": self.symbol, "limit": self.snapshot_limit}
         try:
-            response = requests.get(self._snapshot_url, params=params, timeout=10) # Added timeout
+            if self._snapshot_slots:
+                self._snapshot_slots.acquire()
+            try:
+                response = requests.get(self._snapshot_url, params=params, timeout=10) # Added timeout
+            finally:
+                if self._snapshot_slots:
+                    self._snapshot_slots.release()
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+            if self._recorder:
+                self._recorder.record_snapshot(self.symbol, response.content)
             snapshot_data = response.json()
-            logging.info(f"Snapshot received. Last Update ID: {snapshot_data['lastUpdateId']}")
 
         except requests.exceptions.RequestException as e:
             logging.error(f"Failed to fetch snapshot: {e}")
@@ -86,136 +234,402 @@ class BinanceOrderBook:
         except json.JSONDecodeError as e:
             logging.error(f"Failed to parse snapshot JSON: {e}")
             raise ValueError(f"Failed to parse snapshot JSON: {e}") from e
+
+        return self._build_snapshot_sides(snapshot_data)
+
+    def _build_snapshot_sides(self, snapshot_data: Dict[str, Any]) -> Tuple[BookSide, BookSide, int]:
+        """Builds fresh bid/ask sides from a parsed REST depth snapshot."""
+        try:
+            last_update_id = int(snapshot_data['lastUpdateId'])
+            logging.info(f"Snapshot received. Last Update ID: {last_update_id}")
         except KeyError as e:
              logging.error(f"Snapshot JSON missing expected key: {e}")
              raise ValueError(f"Snapshot JSON missing expected key: {e}") from e
 
-        with self._lock:
-            self.last_update_id = int(snapshot_data['lastUpdateId'])
-
-            # Initialize bids, ignoring levels with zero amount
-            snapshot_bids: List[List[str]] = snapshot_data.get('bids', [])
-            for price_str, amount_str in snapshot_bids:
-                price, amount = Price(price_str), Amount(amount_str)
-                if amount > 0:
-                    self.bids[price] = amount
-
-            # Initialize asks, ignoring levels with zero amount
-            snapshot_asks: List[List[str]] = snapshot_data.get('asks', [])
-            for price_str, amount_str in snapshot_asks:
-                price, amount = Price(price_str), Amount(amount_str)
-                if amount > 0:
-                    self.asks[price] = amount
-
-            logging.info(f"Snapshot processed. Bids: {len(self.bids)}, Asks: {len(self.asks)}")
-
-    def _process_buffered_messages(self) -> None:
-        """Processes messages buffered during the snapshot fetch."""
+        bids: BookSide = self._backend(descending=True, tick_size=self.tick_size)
+        asks: BookSide = self._backend(descending=False, tick_size=self.tick_size)
+
+        # Parse each side's [price, amount] strings in one numpy conversion and bulk-load
+        # the levels, ignoring those with zero amount
+        for side, key in ((bids, 'bids'), (asks, 'asks')):
+            try:
+                levels = np.array(snapshot_data.get(key, []), dtype=np.float64).reshape(-1, 2)
+            except ValueError as e:
+                logging.error(f"Snapshot {key} are malformed: {e}")
+                raise ValueError(f"Snapshot {key} are malformed: {e}") from e
+            levels = levels[levels[:, 1] > 0]
+            side.load(levels[:, 0], levels[:, 1])
+
+        logging.info(f"Snapshot processed. Bids: {len(bids)}, Asks: {len(asks)}")
+        return bids, asks, last_update_id
+
+    def _install_snapshot(self, bids: BookSide, asks: BookSide, last_update_id: int) -> bool:
+        """
+        Swaps in freshly fetched sides and replays the buffered updates on top.
+
+        Assumes the lock is held. Returns True once the book is back in sync
+        with the stream; False if the buffer starts past the snapshot, in which
+        case nothing is changed: the book keeps its current sides and stays in
+        buffering mode until a newer snapshot arrives.
+        """
+        if not self._is_buffering:
+            # A concurrent sync/resync already brought the book up to date; this snapshot is older
+            return True
+        if not self._snapshot_bridges(last_update_id):
+            return False
+        self.bids, self.asks = bids, asks
+        self.last_update_id = last_update_id
+        for bid_tracker, ask_tracker in self._top_trackers.values():
+            bid_tracker.reset()
+            ask_tracker.reset()
+        for listener in self._level_listeners:
+            listener.reset(bids, asks)
+        self._process_buffered_messages()
+
+        # Buffering finished, switch to real-time processing
+        self._is_buffering = False
+        self.is_stale = False
+        self._trim()
+        self._notify_update()
+        if self._resync_started is not None:
+            duration = time.monotonic() - self._resync_started
+            self._resync_started = None
+            self.resync_count += 1
+            self._resync_durations.append(duration)
+            logging.info(f"[{self.symbol}] Resync #{self.resync_count} complete in {duration:.3f}s.")
+        logging.info(f"[{self.symbol}] Finished processing buffered messages. Switching to real-time updates.")
+        return True
+
+    def _snapshot_bridges(self, last_update_id: int) -> bool:
+        """
+        Checks, without consuming the buffer, that every buffered update the
+        snapshot doesn't already cover follows on from it. Assumes the lock is held.
+        """
+        for update in self._message_queue:
+            if update.final_update_id <= last_update_id:
+                continue
+            if update.first_update_id > last_update_id + 1:
+                logging.warning(f"[{self.symbol}] Buffered update out of sequence: U={update.first_update_id}, u={update.final_update_id}, lastUpdateId={last_update_id}. Snapshot needs refreshing.")
+                return False
+            last_update_id = update.final_update_id
+        return True
+
+    def _process_buffered_messages(self) -> bool:
+        """
+        Processes messages buffered during the snapshot fetch.
+
+        The contiguous run of buffered updates that follows on from the
+        snapshot is merged into a single update (last write wins per price)
+        and applied in one pass, so each touched level is set once however
+        long the buffer grew.
+
+        Assumes the lock is held. Returns False (leaving the remaining updates
+        queued) if an update is found that the snapshot cannot bridge.
+        """
         logging.debug("Processing buffered messages...")
+        queue = self._message_queue
+        last_update_id = self.last_update_id
+        run: List[DepthUpdate] = []
+        in_sequence = True
+
+        while queue:
+            update: DepthUpdate = queue[0]
+            first_update_id = update.first_update_id
+            final_update_id = update.final_update_id
+
+            # Logic from Binance docs:
+            # Drop update if u <= lastUpdateId
+            if final_update_id <= last_update_id:
+                logging.debug(f"Dropping old buffered update: u={final_update_id} <= lastUpdateId={last_update_id}")
+                queue.popleft()
+                continue
+
+            # Apply update if U <= lastUpdateId+1 AND u >= lastUpdateId+1
+            if first_update_id <= last_update_id + 1:
+                run.append(queue.popleft())
+                last_update_id = final_update_id
+            else:
+                logging.warning(f"[{self.symbol}] Buffered update out of sequence: U={first_update_id}, u={final_update_id}, lastUpdateId={last_update_id}. Snapshot needs refreshing.")
+                in_sequence = False
+                break
+
+        if len(run) == 1:
+            self._apply_update(run[0])
+        elif run:
+            logging.debug(f"Applying {len(run)} buffered updates as one: U={run[0].first_update_id}, u={last_update_id}")
+            bids: Dict[Price, Amount] = {}
+            asks: Dict[Price, Amount] = {}
+            for update in run:
+                bids.update(update.bids)
+                asks.update(update.asks)
+            if self._pending_first_event_time is None:
+                self._pending_first_event_time = run[0].event_time
+            self._apply_update(DepthUpdate(
+                event_type="depthUpdate",
+                event_time=run[-1].event_time,
+                symbol=self.symbol,
+                first_update_id=run[0].first_update_id,
+                final_update_id=last_update_id,
+                bids=list(bids.items()),
+                asks=list(asks.items())
+            ))
+        self.last_update_id = last_update_id # Update last_update_id *after* successful application
+        return in_sequence
+
+    def _begin_resync(self, reason: str) -> None:
+        """
+        Re-enters buffering mode and re-fetches the snapshot in the background.
+
+        Assumes the lock is held. The current sides are left untouched (and
+        flagged stale) so readers keep getting the last consistent book.
+        """
+        logging.warning(f"[{self.symbol}] {reason}. Resynchronizing order book...")
+        self._is_buffering = True
+        self.is_stale = True
+        self._unconfirmed = False
+        self._notify_update() # Publishers carrying is_stale have something new to show
+        if self._resync_started is None:
+            self._resync_started = time.monotonic()
+        if self.auto_resync and not self._resync_running:
+            self._resync_running = True
+            self._start_resync_worker()
+
+    def _start_resync_worker(self) -> None:
+        """Runs _resync_loop in the background (a thread here; a task for the asyncio client)."""
+        self._resync_thread = threading.Thread(target=self._resync_loop, name=f"OrderBookResync-{self.symbol}", daemon=True)
+        self._resync_thread.start()
+
+    def _resync_loop(self) -> None:
+        """Fetches snapshots until one bridges the buffered updates (or the book is stopped)."""
+        backoff = self._RESYNC_BACKOFF_SECONDS
+        while not self._stop_event.is_set():
+            try:
+                bids, asks, last_update_id = self._fetch_depth_snapshot()
+            except (ConnectionError, ValueError) as e:
+                logging.error(f"[{self.symbol}] Resync snapshot failed: {e}. Retrying in {backoff:.1f}s.")
+                if self._stop_event.wait(backoff):
+                    break
+                backoff = min(backoff * 2, self._RESYNC_MAX_BACKOFF_SECONDS)
+                continue
+
+            with self._lock:
+                if self._install_snapshot(bids, asks, last_update_id):
+                    self._resync_running = False
+                    return
+            # The snapshot predates the buffered updates; give the REST side time to catch up
+            logging.info(f"[{self.symbol}] Resync snapshot {last_update_id} is stale. Retrying in {backoff:.1f}s.")
+            if self._stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, self._RESYNC_MAX_BACKOFF_SECONDS)
 
         with self._lock:
-            while self._message_queue:
-                msg_str = self._message_queue.popleft()
-                try:
-                    msg_data = json.loads(msg_str)
-                    event_type = msg_data.get('e')
-                    if event_type != 'depthUpdate':
-                        logging.debug(f"Skipping non-depthUpdate buffered message: {event_type}")
-                        continue
-
-                    first_update_id = int(msg_data['U'])
-                    final_update_id = int(msg_data['u'])
-
-                    # Logic from Binance docs:
-                    # Drop update if u <= lastUpdateId
-                    if final_update_id <= self.last_update_id:
-                        logging.debug(f"Dropping old buffered update: u={final_update_id} <= lastUpdateId={self.last_update_id}")
-                        continue
-
-                    # Apply update if U <= lastUpdateId+1 AND u >= lastUpdateId+1
-                    if first_update_id <= self.last_update_id + 1 and final_update_id >= self.last_update_id + 1:
-                        logging.debug(f"Applying buffered update: U={first_update_id}, u={final_update_id}, lastUpdateId={self.last_update_id}")
-                        self._apply_update(msg_data)
-                        self.last_update_id = final_update_id # Update last_update_id *after* successful application
-                    else:
-                         logging.warning(f"Buffered update out of sequence? U={first_update_id}, u={final_update_id}, lastUpdateId={self.last_update_id}")
-
-                except json.JSONDecodeError:
-                    logging.error(f"Failed to parse buffered JSON message: {msg_str[:100]}...")
-                except (KeyError, ValueError) as e:
-                    logging.error(f"Error processing buffered message: {e} - Data: {msg_str[:100]}...")
-
-            # Buffering finished, switch to real-time processing
-            self._is_buffering = False
-            logging.info("Finished processing buffered messages. Switching to real-time updates.")
-
-    def _apply_update(self, update_data: Dict[str, Any]) -> None:
-        """Applies a single depth update message to the order book."""
-        # Assumes lock is already held by caller (_process_buffered_messages or _on_message)
+            self._resync_running = False
+
+    def _apply_update(self, update: DepthUpdate) -> None:
+        """Applies a single decoded depth update to the order book."""
+        # Assumes lock is already held by caller (_process_buffered_messages or handle_update)
         try:
-            # Update bids
-            update_bids: List[List[str]] = update_data.get('b', [])
-            for price_str, amount_str in update_bids:
-                price, amount = Price(price_str), Amount(amount_str)
-                if amount == 0:
-                    self.bids.pop(price, None) # Remove price level if amount is 0
-                else:
-                    self.bids[price] = amount
-
-            # Update asks
-            update_asks: List[List[str]] = update_data.get('a', [])
-            for price_str, amount_str in update_asks:
-                price, amount = Price(price_str), Amount(amount_str)
-                if amount == 0:
-                    self.asks.pop(price, None) # Remove price level if amount is 0
-                else:
-                    self.asks[price] = amount
-
-        except (KeyError, ValueError) as e:
-             logging.error(f"Error applying update: {e} - Data: {update_data}")
+            if not self._level_listeners:
+                # Update bids (a zero amount removes the price level)
+                set_bid = self.bids.set
+                for price, amount in update.bids:
+                    set_bid(price, amount)
+
+                # Update asks
+                set_ask = self.asks.set
+                for price, amount in update.asks:
+                    set_ask(price, amount)
+            else:
+                # Same, keeping each level's previous amount for the aggregates
+                set_bid = self.bids.set
+                bid_changes = [(price, set_bid(price, amount), amount) for price, amount in update.bids]
+                set_ask = self.asks.set
+                ask_changes = [(price, set_ask(price, amount), amount) for price, amount in update.asks]
+                for listener in self._level_listeners:
+                    listener.on_levels(bid_changes, ask_changes)
+
+            self._updates_since_trim += 1
+            if self._updates_since_trim >= self._TRIM_INTERVAL_UPDATES:
+                self._trim()
+
+            if self.history is not None:
+                self._record_history(update.event_time)
+
+            touched = True
+            if self._top_trackers:
+                best_bid = max(price for price, _ in update.bids) if update.bids else None
+                best_ask = min(price for price, _ in update.asks) if update.asks else None
+                touched = False
+                for bid_tracker, ask_tracker in self._top_trackers.values():
+                    if best_bid is not None:
+                        bid_tracker.touch(best_bid)
+                    if best_ask is not None:
+                        ask_tracker.touch(best_ask)
+                    touched = touched or bid_tracker.dirty or ask_tracker.dirty
+                # Deep levels outside the top-N still move the bucket tables
+                touched = touched or any(buckets.dirty for buckets in self.buckets.values())
+            self._last_event_time = update.event_time
+            if touched:
+                if self._pending_first_event_time is None:
+                    self._pending_first_event_time = update.event_time
+                self._pending_last_event_time = update.event_time
+                if self._metrics is not None:
+                    self._pending_last_applied_at = time.time()
+                self._notify_update()
+
+        except ValueError as e:
+             logging.error(f"Error applying update: {e} - U={update.first_update_id}, u={update.final_update_id}")
+
+    def _trim(self) -> None:
+        """
+        Drops levels outside the configured window (max_levels, max_distance_pct).
 
-    def _on_message(self, ws: WebSocketApp, message: str) -> None:
-        """Handles incoming WebSocket messages."""
-        if self._stop_event.is_set():
+        Assumes the lock is held. Dropped levels are reported to the level
+        listeners as removals so aggregates describe the same window.
+        """
+        self._updates_since_trim = 0
+        if self.max_levels is None and self.max_distance_pct is None:
             return
+        worst_bid = worst_ask = None
+        if self.max_distance_pct is not None:
+            best_bid, best_ask = self.bids.best(), self.asks.best()
+            if best_bid is not None and best_ask is not None:
+                mid = (best_bid[0] + best_ask[0]) / 2
+                worst_bid = mid * (1 - self.max_distance_pct / 100)
+                worst_ask = mid * (1 + self.max_distance_pct / 100)
+        removed_bids = self.bids.trim(self.max_levels, worst_bid)
+        removed_asks = self.asks.trim(self.max_levels, worst_ask)
+        self.trim_passes += 1
+        if not removed_bids and not removed_asks:
+            return
+        self.trimmed_levels += len(removed_bids) + len(removed_asks)
+        if self._level_listeners:
+            bid_changes = [(price, amount, 0.0) for price, amount in removed_bids]
+            ask_changes = [(price, amount, 0.0) for price, amount in removed_asks]
+            for listener in self._level_listeners:
+                listener.on_levels(bid_changes, ask_changes)
+        # A window narrower than a published ladder reaches into it
+        for bid_tracker, ask_tracker in self._top_trackers.values():
+            if removed_bids:
+                bid_tracker.touch(max(price for price, _ in removed_bids))
+            if removed_asks:
+                ask_tracker.touch(min(price for price, _ in removed_asks))
+
+    def _record_history(self, event_time: int) -> None:
+        """Appends the current touch to the history; called with the lock held."""
+        best_bid, best_ask = self.bids.best(), self.asks.best()
+        if best_bid is not None and best_ask is not None:
+            self.history.append(event_time, best_bid[0], best_bid[1], best_ask[0], best_ask[1])
+
+    def _notify_update(self) -> None:
+        """Wakes the publisher; called with the lock held."""
+        self._updated.set()
+        if self._update_event is not None:
+            self._update_event.set()
+
+    def wait_for_update(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until an update that may change a published top-N ladder has
+        been applied since the previous call, or until `timeout` seconds pass.
+
+        Returns:
+            bool: True if woken by an update, False on timeout.
+        """
+        if self._updated.wait(timeout):
+            self._updated.clear()
+            return True
+        return False
 
+    def handle_update(self, update: DepthUpdate) -> None:
+        """
+        Buffers or applies a decoded depth update.
+
+        This is the entry point for updates arriving from this book's own
+        WebSocket, or from a stream owned elsewhere (e.g. OrderBookManager's
+        combined stream).
+        """
         with self._lock:
             if self._is_buffering:
                 # Queue messages if we are still waiting for/processing the snapshot
-                self._message_queue.append(message)
-                # logging.debug(f"Queued message, queue size: {len(self._message_queue)}")
+                self._message_queue.append(update)
                 return
 
-            # If not buffering, process the message immediately
-            try:
-                msg_data = json.loads(message)
-                event_type = msg_data.get('e')
-                if event_type != 'depthUpdate':
-                    logging.debug(f"Skipping non-depthUpdate message: {event_type}")
-                    return
+            # Important: Check sequence continuity for real-time updates
+            final_update_id = update.final_update_id
+            prev_final_update_id = update.prev_final_update_id # Previous update's final ID
 
-                # Important: Check sequence continuity for real-time updates
-                final_update_id = int(msg_data['u'])
-                prev_final_update_id = msg_data.get('pu') # Previous update's final ID
+            # If it's the first message after buffering, check using the same logic
+            if self.last_update_id is not None and final_update_id <= self.last_update_id:
+                logging.debug(f"Dropping old real-time update: u={final_update_id} <= lastUpdateId={self.last_update_id}")
+                return
 
-                # If it's the first message after buffering, check using the same logic
-                if self.last_update_id is not None and final_update_id <= self.last_update_id:
-                    logging.debug(f"Dropping old real-time update: u={final_update_id} <= lastUpdateId={self.last_update_id}")
-                    return
+            # Check continuity against the last processed 'u'. Futures streams carry 'pu'
+            # (previous event's 'u'); spot streams must satisfy U == last 'u' + 1.
+            if prev_final_update_id is not None:
+                gap = prev_final_update_id != self.last_update_id
+            else:
+                gap = update.first_update_id > self.last_update_id + 1
+            if gap:
+                self._begin_resync(
+                    f"Gap detected! U={update.first_update_id}, pu={prev_final_update_id}, last_update_id={self.last_update_id}"
+                )
+                self._message_queue.append(update)
+                return
 
-                # Optional stricter check: Check if 'pu' matches the last processed 'u'
-                # This helps detect missed messages, although TCP usually ensures order.
-                if prev_final_update_id is not None and int(prev_final_update_id) != self.last_update_id:
-                   logging.warning(f"Gap detected! pu={prev_final_update_id} != last_update_id={self.last_update_id}. Resync might be needed.")
+            # Apply the update
+            self._apply_update(update)
+            self.last_update_id = final_update_id # Update last_update_id *after* successful application
+            if self._unconfirmed:
+                self._confirm_warm_start()
 
-                # Apply the update
-                self._apply_update(msg_data)
-                self.last_update_id = final_update_id # Update last_update_id *after* successful application
+    def feed(self, message: Union[str, bytes], received_at: Optional[float] = None) -> None:
+        """Decodes a raw depth frame and buffers or applies it."""
+        if self._recorder:
+            self._recorder.record_frame(message, received_at)
 
-            except json.JSONDecodeError:
-                logging.error(f"Failed to parse real-time JSON message: {message[:100]}...")
-            except (KeyError, ValueError) as e:
-                logging.error(f"Error processing real-time message: {e} - Data: {message[:100]}...")
+        metrics = self._metrics
+        if metrics is not None and received_at is None:
+            received_at = time.time()
+
+        # Decode outside the lock so readers are only blocked while levels are applied
+        try:
+            update = self._decoder.decode(message)
+        except ValueError as e:
+            logging.error(f"Error processing real-time message: {e} - Data: {message[:100]}...")
+            return
+        if update is None:
+            logging.debug(f"Skipping non-depthUpdate message: {message[:100]}")
+            return
+
+        if metrics is None:
+            self.handle_update(update)
+            return
+        decoded_at = time.time()
+        self.handle_update(update)
+        metrics.record_ingest(self.symbol, update.event_time, received_at, decoded_at, time.time())
+
+    def load_snapshot(self, snapshot_data: Dict[str, Any]) -> bool:
+        """
+        Installs an already-fetched REST depth snapshot (e.g. from a recording)
+        and replays buffered updates on top of it.
+
+        Returns:
+            bool: True if the book is now in sync with the stream.
+        """
+        if self._backend.requires_tick_size and self.tick_size is None:
+            raise ValueError(f"The {self._backend.__name__} backend needs a tick_size to load a snapshot offline.")
+        bids, asks, last_update_id = self._build_snapshot_sides(snapshot_data)
+        with self._lock:
+            self._is_buffering = True # An explicit snapshot always (re)bases the book
+            if self._resync_started is None:
+                self._resync_started = time.monotonic() if self.last_update_id is not None else None
+            return self._install_snapshot(bids, asks, last_update_id)
+
+    def _on_message(self, ws: WebSocketApp, message: str) -> None:
+        """Handles incoming WebSocket messages."""
+        if self._stop_event.is_set():
+            return
+        self.feed(message)
 
     def _on_close(self, ws: WebSocketApp, close_status_code: Optional[int], close_msg: Optional[str]) -> None:
         """Handles WebSocket connection close."""
@@ -250,6 +664,92 @@ class BinanceOrderBook:
         self._ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
         logging.info("WebSocket run_forever loop exited.")
 
+    def _warm_start(self) -> bool:
+        """
+        Installs this book's persisted levels in place of a REST snapshot.
+
+        Returns True when the buffered updates (if any) follow on from the
+        saved lastUpdateId. With nothing buffered yet the book is resumed but
+        left stale until the first live update arrives: a contiguous one
+        confirms it, a gap triggers the usual REST resync.
+        """
+        persisted = self._store.load(self.symbol)
+        if persisted is None:
+            return False
+        age = time.time() - persisted.saved_at
+        if age > self._WARM_START_MAX_AGE_SECONDS:
+            logging.info(f"[{self.symbol}] Persisted book is {age:.0f}s old; using a REST snapshot.")
+            return False
+        if self._backend.requires_tick_size and self.tick_size is None:
+            if persisted.tick_size is None:
+                return False
+            self.tick_size = persisted.tick_size
+
+        bids: BookSide = self._backend(descending=True, tick_size=self.tick_size)
+        asks: BookSide = self._backend(descending=False, tick_size=self.tick_size)
+        for price, amount in persisted.bids:
+            bids.set(price, amount)
+        for price, amount in persisted.asks:
+            asks.set(price, amount)
+
+        with self._lock:
+            if not self._install_snapshot(bids, asks, persisted.last_update_id):
+                logging.info(f"[{self.symbol}] Stream has moved past the persisted book (lastUpdateId={persisted.last_update_id}); using a REST snapshot.")
+                return False
+            self.warm_starts += 1
+            logging.info(f"[{self.symbol}] Warm start from persisted book saved {age:.1f}s ago (lastUpdateId={persisted.last_update_id}).")
+            if self.last_update_id == persisted.last_update_id:
+                # Nothing buffered bridged it yet; quiet symbols may wait a while for their first diff
+                self.is_stale = True
+                self._unconfirmed = True
+            else:
+                self._confirm_warm_start()
+        return True
+
+    def _confirm_warm_start(self) -> None:
+        """Marks a resumed book live once an update has followed on from it. Assumes the lock is held."""
+        self._unconfirmed = False
+        self.is_stale = False
+        self._notify_update()
+        logging.info(f"[{self.symbol}] Persisted book confirmed by the live stream at lastUpdateId={self.last_update_id}.")
+
+    def save_to_store(self, store: BookStore) -> bool:
+        """
+        Saves the current levels to `store`. Only in-sync books are saved, so a
+        stale or unconfirmed book never overwrites a good save.
+
+        Returns:
+            bool: True if the book was saved.
+        """
+        with self._lock:
+            if self.is_stale or self._is_buffering or self.last_update_id is None:
+                return False
+            bids, asks = list(self.bids.items()), list(self.asks.items())
+            last_update_id = self.last_update_id
+        store.save(self.symbol, bids, asks, last_update_id, self.tick_size)
+        return True
+
+    def synchronize(self) -> None:
+        """
+        Loads the REST snapshot and replays updates buffered since the stream
+        opened. Updates must already be flowing into handle_update(). With a
+        `store`, the persisted book is tried first (see _warm_start).
+
+        Raises:
+            ConnectionError: If the snapshot (or tick size) could not be fetched.
+            ValueError: If the snapshot response is malformed.
+        """
+        if self._store is not None and self._warm_start():
+            return
+        if self._backend.requires_tick_size and self.tick_size is None:
+            self.tick_size = self._fetch_tick_size()
+        bids, asks, last_update_id = self._fetch_depth_snapshot()
+        with self._lock:
+            if not self._install_snapshot(bids, asks, last_update_id):
+                self._begin_resync("Snapshot is older than the buffered updates")
+                return
+        logging.info(f"[{self.symbol}] Order book synchronization complete. Tracking real-time updates.")
+
     def start(self) -> None:
         """Starts the WebSocket connection and initiates the order book synchronization."""
         if self._ws_thread and self._ws_thread.is_alive():
@@ -259,6 +759,7 @@ class BinanceOrderBook:
         logging.info("Starting Binance Order Book...")
         self._stop_event.clear()
         self._is_buffering = True # Ensure buffering is active initially
+        self.is_stale = True
         self._message_queue.clear() # Clear any old messages
 
         # Start WebSocket in a separate thread
@@ -267,9 +768,7 @@ class BinanceOrderBook:
 
         # Fetch snapshot and process buffer
         try:
-            self._fetch_depth_snapshot()
-            self._process_buffered_messages()
-            logging.info("Order book synchronization complete. Tracking real-time updates.")
+            self.synchronize()
         except (ConnectionError, ValueError) as e:
             logging.error(f"Failed to initialize order book: {e}. Stopping.")
             self.stop()
@@ -289,6 +788,9 @@ class BinanceOrderBook:
             if self._ws_thread.is_alive():
                  logging.warning("WebSocket thread did not join cleanly.")
 
+        if self._resync_thread and self._resync_thread.is_alive():
+            self._resync_thread.join(timeout=5)
+
         logging.info("Binance Order Book stopped.")
 
 
@@ -297,20 +799,134 @@ class BinanceOrderBook:
     def get_bids(self, limit: int = 10) -> List[PriceLevel]:
         """Returns the top N bid levels."""
         with self._lock:
-            # Items are returned in sorted order (highest price first due to key func)
-            return list(self.bids.items()[:limit])
+            # Items are returned in sorted order (highest price first)
+            return self.bids.top(limit)
 
     def get_asks(self, limit: int = 10) -> List[PriceLevel]:
         """Returns the top N ask levels."""
         with self._lock:
-             # Items are returned in sorted order (lowest price first)
-            return list(self.asks.items()[:limit])
+            # Items are returned in sorted order (lowest price first)
+            return self.asks.top(limit)
+
+    def get_top_state(self, limit: int = 10) -> Tuple[List[PriceLevel], List[PriceLevel], Optional[int], bool]:
+        """
+        Returns the top N bids and asks with the book's last_update_id and
+        is_stale, all read under one lock so they describe the same book.
+        """
+        with self._lock:
+            return self.bids.top(limit), self.asks.top(limit), self.last_update_id, self.is_stale
+
+    def get_top_changes(self, limit: int = 10, consume_event_times: bool = True) -> TopChanges:
+        """
+        Returns the top-N bid/ask rows that changed since the previous call
+        with the same `limit`; the first call returns the whole ladder.
+
+        Intended for a single publisher per `limit`: each call advances the
+        published state. A secondary consumer (another `limit` alongside the
+        main publish) passes `consume_event_times=False` to leave the pending
+        event times, used for latency metrics, to the main publisher.
+        """
+        with self._lock:
+            trackers = self._top_trackers.get(limit)
+            if trackers is None:
+                trackers = self._top_trackers[limit] = (TopNTracker(limit, descending=True), TopNTracker(limit, descending=False))
+            bid_tracker, ask_tracker = trackers
+            bids, removed_bids = bid_tracker.diff(self.bids)
+            asks, removed_asks = ask_tracker.diff(self.asks)
+            first_event_time, last_event_time = self._pending_first_event_time, self._pending_last_event_time
+            last_applied_at = self._pending_last_applied_at
+            if consume_event_times:
+                self._pending_first_event_time = self._pending_last_event_time = self._pending_last_applied_at = None
+        return TopChanges(bids, asks, removed_bids, removed_asks, first_event_time, last_event_time, last_applied_at)
+
+    def reset_top_changes(self, limit: int = 10) -> None:
+        """Makes the next get_top_changes(limit) return the whole ladder again, e.g. for a new table."""
+        with self._lock:
+            self._top_trackers.pop(limit, None)
+            self._notify_update() # Publish it without waiting for the next diff
+
+    def enable_analytics(self, levels: int = 10, bands_bps: Iterable[float] = (10, 50, 100)) -> None:
+        """
+        Starts maintaining BookAnalytics aggregates (cumulative depth,
+        imbalance, microprice, notional within bands) for get_analytics().
+        """
+        with self._lock:
+            if self.analytics is not None:
+                self._level_listeners.remove(self.analytics)
+            self.analytics = BookAnalytics(levels, bands_bps)
+            self.analytics.reset(self.bids, self.asks)
+            self._level_listeners.append(self.analytics)
+
+    def get_analytics(self) -> Optional[Dict[str, Any]]:
+        """Returns the current `analytics` table row, or None if disabled or the book is empty."""
+        with self._lock:
+            if self.analytics is None:
+                return None
+            return self.analytics.compute(self.symbol, self.bids, self.asks, self._last_event_time, self.is_stale)
+
+    def enable_buckets(self, sizes: Iterable[float]) -> None:
+        """
+        Starts maintaining PriceBuckets aggregates over the whole book, one per
+        bucket width in `sizes`, for get_bucket_changes().
+        """
+        with self._lock:
+            for size in sizes:
+                if size in self.buckets:
+                    continue
+                buckets = self.buckets[size] = PriceBuckets(size)
+                buckets.reset(self.bids, self.asks)
+                self._level_listeners.append(buckets)
+
+    def get_bucket_changes(self) -> Dict[float, Tuple[List[Dict[str, Any]], List[str]]]:
+        """
+        Returns, per bucket size, the bucket rows to upsert and keys to remove
+        since the previous call. Sizes with nothing to publish are omitted.
+        """
+        with self._lock:
+            changes = {}
+            for size, buckets in self.buckets.items():
+                if buckets.dirty:
+                    changes[size] = buckets.changes()
+            return changes
+
+    def enable_history(self, history: TopOfBookHistory) -> None:
+        """Starts recording the best bid/ask and sizes after every applied update into `history`."""
+        with self._lock:
+            self.history = history
 
     def get_spread(self) -> Optional[Tuple[Price, Price]]:
         """Returns the best bid and best ask."""
         with self._lock:
-            best_bid = self.bids.peekitem(0)[0] if self.bids else None
-            best_ask = self.asks.peekitem(0)[0] if self.asks else None
+            best_bid = self.bids.best()
+            best_ask = self.asks.best()
             if best_bid is not None and best_ask is not None:
-                return best_bid, best_ask
-            return None
\ No newline at end of file
+                return best_bid[0], best_ask[0]
+            return None
+
+    def get_trim_stats(self) -> Dict[str, Any]:
+        """Returns the book window settings, current side sizes and trim counters."""
+        with self._lock:
+            return {
+                "max_levels": self.max_levels,
+                "max_distance_pct": self.max_distance_pct,
+                "bid_levels": len(self.bids),
+                "ask_levels": len(self.asks),
+                "trimmed_levels": self.trimmed_levels,
+                "trim_passes": self.trim_passes,
+            }
+
+    def get_resync_stats(self) -> Dict[str, Any]:
+        """Returns resync counters and recovery durations (seconds)."""
+        with self._lock:
+            durations = list(self._resync_durations)
+            in_progress = self._resync_started is not None
+            return {
+                "stale": self.is_stale,
+                "resync_count": self.resync_count,
+                "resync_in_progress": in_progress,
+                "current_resync_seconds": time.monotonic() - self._resync_started if in_progress else None,
+                "last_resync_seconds": durations[-1] if durations else None,
+                "mean_resync_seconds": sum(durations) / len(durations) if durations else None,
+                "max_resync_seconds": max(durations) if durations else None,
+                "warm_starts": self.warm_starts,
+            }
@@ -0,0 +1,304 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple, Type, Union
+import aiohttp
+import websockets
+from src.binance import BinanceOrderBook
+from src.book import BookSide
+from src.metrics import LatencyMetrics
+from src.replay import DepthRecorder
+
+
+class _NoLock:
+    """Stand-in for threading.Lock: every access happens on the event loop thread."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+OVERFLOW_POLICIES = ("resync", "drop_oldest", "block")
+
+
+class AsyncBinanceOrderBook(BinanceOrderBook):
+    """
+    Asyncio-native BinanceOrderBook.
+
+    Frames are read by one task into a bounded asyncio.Queue and applied by
+    another, so the book, the Perspective IOLoop and the publisher can all run
+    on a single event loop with no threads or locks. Snapshots and tick sizes
+    come from aiohttp; sequencing, gap detection and resync reuse the
+    BinanceOrderBook logic.
+
+    When the inbound queue is full, `overflow` decides what happens:
+        - "resync" (default): discard everything queued and resynchronize from
+          a fresh snapshot; a consumer that far behind would be replaying
+          stale diffs anyway.
+        - "drop_oldest": drop the oldest queued frame. The resulting sequence
+          gap triggers the usual gap resync when the consumer catches up.
+        - "block": wait for space, pushing backpressure onto the socket (and
+          risking Binance disconnecting the slow consumer).
+
+    The public API mirrors BinanceOrderBook, except that start() and stop()
+    are coroutines.
+    """
+    _RECONNECT_DELAY_SECONDS = 1.0
+    _CONNECT_TIMEOUT_SECONDS = 10.0
+
+    def __init__(
+        self,
+        symbol: str = "BTCUSDT",
+        snapshot_limit: int = 1000,
+        backend: Union[str, Type[BookSide]] = "sorteddict",
+        tick_size: Optional[float] = None,
+        decoder: str = "auto",
+        max_queue_size: int = 1000,
+        overflow: str = "resync",
+        recorder: Optional[DepthRecorder] = None,
+        base_wss_url: Optional[str] = None,
+        base_api_url: Optional[str] = None,
+        max_levels: Optional[int] = None,
+        max_distance_pct: Optional[float] = None,
+        metrics: Optional[LatencyMetrics] = None
+    ):
+        """
+        Initializes the AsyncBinanceOrderBook instance.
+
+        Args:
+            symbol (str): The trading symbol (e.g., "BTCUSDT").
+            snapshot_limit (int): The number of levels for the initial snapshot (max 1000).
+            backend (str | Type[BookSide]): Book side storage (see BinanceOrderBook).
+            tick_size (float, optional): Price tick size (see BinanceOrderBook).
+            decoder (str): Depth message decoder (see BinanceOrderBook).
+            max_queue_size (int): Capacity of the inbound frame queue.
+            overflow (str): Queue overflow policy: "resync", "drop_oldest" or "block".
+            recorder (DepthRecorder, optional): Logs raw frames and snapshots for replay.
+            base_wss_url (str, optional): Overrides the WebSocket base URL (see BinanceOrderBook).
+            base_api_url (str, optional): Overrides the REST base URL (see BinanceOrderBook).
+            max_levels (int, optional): Per-side level cap (see BinanceOrderBook).
+            max_distance_pct (float, optional): Distance-from-mid window (see BinanceOrderBook).
+            metrics (LatencyMetrics, optional): Latency histograms (see BinanceOrderBook).
+        """
+        super().__init__(
+            symbol=symbol,
+            snapshot_limit=snapshot_limit,
+            backend=backend,
+            tick_size=tick_size,
+            decoder=decoder,
+            recorder=recorder,
+            base_wss_url=base_wss_url,
+            base_api_url=base_api_url,
+            max_levels=max_levels,
+            max_distance_pct=max_distance_pct,
+            metrics=metrics
+        )
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow policy must be one of: {', '.join(OVERFLOW_POLICIES)}.")
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1.")
+
+        self._lock = _NoLock()
+        self.overflow = overflow
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._resync_task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self._updated_async = asyncio.Event()
+
+        # Backpressure counters
+        self.dropped_messages: int = 0
+        self.overflow_count: int = 0
+        self.queue_high_water: int = 0
+
+    async def _get(self, url: str, params: Dict[str, Any]) -> bytes:
+        try:
+            async with self._session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                response.raise_for_status()
+                return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Request to {url} failed: {e!r}")
+            raise ConnectionError(f"Request to {url} failed: {e!r}") from e
+
+    async def _get_json(self, url: str, params: Dict[str, Any]) -> Any:
+        body = await self._get(url, params)
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError as e:
+            logging.error(f"Failed to parse JSON from {url}: {e}")
+            raise ValueError(f"Failed to parse JSON from {url}: {e}") from e
+
+    async def _fetch_tick_size_async(self) -> float:
+        logging.info(f"Fetching tick size for {self.symbol}...")
+        exchange_info = await self._get_json(self._exchange_info_url, {"symbol": self.symbol})
+        return self._parse_tick_size(exchange_info)
+
+    async def _fetch_depth_snapshot_async(self):
+        logging.info(f"Fetching depth snapshot for {self.symbol} (limit: {self.snapshot_limit})...")
+        body = await self._get(self._snapshot_url, {"symbol": self.symbol, "limit": self.snapshot_limit})
+        if self._recorder:
+            self._recorder.record_snapshot(self.symbol, body)
+        try:
+            snapshot_data = json.loads(body)
+        except json.JSONDecodeError as e:
+            logging.error(f"Failed to parse snapshot JSON: {e}")
+            raise ValueError(f"Failed to parse snapshot JSON: {e}") from e
+        return self._build_snapshot_sides(snapshot_data)
+
+    def _enqueue(self, frame: Tuple[float, Union[str, bytes]]) -> None:
+        """Applies the overflow policy to a frame that found the queue full."""
+        self.overflow_count += 1
+        if self.overflow == "drop_oldest":
+            self._queue.get_nowait()
+            self.dropped_messages += 1
+        else: # resync
+            dropped = self._queue.qsize()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self.dropped_messages += dropped
+            self._message_queue.clear()
+            self._begin_resync(f"Inbound queue overflow ({dropped} frames dropped)")
+        self._queue.put_nowait(frame)
+
+    async def _read_frames(self) -> None:
+        """Reads frames from the socket into the bounded queue, reconnecting on disconnect."""
+        first_connection = True
+        while not self._stop_event.is_set():
+            try:
+                logging.info(f"Connecting to WebSocket stream: {self._stream_url}")
+                async with websockets.connect(self._stream_url, max_size=None) as ws:
+                    logging.info("WebSocket connection opened.")
+                    if not first_connection:
+                        # Diffs were missed while disconnected
+                        self._begin_resync("Reconnected after disconnect")
+                    first_connection = False
+                    self._connected.set()
+                    async for message in ws:
+                        frame = (time.time(), message)
+                        if self.overflow == "block":
+                            await self._queue.put(frame)
+                        elif self._queue.full():
+                            self._enqueue(frame)
+                        else:
+                            self._queue.put_nowait(frame)
+                        size = self._queue.qsize()
+                        if size > self.queue_high_water:
+                            self.queue_high_water = size
+            except asyncio.CancelledError:
+                raise
+            except (OSError, websockets.WebSocketException) as e:
+                if self._stop_event.is_set():
+                    break
+                logging.error(f"WebSocket error: {e!r}")
+            self._connected.clear()
+            self.is_stale = True # Diffs are being missed until we reconnect and resync
+            if not self._stop_event.is_set():
+                logging.warning(f"WebSocket closed. Reconnecting in {self._RECONNECT_DELAY_SECONDS}s...")
+                await asyncio.sleep(self._RECONNECT_DELAY_SECONDS)
+        logging.info("WebSocket reader finished.")
+
+    async def _consume_frames(self) -> None:
+        """Decodes queued frames and applies them to the book."""
+        while True:
+            received_at, message = await self._queue.get()
+            if self._stop_event.is_set():
+                return
+            self.feed(message, received_at)
+
+    def _notify_update(self) -> None:
+        self._updated_async.set()
+
+    async def wait_for_update_async(self, timeout: Optional[float] = None) -> bool:
+        """Coroutine counterpart of BinanceOrderBook.wait_for_update."""
+        try:
+            await asyncio.wait_for(self._updated_async.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._updated_async.clear()
+        return True
+
+    def _start_resync_worker(self) -> None:
+        self._resync_task = asyncio.get_running_loop().create_task(self._resync_loop_async())
+
+    async def _resync_loop_async(self) -> None:
+        """Async counterpart of BinanceOrderBook._resync_loop."""
+        backoff = self._RESYNC_BACKOFF_SECONDS
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    bids, asks, last_update_id = await self._fetch_depth_snapshot_async()
+                except (ConnectionError, ValueError) as e:
+                    logging.error(f"[{self.symbol}] Resync snapshot failed: {e}. Retrying in {backoff:.1f}s.")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self._RESYNC_MAX_BACKOFF_SECONDS)
+                    continue
+                if self._install_snapshot(bids, asks, last_update_id):
+                    return
+                logging.info(f"[{self.symbol}] Resync snapshot {last_update_id} is stale. Retrying in {backoff:.1f}s.")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self._RESYNC_MAX_BACKOFF_SECONDS)
+        finally:
+            self._resync_running = False
+
+    async def start(self) -> None:
+        """Connects the stream and synchronizes the book; must be awaited on the target loop."""
+        if self._reader_task and not self._reader_task.done():
+            logging.warning("Order book already running.")
+            return
+
+        logging.info("Starting async Binance Order Book...")
+        self._stop_event.clear()
+        self._is_buffering = True
+        self.is_stale = True
+        self._message_queue.clear()
+        self._session = aiohttp.ClientSession()
+
+        self._reader_task = asyncio.create_task(self._read_frames(), name=f"OrderBookReader-{self.symbol}")
+        self._consumer_task = asyncio.create_task(self._consume_frames(), name=f"OrderBookConsumer-{self.symbol}")
+
+        try:
+            try:
+                await asyncio.wait_for(self._connected.wait(), timeout=self._CONNECT_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                raise ConnectionError(f"WebSocket did not connect within {self._CONNECT_TIMEOUT_SECONDS}s")
+            if self._backend.requires_tick_size and self.tick_size is None:
+                self.tick_size = await self._fetch_tick_size_async()
+            bids, asks, last_update_id = await self._fetch_depth_snapshot_async()
+            if not self._install_snapshot(bids, asks, last_update_id):
+                self._begin_resync("Snapshot is older than the buffered updates")
+            else:
+                logging.info(f"[{self.symbol}] Order book synchronization complete. Tracking real-time updates.")
+        except (ConnectionError, ValueError) as e:
+            logging.error(f"Failed to initialize order book: {e}. Stopping.")
+            await self.stop()
+            raise
+
+    async def stop(self) -> None:
+        """Cancels the reader/consumer/resync tasks and closes the HTTP session."""
+        logging.info("Stopping async Binance Order Book...")
+        self._stop_event.set()
+        tasks = [t for t in (self._reader_task, self._consumer_task, self._resync_task) if t and not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._session:
+            await self._session.close()
+            self._session = None
+        logging.info("Async Binance Order Book stopped.")
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """Returns inbound queue depth and overflow counters."""
+        return {
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "queue_high_water": self.queue_high_water,
+            "overflow_policy": self.overflow,
+            "overflow_count": self.overflow_count,
+            "dropped_messages": self.dropped_messages,
+            "timestamp": time.time(),
+        }
@@ -0,0 +1,663 @@
+import math
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Type, Union
+import numpy as np
+from sortedcontainers import SortedDict
+
+
+# Define type aliases for clarity
+Price = float
+Amount = float
+PriceLevel = Tuple[Price, Amount]
+
+
+class BookSide:
+    """
+    Interface for one side (bids or asks) of an order book.
+
+    Implementations keep price levels ordered best-first: highest price first
+    for bids (descending=True), lowest price first for asks.
+    """
+    requires_tick_size: bool = False
+
+    def __init__(self, descending: bool, tick_size: Optional[float] = None):
+        self.descending = descending
+        self.tick_size = tick_size
+
+    def set(self, price: Price, amount: Amount) -> Amount:
+        """
+        Sets the amount at a price level, removing the level when amount is 0.
+
+        Returns:
+            Amount: The previous amount at that price (0.0 if the level was absent).
+        """
+        raise NotImplementedError
+
+    def get(self, price: Price) -> Amount:
+        """Returns the amount resting at a price level (0.0 if absent)."""
+        raise NotImplementedError
+
+    def top(self, limit: int) -> List[PriceLevel]:
+        """Returns up to `limit` levels, best first."""
+        raise NotImplementedError
+
+    def best(self) -> Optional[PriceLevel]:
+        """Returns the best level, or None if the side is empty."""
+        raise NotImplementedError
+
+    def items(self) -> Iterator[PriceLevel]:
+        """Iterates over all levels, best first."""
+        raise NotImplementedError
+
+    def items_within(self, worst_price: Price) -> Iterator[PriceLevel]:
+        """Iterates over the levels from the best out to `worst_price` (inclusive), best first."""
+        for price, amount in self.items():
+            if price < worst_price if self.descending else price > worst_price:
+                return
+            yield price, amount
+
+    def load(self, prices: np.ndarray, amounts: np.ndarray) -> None:
+        """
+        Replaces the side's contents in one shot, e.g. from a REST snapshot.
+
+        Args:
+            prices (np.ndarray): float64 prices, in any order and without duplicates.
+            amounts (np.ndarray): float64 amounts, all positive.
+        """
+        self.clear()
+        for price, amount in zip(prices.tolist(), amounts.tolist()):
+            self.set(price, amount)
+
+    def trim(self, max_levels: Optional[int] = None, worst_price: Optional[Price] = None) -> List[PriceLevel]:
+        """
+        Drops levels beyond the best `max_levels` and/or worse than `worst_price`.
+
+        Returns:
+            List[PriceLevel]: The dropped levels.
+        """
+        kept = 0
+        removed: List[PriceLevel] = []
+        for price, amount in self.items():
+            worse = worst_price is not None and (price < worst_price if self.descending else price > worst_price)
+            if worse or (max_levels is not None and kept >= max_levels):
+                removed.append((price, amount))
+            else:
+                kept += 1
+        for price, _ in removed:
+            self.set(price, 0.0)
+        return removed
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+class SortedDictSide(BookSide):
+    """
+    Reference backend: a SortedDict keyed by float price.
+
+    Bids are sorted descending by price (highest bid first).
+    Asks are sorted ascending by price (lowest ask first).
+    """
+
+    def __init__(self, descending: bool, tick_size: Optional[float] = None):
+        super().__init__(descending, tick_size)
+        self._levels: SortedDict = SortedDict(lambda k: -Price(k)) if descending else SortedDict(lambda k: Price(k))
+
+    def set(self, price: Price, amount: Amount) -> Amount:
+        if amount == 0:
+            return self._levels.pop(price, 0.0)
+        previous = self._levels.get(price, 0.0)
+        self._levels[price] = amount
+        return previous
+
+    def get(self, price: Price) -> Amount:
+        return self._levels.get(price, 0.0)
+
+    def top(self, limit: int) -> List[PriceLevel]:
+        return list(self._levels.items()[:limit])
+
+    def best(self) -> Optional[PriceLevel]:
+        return self._levels.peekitem(0) if self._levels else None
+
+    def items(self) -> Iterator[PriceLevel]:
+        return iter(self._levels.items())
+
+    def load(self, prices: np.ndarray, amounts: np.ndarray) -> None:
+        # SortedDict sorts a bulk initializer once instead of bisecting per insert
+        self._levels = SortedDict(self._levels.key, zip(prices.tolist(), amounts.tolist()))
+
+    def trim(self, max_levels: Optional[int] = None, worst_price: Optional[Price] = None) -> List[PriceLevel]:
+        levels = self._levels
+        keep = len(levels)
+        if worst_price is not None:
+            # Levels are ordered best-first, so everything at or better than worst_price is a prefix
+            keep = levels.bisect_right(worst_price)
+        if max_levels is not None:
+            keep = min(keep, max_levels)
+        removed: List[PriceLevel] = []
+        while len(levels) > keep:
+            removed.append(levels.popitem(-1))
+        return removed
+
+    def clear(self) -> None:
+        self._levels.clear()
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+
+class TickArraySide(BookSide):
+    """
+    Array-backed backend storing amounts in a contiguous float64 buffer
+    indexed by integer tick (price / tick_size).
+
+    The buffer covers a window of ticks [base, base + capacity) and is
+    re-centred and grown geometrically when a level lands outside it.
+    Level updates are O(1) array writes; the best level is tracked
+    incrementally and top-N reads scan outward from it in vectorised chunks,
+    so their cost is proportional to the number of ticks spanned.
+
+    The window never has to reach more than `max_span_ticks` behind the best
+    level: levels further out (a stray bid at 1.0 under a 60000 market) are
+    kept in a small overflow dict past the window's worse edge instead of
+    growing the buffer to millions of mostly empty slots, and are pulled
+    back into the window when it grows over them. Trims walk out from the
+    best level instead of scanning the whole buffer, apply what is left of
+    the limits to the overflow, and shrink the buffer once it is mostly empty.
+    """
+    requires_tick_size = True
+
+    _INITIAL_CAPACITY = 4096
+    _SCAN_CHUNK = 512
+    _DENSE_WALK = 64
+    _MAX_SPAN_TICKS = 1 << 19 # A buffer of at most 8 MB; 5242.88 either side of the best at a 0.01 tick
+
+    def __init__(self, descending: bool, tick_size: Optional[float] = None, max_span_ticks: Optional[int] = None):
+        """
+        Args:
+            descending (bool): True for bids (highest price first).
+            tick_size (float, optional): Price tick; required before levels are set.
+            max_span_ticks (int, optional): Ticks behind the best level kept in the
+                array window; defaults to _MAX_SPAN_TICKS.
+        """
+        super().__init__(descending, tick_size)
+        if tick_size is not None and tick_size <= 0:
+            raise ValueError("Tick size must be positive.")
+        if max_span_ticks is not None and max_span_ticks < 1:
+            raise ValueError("max_span_ticks must be at least 1.")
+        self.max_span_ticks = max_span_ticks or self._MAX_SPAN_TICKS
+        self._inv_tick = 1.0 / tick_size if tick_size else 0.0
+        # Dividing a tick count by an integral inverse (e.g. 100 for 0.01) rounds correctly,
+        # yielding the same float as parsing the decimal price string.
+        inverse = round(self._inv_tick)
+        self._tick_divisor = float(inverse) if inverse and math.isclose(self._inv_tick, inverse, rel_tol=1e-12) else 0.0
+        self._amounts = array('d')
+        self._base = 0 # Tick represented by index 0
+        self._best = -1 # Index of the best level, -1 when empty
+        self._count = 0 # Levels in the window
+        # Levels past the window's worse edge, tick -> amount; all worse than every level in the window
+        self._far: Dict[int, Amount] = {}
+
+    def _to_tick(self, price: Price) -> int:
+        if not self._inv_tick:
+            raise ValueError("Tick size is not configured for this book side.")
+        return int(round(price * self._inv_tick))
+
+    def _to_price(self, index: int) -> Price:
+        if self._tick_divisor:
+            return (self._base + index) / self._tick_divisor
+        return (self._base + index) * self.tick_size
+
+    def _far_items(self) -> List[PriceLevel]:
+        """Overflow levels, best first."""
+        return [(self._to_price(tick - self._base), self._far[tick]) for tick in sorted(self._far, reverse=self.descending)]
+
+    def _reframe(self, low: int, high: int) -> None:
+        """
+        Moves the window to one sized for ticks low..high, which must cover every
+        level in the buffer, and takes in the overflow levels that now fall inside it.
+        """
+        span = high - low + 1
+        capacity = self._INITIAL_CAPACITY
+        while capacity < 2 * span:
+            capacity *= 2
+        base = low - (capacity - span) // 2
+        framed = array('d', bytes(8 * capacity))
+        start = max(self._base, base)
+        stop = min(self._base + len(self._amounts), base + capacity)
+        if start < stop:
+            framed[start - base:stop - base] = self._amounts[start - self._base:stop - self._base]
+        if self._best >= 0:
+            self._best += self._base - base
+        self._amounts = framed
+        self._base = base
+        for tick in [t for t in self._far if base <= t < base + capacity]:
+            framed[tick - base] = self._far.pop(tick)
+            self._count += 1
+
+    def _ensure_capacity(self, tick: int) -> int:
+        """
+        Grows/re-centres the buffer so `tick` is addressable; returns its index,
+        or -1 when `tick` lies too far behind the best and belongs in the overflow.
+        """
+        index = tick - self._base
+        if 0 <= index < len(self._amounts):
+            return index
+
+        if self._count == 0:
+            # Empty side: centre a fresh window on the incoming tick
+            self._reframe(tick, tick)
+            return tick - self._base
+
+        best = self._base + self._best
+        improves = tick > best if self.descending else tick < best
+        if not improves and abs(tick - best) >= self.max_span_ticks:
+            # Too far behind the best for the window; the overflow keeps it
+            return -1
+
+        view = np.frombuffer(self._amounts, dtype=np.float64)
+        occupied = np.flatnonzero(view)
+        new_best = tick if improves else best
+        # A new best far ahead of the window pushes the levels it leaves behind into the overflow
+        if self.descending:
+            spilled = occupied[occupied < new_best - self.max_span_ticks + 1 - self._base]
+        else:
+            spilled = occupied[occupied > new_best + self.max_span_ticks - 1 - self._base]
+        if spilled.size:
+            for i, amount in zip(spilled.tolist(), view[spilled].tolist()):
+                self._far[self._base + i] = amount
+            view[spilled] = 0.0
+            self._count -= spilled.size
+            occupied = np.setdiff1d(occupied, spilled, assume_unique=True)
+        if not occupied.size:
+            self._best = -1
+            self._reframe(tick, tick)
+            return tick - self._base
+
+        self._best = int(occupied[-1] if self.descending else occupied[0])
+        self._reframe(min(tick, self._base + int(occupied[0])), max(tick, self._base + int(occupied[-1])))
+        return tick - self._base
+
+    def _find_best(self, start: int) -> int:
+        """Scans from `start` towards worse prices for the next occupied index."""
+        view = np.frombuffer(self._amounts, dtype=np.float64)
+        chunk = self._SCAN_CHUNK
+        if self.descending:
+            hi = start + 1
+            while hi > 0:
+                lo = max(0, hi - chunk)
+                nz = np.flatnonzero(view[lo:hi])
+                if nz.size:
+                    return lo + int(nz[-1])
+                hi = lo
+        else:
+            lo = start
+            size = len(view)
+            while lo < size:
+                hi = min(size, lo + chunk)
+                nz = np.flatnonzero(view[lo:hi])
+                if nz.size:
+                    return lo + int(nz[0])
+                lo = hi
+        return -1
+
+    def set(self, price: Price, amount: Amount) -> Amount:
+        tick = self._to_tick(price)
+        amounts = self._amounts
+        index = tick - self._base
+
+        if amount == 0:
+            if not 0 <= index < len(amounts):
+                return self._far.pop(tick, 0.0)
+            previous = amounts[index]
+            if previous:
+                amounts[index] = 0.0
+                self._count -= 1
+                if index == self._best:
+                    self._best = self._find_best(index) if self._count else -1
+                    if self._best < 0 and self._far:
+                        self._refill()
+            return previous
+
+        if not 0 <= index < len(amounts):
+            index = self._ensure_capacity(tick)
+            if index < 0:
+                previous = self._far.get(tick, 0.0)
+                self._far[tick] = amount
+                return previous
+            amounts = self._amounts
+        previous = amounts[index]
+        amounts[index] = amount
+        if not previous:
+            self._count += 1
+            best = self._best
+            if best < 0 or (index > best if self.descending else index < best):
+                self._best = index
+        return previous
+
+    def get(self, price: Price) -> Amount:
+        tick = self._to_tick(price)
+        index = tick - self._base
+        if 0 <= index < len(self._amounts):
+            return self._amounts[index]
+        return self._far.get(tick, 0.0)
+
+    def top(self, limit: int) -> List[PriceLevel]:
+        if self._best < 0 or limit <= 0:
+            return []
+        amounts = self._amounts
+        size = len(amounts)
+        step = -1 if self.descending else 1
+        found: List[int] = []
+
+        # Near the touch books are dense, so a short scalar walk is cheaper than numpy dispatch
+        i = self._best
+        walk_end = max(-1, i - self._DENSE_WALK) if self.descending else min(size, i + self._DENSE_WALK)
+        while i != walk_end:
+            if amounts[i]:
+                found.append(i)
+                if len(found) == limit:
+                    return [(self._to_price(j), amounts[j]) for j in found]
+            i += step
+
+        # Sparse remainder: vectorised chunk scans
+        view = np.frombuffer(amounts, dtype=np.float64)
+        chunk = self._SCAN_CHUNK
+        if self.descending:
+            hi = walk_end + 1
+            while hi > 0 and len(found) < limit:
+                lo = max(0, hi - chunk)
+                found.extend((lo + np.flatnonzero(view[lo:hi])[::-1]).tolist())
+                hi = lo
+        else:
+            lo = walk_end
+            while lo < size and len(found) < limit:
+                hi = min(size, lo + chunk)
+                found.extend((lo + np.flatnonzero(view[lo:hi])).tolist())
+                lo = hi
+        levels = [(self._to_price(j), amounts[j]) for j in found[:limit]]
+        if len(levels) < limit and self._far:
+            levels.extend(self._far_items()[:limit - len(levels)])
+        return levels
+
+    def best(self) -> Optional[PriceLevel]:
+        if self._best < 0:
+            return None
+        return self._to_price(self._best), self._amounts[self._best]
+
+    def items(self) -> Iterator[PriceLevel]:
+        view = np.frombuffer(self._amounts, dtype=np.float64)
+        occupied = np.flatnonzero(view)
+        if self.descending:
+            occupied = occupied[::-1]
+        amounts = self._amounts
+        for i in occupied.tolist():
+            yield self._to_price(i), amounts[i]
+        yield from self._far_items()
+
+    def items_within(self, worst_price: Price) -> Iterator[PriceLevel]:
+        if self._best < 0:
+            return
+        # Only the slice between the best and worst_price is scanned, not the whole buffer
+        view = np.frombuffer(self._amounts, dtype=np.float64)
+        worst = self._to_tick(worst_price) - self._base
+        if self.descending:
+            lo = min(max(0, worst - 1), self._best + 1)
+            occupied = (lo + np.flatnonzero(view[lo:self._best + 1]))[::-1]
+        else:
+            hi = max(min(len(view), worst + 2), self._best)
+            occupied = self._best + np.flatnonzero(view[self._best:hi])
+        amounts = self._amounts
+        for i in occupied.tolist():
+            price = self._to_price(i)
+            if price < worst_price if self.descending else price > worst_price:
+                return
+            yield price, amounts[i]
+        for price, amount in self._far_items():
+            if price < worst_price if self.descending else price > worst_price:
+                return
+            yield price, amount
+
+    def _load_ticks(self, ticks: np.ndarray, amounts: np.ndarray) -> None:
+        """Fills the emptied side: levels within max_span_ticks of the best into the window, the rest into the overflow."""
+        best = int(ticks.max() if self.descending else ticks.min())
+        near = ticks > best - self.max_span_ticks if self.descending else ticks < best + self.max_span_ticks
+        self._far = dict(zip(ticks[~near].tolist(), amounts[~near].tolist()))
+        ticks, amounts = ticks[near], amounts[near]
+        self._reframe(int(ticks.min()), int(ticks.max()))
+        view = np.frombuffer(self._amounts, dtype=np.float64)
+        view[ticks - self._base] = amounts
+        self._count = int(np.count_nonzero(view))
+        self._best = best - self._base
+
+    def _refill(self) -> None:
+        """Rebuilds the window from the overflow once its last level is gone."""
+        far = self._far
+        self.clear()
+        ticks = np.fromiter(far.keys(), dtype=np.int64, count=len(far))
+        self._load_ticks(ticks, np.fromiter(far.values(), dtype=np.float64, count=len(far)))
+
+    def load(self, prices: np.ndarray, amounts: np.ndarray) -> None:
+        self.clear()
+        if not len(prices):
+            return
+        if not self._inv_tick:
+            raise ValueError("Tick size is not configured for this book side.")
+        self._load_ticks(np.rint(prices * self._inv_tick).astype(np.int64), amounts)
+
+    def _levels_from(self, start: int) -> Iterator[np.ndarray]:
+        """Yields the occupied indices from `start` towards worse prices, one chunk at a time."""
+        view = np.frombuffer(self._amounts, dtype=np.float64)
+        chunk = self._SCAN_CHUNK
+        if self.descending:
+            hi = start + 1
+            while hi > 0:
+                lo = max(0, hi - chunk)
+                nz = np.flatnonzero(view[lo:hi])
+                if nz.size:
+                    yield lo + nz[::-1]
+                hi = lo
+        else:
+            lo = start
+            size = len(view)
+            while lo < size:
+                hi = min(size, lo + chunk)
+                nz = np.flatnonzero(view[lo:hi])
+                if nz.size:
+                    yield lo + nz
+                lo = hi
+
+    def _worst_kept_tick(self, worst_price: Price) -> int:
+        """The worst tick priced at or better than `worst_price`, which need not lie on the tick grid."""
+        tick = self._to_tick(worst_price)
+        price = self._to_price(tick - self._base)
+        if self.descending and price < worst_price:
+            return tick + 1
+        if not self.descending and price > worst_price:
+            return tick - 1
+        return tick
+
+    def trim(self, max_levels: Optional[int] = None, worst_price: Optional[Price] = None) -> List[PriceLevel]:
+        removed = self._trim_window(max_levels, worst_price) if self._count else []
+        if self._far:
+            removed.extend(self._trim_far(max_levels, worst_price))
+        return removed
+
+    def _trim_window(self, max_levels: Optional[int], worst_price: Optional[Price]) -> List[PriceLevel]:
+        view = np.frombuffer(self._amounts, dtype=np.float64)
+        best = self._best
+        size = len(view)
+
+        # Indices that may be kept: [best, stop) for asks, (stop, best] for bids
+        if self.descending:
+            stop = -1 if worst_price is None else min(best, max(-1, self._worst_kept_tick(worst_price) - self._base - 1))
+            kept = self._count if stop < 0 else int(np.count_nonzero(view[stop + 1:best + 1]))
+        else:
+            stop = size if worst_price is None else max(best, min(size, self._worst_kept_tick(worst_price) - self._base + 1))
+            kept = self._count if stop >= size else int(np.count_nonzero(view[best:stop]))
+        if max_levels is not None and kept > max_levels:
+            # Walk out from the touch to the last level kept, without scanning the rest
+            seen = 0
+            for indices in self._levels_from(best):
+                if seen + len(indices) >= max_levels:
+                    last = int(indices[max_levels - seen - 1])
+                    break
+                seen += len(indices)
+            stop = last - 1 if self.descending else last + 1
+            kept = max_levels
+        if kept == self._count:
+            return []
+
+        # Collect the dropped levels outward from the cut, stopping at the worst one
+        remaining = self._count - kept
+        dropped: List[int] = []
+        for indices in self._levels_from(stop):
+            dropped.extend(indices[:remaining - len(dropped)].tolist())
+            if len(dropped) == remaining:
+                break
+        amounts = self._amounts
+        removed = [(self._to_price(i), amounts[i]) for i in dropped]
+        view[dropped] = 0.0
+        self._count = kept
+        if not kept:
+            self._best = -1
+        elif self.descending:
+            self._compact(stop + 1, best)
+        else:
+            self._compact(best, stop - 1)
+        return removed
+
+    def _trim_far(self, max_levels: Optional[int], worst_price: Optional[Price]) -> List[PriceLevel]:
+        """Applies the trim limits to the overflow, whose levels rank behind every level in the window."""
+        ticks = sorted(self._far, reverse=self.descending)
+        keep = len(ticks) if max_levels is None else min(len(ticks), max(0, max_levels - self._count))
+        if worst_price is not None:
+            worst = self._worst_kept_tick(worst_price)
+            # Best first, so the ticks at or better than worst_price are a prefix
+            keep = next((i for i, tick in enumerate(ticks[:keep]) if (tick < worst if self.descending else tick > worst)), keep)
+        return [(self._to_price(tick - self._base), self._far.pop(tick)) for tick in ticks[keep:]]
+
+    def _compact(self, low: int, high: int) -> None:
+        """Shrinks the buffer once trimming has left it mostly empty, keeping indices low..high."""
+        capacity = len(self._amounts)
+        if capacity <= self._INITIAL_CAPACITY or 4 * (high - low + 1) > capacity:
+            return
+        self._reframe(self._base + low, self._base + high)
+
+    def clear(self) -> None:
+        self._amounts = array('d')
+        self._base = 0
+        self._best = -1
+        self._count = 0
+        self._far = {}
+
+    def __len__(self) -> int:
+        return self._count + len(self._far)
+
+
+# (price, previous amount, new amount) for each level a diff touched
+LevelChange = Tuple[Price, Amount, Amount]
+
+
+class LevelListener:
+    """
+    Receives every level change applied to a book, so aggregates can be kept
+    current in O(changed levels) per diff instead of re-scanning the ladder.
+    """
+
+    def on_levels(self, bid_changes: List[LevelChange], ask_changes: List[LevelChange]) -> None:
+        raise NotImplementedError
+
+    def reset(self, bids: BookSide, asks: BookSide) -> None:
+        """Rebuilds state from whole sides, e.g. after a snapshot replaced them."""
+        raise NotImplementedError
+
+
+class TopChanges(NamedTuple):
+    """Top-N rows that changed since the previous publish, keyed by depth index."""
+    bids: List[Tuple[int, PriceLevel]]
+    asks: List[Tuple[int, PriceLevel]]
+    removed_bids: List[int] # Depth indexes that no longer hold a level
+    removed_asks: List[int]
+    first_event_time: Optional[int] = None # Exchange event time (E, ms) of the oldest unpublished change
+    last_event_time: Optional[int] = None  # ... and of the newest
+    last_applied_at: Optional[float] = None # Wall time the newest change was applied (latency metrics only)
+
+    def is_empty(self) -> bool:
+        return not (self.bids or self.asks or self.removed_bids or self.removed_asks)
+
+
+class TopNTracker:
+    """
+    Remembers the top-N ladder last published for one book side and reports
+    which depth rows differ from it.
+
+    Updates only mark the tracker dirty when they touch a price at or better
+    than the Nth published level (or anywhere, while the side holds fewer
+    than N levels), so a quiet top of book costs no reads at publish time.
+    """
+
+    def __init__(self, limit: int, descending: bool):
+        self.limit = limit
+        self.descending = descending
+        self.published: List[PriceLevel] = []
+        self.bound: Optional[Price] = None # Nth published price; None while the ladder is short
+        self.dirty = True
+
+    def touch(self, best_changed: Price) -> None:
+        """Notes a change whose best price is `best_changed` (max for bids, min for asks)."""
+        if self.dirty:
+            return
+        bound = self.bound
+        if bound is None or (best_changed >= bound if self.descending else best_changed <= bound):
+            self.dirty = True
+
+    def reset(self) -> None:
+        """Forces a full comparison at the next diff (e.g. after the side was replaced)."""
+        self.dirty = True
+
+    def diff(self, side: BookSide) -> Tuple[List[Tuple[int, PriceLevel]], List[int]]:
+        """
+        Compares the side's current top-N with the published ladder and
+        adopts it as the new published state.
+
+        Returns:
+            Tuple[list, list]: Changed (depth, level) pairs and depths that were emptied.
+        """
+        if not self.dirty:
+            return [], []
+        levels = side.top(self.limit)
+        published = self.published
+        changed = [
+            (i, level) for i, level in enumerate(levels)
+            if i >= len(published) or published[i] != level
+        ]
+        removed = list(range(len(levels), len(published)))
+        self.published = levels
+        self.bound = levels[-1][0] if len(levels) == self.limit else None
+        self.dirty = False
+        return changed, removed
+
+
+BOOK_BACKENDS: Dict[str, Type[BookSide]] = {
+    "sorteddict": SortedDictSide,
+    "array": TickArraySide,
+}
+
+
+def resolve_backend(backend: Union[str, Type[BookSide]]) -> Type[BookSide]:
+    """Looks up a book side backend by name, or passes a BookSide subclass through."""
+    if isinstance(backend, str):
+        try:
+            return BOOK_BACKENDS[backend]
+        except KeyError:
+            raise ValueError(f"Unknown order book backend '{backend}'. Choose from: {', '.join(BOOK_BACKENDS)}.")
+    if isinstance(backend, type) and issubclass(backend, BookSide):
+        return backend
+    raise ValueError("Backend must be a backend name or a BookSide subclass.")
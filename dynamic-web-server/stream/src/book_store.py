@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+import numpy as np
+from src.book import PriceLevel
+
+
+# File layout: an int64 header followed by float64 levels[2][capacity][2]
+# (side 0 = bids best-first, side 1 = asks best-first; each level is price, amount).
+_MAGIC = 0           # Identifies a book store file
+_VERSION = 1
+_SEQ = 2             # Seqlock sequence: odd while a save is in progress (or was interrupted)
+_CAPACITY = 3        # Levels per side the file can hold
+_BID_COUNT = 4
+_ASK_COUNT = 5
+_LAST_UPDATE_ID = 6
+_SAVED_AT_MS = 7     # Wall clock time of the save
+_TICK_SIZE = 8       # float64 stored in an int64 word; 0 when unknown
+_HEADER_WORDS = 16
+_HEADER_BYTES = _HEADER_WORDS * 8
+
+_MAGIC_VALUE = 0x4B4F4F42 # "BOOK"
+_FORMAT_VERSION = 1
+
+
+def _file_size(capacity: int) -> int:
+    return _HEADER_BYTES + 2 * capacity * 2 * 8
+
+
+class PersistedBook(NamedTuple):
+    """A book as last saved by BookStore.save()."""
+    bids: List[PriceLevel]
+    asks: List[PriceLevel]
+    last_update_id: int
+    saved_at: float
+    tick_size: Optional[float]
+
+
+class BookStore:
+    """
+    Persists order books to one memory-mapped file per symbol so a restart
+    can resume from the saved levels instead of a REST snapshot.
+
+    Saves write straight into the mapping under a seqlock (the sequence is
+    odd while levels are being written), so a process killed mid-save leaves
+    a file that load() rejects rather than a torn book. Files grow when a
+    book outgrows them and are otherwise rewritten in place.
+    """
+    _INITIAL_CAPACITY = 1000
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): Where `<SYMBOL>.book` files are kept; created if missing.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._maps: Dict[str, np.memmap] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, symbol: str) -> str:
+        return os.path.join(self.directory, f"{symbol.upper()}.book")
+
+    def _mapping(self, symbol: str, levels: int) -> np.memmap:
+        """Returns a writable mapping for `symbol` with room for `levels` per side."""
+        mapping = self._maps.get(symbol)
+        if mapping is not None:
+            if int(mapping[:_HEADER_BYTES].view(np.int64)[_CAPACITY]) >= levels:
+                return mapping
+            mapping.flush()
+            del self._maps[symbol], mapping
+
+        path = self.path_for(symbol)
+        capacity = self._INITIAL_CAPACITY
+        while capacity < levels:
+            capacity *= 2
+        existing = os.path.getsize(path) if os.path.exists(path) else 0
+        if existing >= _HEADER_BYTES:
+            mapping = np.memmap(path, dtype=np.uint8, mode="r+", shape=existing)
+            header = mapping[:_HEADER_BYTES].view(np.int64)
+            if header[_MAGIC] == _MAGIC_VALUE and header[_VERSION] == _FORMAT_VERSION and header[_CAPACITY] >= levels:
+                self._maps[symbol] = mapping
+                return mapping
+            del header, mapping
+
+        # New file, or one too small or in another format: (re)create it
+        with open(path, "wb") as f:
+            f.truncate(_file_size(capacity))
+        mapping = np.memmap(path, dtype=np.uint8, mode="r+", shape=_file_size(capacity))
+        header = mapping[:_HEADER_BYTES].view(np.int64)
+        header[_SEQ] = 1 # Not loadable until the first save completes
+        header[_CAPACITY] = capacity
+        header[_VERSION] = _FORMAT_VERSION
+        header[_MAGIC] = _MAGIC_VALUE
+        self._maps[symbol] = mapping
+        return mapping
+
+    def save(
+        self,
+        symbol: str,
+        bids: List[PriceLevel],
+        asks: List[PriceLevel],
+        last_update_id: int,
+        tick_size: Optional[float] = None
+    ) -> None:
+        """Writes one book (levels best-first) to its file."""
+        symbol = symbol.upper()
+        with self._lock:
+            mapping = self._mapping(symbol, max(len(bids), len(asks)))
+            header = mapping[:_HEADER_BYTES].view(np.int64)
+            capacity = int(header[_CAPACITY])
+            levels = mapping[_HEADER_BYTES:_file_size(capacity)].view(np.float64).reshape(2, capacity, 2)
+
+            header[_SEQ] |= 1 # Odd: save in progress
+            if bids:
+                levels[0, :len(bids)] = bids
+            if asks:
+                levels[1, :len(asks)] = asks
+            header[_BID_COUNT] = len(bids)
+            header[_ASK_COUNT] = len(asks)
+            header[_LAST_UPDATE_ID] = last_update_id
+            header[_SAVED_AT_MS] = int(time.time() * 1000)
+            header[_TICK_SIZE:_TICK_SIZE + 1].view(np.float64)[0] = tick_size or 0.0
+            header[_SEQ] += 1 # Even: consistent
+
+    def load(self, symbol: str) -> Optional[PersistedBook]:
+        """
+        Reads the last completed save for `symbol`.
+
+        Returns:
+            PersistedBook | None: None if there is no file, it is in another
+                format, or its last save did not complete.
+        """
+        path = self.path_for(symbol)
+        try:
+            size = os.path.getsize(path)
+            if size < _HEADER_BYTES:
+                return None
+            mapping = np.memmap(path, dtype=np.uint8, mode="r", shape=size)
+        except (OSError, ValueError) as e:
+            logging.warning(f"[{symbol}] Could not open persisted book {path}: {e}")
+            return None
+
+        header = mapping[:_HEADER_BYTES].view(np.int64)
+        if header[_MAGIC] != _MAGIC_VALUE or header[_VERSION] != _FORMAT_VERSION:
+            return None
+        capacity = int(header[_CAPACITY])
+        if size < _file_size(capacity):
+            return None
+        seq = int(header[_SEQ])
+        if seq & 1:
+            logging.warning(f"[{symbol}] Persisted book {path} has an incomplete save; ignoring it.")
+            return None
+        levels = mapping[_HEADER_BYTES:_file_size(capacity)].view(np.float64).reshape(2, capacity, 2)
+        bid_count, ask_count = int(header[_BID_COUNT]), int(header[_ASK_COUNT])
+        book = PersistedBook(
+            bids=[(price, amount) for price, amount in levels[0, :bid_count].tolist()],
+            asks=[(price, amount) for price, amount in levels[1, :ask_count].tolist()],
+            last_update_id=int(header[_LAST_UPDATE_ID]),
+            saved_at=int(header[_SAVED_AT_MS]) / 1000.0,
+            tick_size=float(header[_TICK_SIZE:_TICK_SIZE + 1].view(np.float64)[0]) or None,
+        )
+        if int(header[_SEQ]) != seq:
+            return None # Saved over while we were copying
+        return book
+
+    def close(self) -> None:
+        """Flushes and unmaps every open file."""
+        with self._lock:
+            for mapping in self._maps.values():
+                mapping.flush()
+            self._maps.clear()
+
+
+class BookPersister:
+    """
+    Periodically saves a set of books to a BookStore on a background thread,
+    plus a final save on stop().
+
+    Each save copies the book's levels under its lock (see
+    BinanceOrderBook.save_to_store) and writes them after releasing it, so
+    ingestion only pauses for the copy.
+    """
+
+    def __init__(self, store: BookStore, books: Iterable[Any], interval: float = 5.0):
+        """
+        Args:
+            store (BookStore): Destination files.
+            books (Iterable[BinanceOrderBook]): Books to save.
+            interval (float): Seconds between saves.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive.")
+        self.store = store
+        self.books = list(books)
+        self.interval = interval
+        self.saves = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def save_all(self) -> int:
+        """Saves every book that is in sync; returns how many were saved."""
+        saved = 0
+        for book in self.books:
+            try:
+                if book.save_to_store(self.store):
+                    saved += 1
+            except (OSError, ValueError) as e:
+                logging.error(f"[{book.symbol}] Failed to persist order book: {e}")
+        self.saves += saved
+        return saved
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.save_all()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            logging.warning("Book persister already running.")
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="BookPersistThread", daemon=True)
+        self._thread.start()
+        logging.info(f"Persisting {len(self.books)} order books to {self.store.directory} every {self.interval}s.")
+
+    def stop(self) -> None:
+        """Stops the thread and saves once more so a restart resumes from the latest state."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        saved = self.save_all()
+        self.store.close()
+        logging.info(f"Persisted {saved} order books on shutdown.")
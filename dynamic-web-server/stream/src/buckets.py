@@ -0,0 +1,131 @@
+import math
+from typing import Any, Dict, List, Set, Tuple
+from src.book import BookSide, LevelChange, LevelListener
+
+
+def bucket_schema() -> Dict[str, Any]:
+    """Perspective schema shared by every `buckets_<size>` table (indexed on `key`)."""
+    return {
+        "key": str,
+        "side": str,
+        "price": float,
+        "amount": float,
+        "levels": int,
+    }
+
+
+def bucket_table_name(size: float) -> str:
+    return f"buckets_{size:g}"
+
+
+class PriceBuckets(LevelListener):
+    """
+    Aggregated depth per price bucket of width `size` over the whole book.
+
+    Bids are grouped down (a 60000.5 bid falls in the 60000 bucket), asks up
+    (a 60000.5 ask falls in the 60001 bucket), so the best bucket on each
+    side never overlaps the other side. Each diff only adjusts the buckets of
+    the levels it touched and marks them dirty; changes() then returns just
+    those rows, so neither maintenance nor publishing re-buckets the book.
+    """
+    _EPSILON = 1e-12 # Amount below which a bucket counts as empty (float residue)
+    _KEY_DIGITS = 9 # Rounding before floor/ceil so 0.3 / 0.1 lands in bucket 3
+
+    def __init__(self, size: float):
+        """
+        Args:
+            size (float): Bucket width in quote currency, e.g. 10 for $10 buckets.
+        """
+        if size <= 0:
+            raise ValueError("Bucket size must be positive.")
+        self.size = size
+        # bucket index -> [amount, level count]
+        self._bids: Dict[int, List[float]] = {}
+        self._asks: Dict[int, List[float]] = {}
+        self._dirty_bids: Set[int] = set()
+        self._dirty_asks: Set[int] = set()
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty_bids or self._dirty_asks)
+
+    def _bid_key(self, price: float) -> int:
+        return math.floor(round(price / self.size, self._KEY_DIGITS))
+
+    def _ask_key(self, price: float) -> int:
+        return math.ceil(round(price / self.size, self._KEY_DIGITS))
+
+    @staticmethod
+    def _apply(buckets: Dict[int, List[float]], dirty: Set[int], key: int, previous: float, amount: float) -> None:
+        bucket = buckets.get(key)
+        if bucket is None:
+            if not amount:
+                return # Removal of a level we never saw
+            bucket = buckets[key] = [0.0, 0]
+        bucket[0] += amount - previous
+        # Level count only moves when a level appears or disappears
+        if not previous and amount:
+            bucket[1] += 1
+        elif previous and not amount:
+            bucket[1] -= 1
+        dirty.add(key)
+
+    def on_levels(self, bid_changes: List[LevelChange], ask_changes: List[LevelChange]) -> None:
+        bid_key, apply = self._bid_key, self._apply
+        for price, previous, amount in bid_changes:
+            if previous != amount:
+                apply(self._bids, self._dirty_bids, bid_key(price), previous, amount)
+        ask_key = self._ask_key
+        for price, previous, amount in ask_changes:
+            if previous != amount:
+                apply(self._asks, self._dirty_asks, ask_key(price), previous, amount)
+
+    def _rebuild(self, side: BookSide, key_of: Any) -> Dict[int, List[float]]:
+        buckets: Dict[int, List[float]] = {}
+        for price, amount in side.items():
+            bucket = buckets.get(key_of(price))
+            if bucket is None:
+                buckets[key_of(price)] = [amount, 1]
+            else:
+                bucket[0] += amount
+                bucket[1] += 1
+        return buckets
+
+    def reset(self, bids: BookSide, asks: BookSide) -> None:
+        """Re-buckets whole sides; buckets that existed before or after are marked dirty."""
+        self._dirty_bids.update(self._bids)
+        self._dirty_asks.update(self._asks)
+        self._bids = self._rebuild(bids, self._bid_key)
+        self._asks = self._rebuild(asks, self._ask_key)
+        self._dirty_bids.update(self._bids)
+        self._dirty_asks.update(self._asks)
+
+    def _drain(self, side: str, buckets: Dict[int, List[float]], dirty: Set[int], rows: List[Dict[str, Any]], removed: List[str]) -> None:
+        prefix = side[0]
+        for key in dirty:
+            bucket = buckets.get(key)
+            if bucket is None or bucket[1] <= 0 or bucket[0] <= self._EPSILON:
+                buckets.pop(key, None)
+                removed.append(f"{prefix}{key}")
+            else:
+                rows.append({
+                    "key": f"{prefix}{key}",
+                    "side": side,
+                    "price": key * self.size,
+                    "amount": bucket[0],
+                    "levels": int(bucket[1]),
+                })
+        dirty.clear()
+
+    def changes(self) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Returns the buckets touched since the previous call.
+
+        Returns:
+            tuple: (rows to upsert into the bucket table, `key`s to remove).
+        """
+        rows: List[Dict[str, Any]] = []
+        removed: List[str] = []
+        self._drain("bid", self._bids, self._dirty_bids, rows, removed)
+        self._drain("ask", self._asks, self._dirty_asks, rows, removed)
+        return rows, removed
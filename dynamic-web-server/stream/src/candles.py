@@ -0,0 +1,206 @@
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+
+def interval_label(seconds: int) -> str:
+    """Short interval name used in table names and rows: 1s, 1m, 5m, 1h, ..."""
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def candle_schema() -> Dict[str, Any]:
+    """Perspective schema shared by the `candles_<interval>` and `candles_live` tables."""
+    return {
+        "key": str, # "<symbol>@<interval>"; the index of `candles_live`
+        "symbol": str,
+        "interval": str,
+        "open_time": datetime.datetime,
+        "open": float,
+        "high": float,
+        "low": float,
+        "close": float,
+        "volume": float,
+        "quote_volume": float,
+        "vwap": float,
+        "trades": int,
+        "closed": bool,
+    }
+
+
+class CandleSeries:
+    """
+    OHLCV + VWAP candles of one interval for one symbol.
+
+    The in-progress candle is updated in place per trade (a few float
+    compares and adds). When a trade or the clock moves past its end it is
+    closed into a fixed-size numpy ring buffer holding the most recent
+    `capacity` candles, so memory stays constant however long the stream
+    runs. Closed candles not yet published are tracked by count.
+    """
+    _FIELDS = ("open", "high", "low", "close", "volume", "quote_volume")
+
+    def __init__(self, symbol: str, interval_seconds: int, capacity: int = 1000):
+        """
+        Args:
+            symbol (str): Symbol the trades belong to.
+            interval_seconds (int): Candle length.
+            capacity (int): Closed candles kept in the ring buffer.
+        """
+        if interval_seconds < 1:
+            raise ValueError("interval_seconds must be at least 1.")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self.symbol = symbol
+        self.interval_ms = interval_seconds * 1000
+        self.label = interval_label(interval_seconds)
+        self.key = f"{symbol}@{self.label}"
+        self.capacity = capacity
+
+        # Ring buffer of closed candles
+        self._open_time = np.zeros(capacity, dtype=np.int64)
+        self._values = np.zeros((capacity, len(self._FIELDS)), dtype=np.float64)
+        self._trades = np.zeros(capacity, dtype=np.int64)
+        self._head = 0 # Next slot to write
+        self.closed_count = 0
+        self._unpublished = 0
+
+        # In-progress candle
+        self._live_start: Optional[int] = None
+        self._last_closed_start: Optional[int] = None
+        self._open = self._high = self._low = self._close = 0.0
+        self._volume = self._quote_volume = 0.0
+        self._live_trades = 0
+        self._live_dirty = False
+        self.late_trades = 0
+
+    def _close_live(self) -> None:
+        slot = self._head
+        self._open_time[slot] = self._live_start
+        self._values[slot] = (self._open, self._high, self._low, self._close, self._volume, self._quote_volume)
+        self._trades[slot] = self._live_trades
+        self._head = (slot + 1) % self.capacity
+        self.closed_count += 1
+        self._unpublished = min(self._unpublished + 1, self.capacity)
+        self._last_closed_start = self._live_start
+        self._live_start = None
+        self._live_dirty = True # The live row changes (to the next candle, or away)
+
+    def add(self, trade_time: int, price: float, quantity: float) -> None:
+        """Folds one trade (time in ms) into the series."""
+        start = trade_time - trade_time % self.interval_ms
+        live_start = self._live_start
+        last_closed = self._last_closed_start
+        if (live_start is not None and start < live_start) or (last_closed is not None and start <= last_closed):
+            # Belongs to a candle that is already closed (and maybe published),
+            # possibly by roll() before the interval's last trades arrived
+            self.late_trades += 1
+            return
+        if live_start is not None and start != live_start:
+            self._close_live()
+        if self._live_start is None:
+            self._live_start = start
+            self._open = self._high = self._low = self._close = price
+            self._volume = quantity
+            self._quote_volume = price * quantity
+            self._live_trades = 1
+        else:
+            if price > self._high:
+                self._high = price
+            elif price < self._low:
+                self._low = price
+            self._close = price
+            self._volume += quantity
+            self._quote_volume += price * quantity
+            self._live_trades += 1
+        self._live_dirty = True
+
+    def roll(self, now: int) -> None:
+        """Closes the live candle once the clock (ms) has passed its end, even without a new trade."""
+        if self._live_start is not None and now >= self._live_start + self.interval_ms:
+            self._close_live()
+
+    def _row(self, open_time: int, values: Iterable[float], trades: int, closed: bool) -> Dict[str, Any]:
+        open_, high, low, close, volume, quote_volume = values
+        return {
+            "key": self.key,
+            "symbol": self.symbol,
+            "interval": self.label,
+            "open_time": int(open_time),
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "quote_volume": quote_volume,
+            "vwap": quote_volume / volume if volume else close,
+            "trades": int(trades),
+            "closed": closed,
+        }
+
+    def history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns up to `limit` of the most recent closed candles, oldest first."""
+        count = min(self.closed_count, self.capacity)
+        if limit is not None:
+            count = min(count, limit)
+        slots = [(self._head - count + i) % self.capacity for i in range(count)]
+        return [self._row(self._open_time[s], self._values[s].tolist(), self._trades[s], True) for s in slots]
+
+    def drain_closed(self) -> List[Dict[str, Any]]:
+        """Returns the candles closed since the previous call, oldest first."""
+        if not self._unpublished:
+            return []
+        rows = self.history(self._unpublished)
+        self._unpublished = 0
+        return rows
+
+    def live_row(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the in-progress candle if it changed since the previous call.
+        After a candle closes with no successor yet, returns it flagged closed.
+        """
+        if not self._live_dirty:
+            return None
+        self._live_dirty = False
+        if self._live_start is None:
+            return self.history(1)[0]
+        return self._row(
+            self._live_start,
+            (self._open, self._high, self._low, self._close, self._volume, self._quote_volume),
+            self._live_trades,
+            False
+        )
+
+
+class CandleAggregator:
+    """Candle series of several intervals for one symbol, all fed by the same trades."""
+
+    def __init__(self, symbol: str, intervals: Iterable[int] = (1, 60, 300), capacity: int = 1000):
+        self.symbol = symbol
+        self.series: List[CandleSeries] = [CandleSeries(symbol, i, capacity) for i in sorted(set(intervals))]
+
+    def add(self, trade_time: int, price: float, quantity: float) -> None:
+        for series in self.series:
+            series.add(trade_time, price, quantity)
+
+    def changes(self, now: Optional[int] = None) -> Tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        """
+        Closes candles that have ended by `now` (ms) and returns the rows to publish.
+
+        Returns:
+            tuple: ({interval label: newly closed candles}, changed live candles).
+        """
+        closed: Dict[str, List[Dict[str, Any]]] = {}
+        live: List[Dict[str, Any]] = []
+        for series in self.series:
+            if now is not None:
+                series.roll(now)
+            rows = series.drain_closed()
+            if rows:
+                closed[series.label] = rows
+            row = series.live_row()
+            if row is not None:
+                live.append(row)
+        return closed, live
@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.book import TopChanges
+
+# Optional: Arrow IPC updates ("arrow" and "auto" formats)
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+PUBLISH_FORMATS = ("rows", "columns", "arrow", "auto")
+
+
+def format_changes(changes: TopChanges) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Formats changed top-of-book levels as `orderbook` rows.
+
+    Returns:
+        Tuple[list, list]: Rows to upsert and `depth` keys of rows to remove.
+    """
+    rows = [
+        {"depth": f'b{i}', "side": "bid", "price": price, "amount": amount}
+        for i, (price, amount) in changes.bids
+    ]
+    rows.extend(
+        {"depth": f'a{i}', "side": "ask", "price": price, "amount": amount}
+        for i, (price, amount) in changes.asks
+    )
+    removed = [f'b{i}' for i in changes.removed_bids] + [f'a{i}' for i in changes.removed_asks]
+    return rows, removed
+
+
+class LadderEncoder:
+    """
+    Encodes TopChanges for the `orderbook` table's update().
+
+    "rows" is format_changes()' list of row dicts. "columns" is a dict of
+    column lists: Perspective skips per-row key lookups, and the `depth`
+    keys come from cached strings instead of per-row f-strings. "arrow" is
+    an Arrow IPC stream built from preallocated numpy buffers: a tick only
+    writes key indices, prices and amounts into the buffers, wraps them
+    without copying, gathers `depth` from a cached array of the ladder keys
+    and serializes once. The IPC bytes own their data, so the buffers are
+    safely reused even while a publish is still queued on the Perspective
+    loop. "auto" sends small batches as "columns" and larger ones as
+    "arrow", whose fixed per-message cost only pays off with enough rows
+    (see benchmarks/bench_publish.py).
+    """
+    _ARROW_MIN_ROWS = 32 # "auto" switches to Arrow at this many rows
+
+    def __init__(self, levels: int, fmt: str = "arrow"):
+        """
+        Args:
+            levels (int): Ladder depth N (keys b0..bN-1, a0..aN-1).
+            fmt (str): "rows", "columns", "arrow" or "auto" (the last two need pyarrow).
+        """
+        if fmt not in PUBLISH_FORMATS:
+            raise ValueError(f"Publish format must be one of: {', '.join(PUBLISH_FORMATS)}.")
+        if fmt in ("arrow", "auto") and pyarrow is None:
+            raise RuntimeError(f"pyarrow is required for the {fmt} publish format.")
+        self.format = fmt
+        self.levels = 0
+        self._resize(levels)
+
+    def _resize(self, levels: int) -> None:
+        self.levels = levels
+        self._bid_keys = [f"b{i}" for i in range(levels)]
+        self._ask_keys = [f"a{i}" for i in range(levels)]
+        size = 2 * levels
+        self._key_index = np.empty(size, dtype=np.int32)
+        self._side_index = np.empty(size, dtype=np.int8)
+        self._price = np.empty(size, dtype=np.float64)
+        self._amount = np.empty(size, dtype=np.float64)
+        if self.format in ("arrow", "auto"):
+            # Dictionary positions: b0..bN-1, then a0..aN-1
+            self._keys = pyarrow.array(self._bid_keys + self._ask_keys, type=pyarrow.string())
+            self._sides = pyarrow.array(["bid", "ask"], type=pyarrow.string())
+            self._names = ["depth", "side", "price", "amount"]
+
+    def removed_keys(self, changes: TopChanges) -> List[str]:
+        bid_keys, ask_keys = self._bid_keys, self._ask_keys
+        return [bid_keys[i] for i in changes.removed_bids] + [ask_keys[i] for i in changes.removed_asks]
+
+    def encode(self, changes: TopChanges) -> Tuple[Optional[Any], List[str]]:
+        """
+        Returns:
+            tuple: (update data, or None if no rows changed; `depth` keys to remove).
+        """
+        depth = max(
+            max((i for i, _ in changes.bids), default=-1),
+            max((i for i, _ in changes.asks), default=-1),
+            max(changes.removed_bids, default=-1),
+            max(changes.removed_asks, default=-1),
+        ) + 1
+        if depth > self.levels:
+            # A ladder deeper than the encoder was built for
+            self._resize(depth)
+        if self.format == "rows":
+            rows, removed = format_changes(changes)
+            return rows or None, removed
+        removed = self.removed_keys(changes)
+        if not changes.bids and not changes.asks:
+            return None, removed
+        if self.format == "columns" or (
+            self.format == "auto" and len(changes.bids) + len(changes.asks) < self._ARROW_MIN_ROWS
+        ):
+            return self.columns(changes), removed
+        return self._arrow(changes), removed
+
+    def columns(self, changes: TopChanges) -> Dict[str, List[Any]]:
+        """The changed rows as the "columns" format's dict of column lists."""
+        bid_keys, ask_keys = self._bid_keys, self._ask_keys
+        bids, asks = changes.bids, changes.asks
+        return {
+            "depth": [bid_keys[i] for i, _ in bids] + [ask_keys[i] for i, _ in asks],
+            "side": ["bid"] * len(bids) + ["ask"] * len(asks),
+            "price": [level[0] for _, level in bids] + [level[0] for _, level in asks],
+            "amount": [level[1] for _, level in bids] + [level[1] for _, level in asks],
+        }
+
+    def _arrow(self, changes: TopChanges) -> bytes:
+        key_index, side_index, prices, amounts = self._key_index, self._side_index, self._price, self._amount
+        levels = self.levels
+        n = 0
+        for i, (price, amount) in changes.bids:
+            key_index[n] = i
+            side_index[n] = 0
+            prices[n] = price
+            amounts[n] = amount
+            n += 1
+        for i, (price, amount) in changes.asks:
+            key_index[n] = levels + i
+            side_index[n] = 1
+            prices[n] = price
+            amounts[n] = amount
+            n += 1
+        key_positions = pyarrow.array(key_index[:n])
+        if 2 * n >= len(self._keys):
+            # Dense: ship the whole key dictionary once rather than gathering n strings
+            depth = pyarrow.DictionaryArray.from_arrays(key_positions, self._keys)
+        else:
+            # Sparse: Perspective processes every dictionary entry, so send just the keys used
+            depth = self._keys.take(key_positions)
+        batch = pyarrow.RecordBatch.from_arrays([
+            depth,
+            pyarrow.DictionaryArray.from_arrays(pyarrow.array(side_index[:n]), self._sides),
+            pyarrow.array(prices[:n]),
+            pyarrow.array(amounts[:n]),
+        ], names=self._names)
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
@@ -0,0 +1,187 @@
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from src.book import PriceLevel
+
+# Optional fast JSON backends. msgspec decodes straight into a typed struct
+# (converting Binance's decimal strings to floats on the way); orjson only
+# speeds up the JSON parse. The stdlib json module is always available.
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+RawMessage = Union[str, bytes]
+
+if msgspec is not None:
+    class DepthUpdate(msgspec.Struct, gc=False):
+        """A decoded `depthUpdate` event with float price/amount levels."""
+        event_type: str = msgspec.field(name="e")
+        event_time: int = msgspec.field(name="E")
+        symbol: str = msgspec.field(name="s")
+        first_update_id: int = msgspec.field(name="U")
+        final_update_id: int = msgspec.field(name="u")
+        prev_final_update_id: Optional[int] = msgspec.field(name="pu", default=None)
+        bids: List[PriceLevel] = msgspec.field(name="b", default_factory=list)
+        asks: List[PriceLevel] = msgspec.field(name="a", default_factory=list)
+else:
+    class DepthUpdate:
+        """A decoded `depthUpdate` event with float price/amount levels."""
+        __slots__ = (
+            "event_type", "event_time", "symbol", "first_update_id",
+            "final_update_id", "prev_final_update_id", "bids", "asks"
+        )
+
+        def __init__(
+            self,
+            event_type: str,
+            event_time: int,
+            symbol: str,
+            first_update_id: int,
+            final_update_id: int,
+            prev_final_update_id: Optional[int] = None,
+            bids: Optional[List[PriceLevel]] = None,
+            asks: Optional[List[PriceLevel]] = None
+        ):
+            self.event_type = event_type
+            self.event_time = event_time
+            self.symbol = symbol
+            self.first_update_id = first_update_id
+            self.final_update_id = final_update_id
+            self.prev_final_update_id = prev_final_update_id
+            self.bids = bids if bids is not None else []
+            self.asks = asks if asks is not None else []
+
+if msgspec is not None:
+    class CombinedDepthUpdate(msgspec.Struct, gc=False):
+        """A combined-stream envelope: {"stream": "<symbol>@depth", "data": {...}}."""
+        stream: str
+        data: DepthUpdate
+
+
+def depth_update_from_dict(msg_data: Dict[str, Any]) -> DepthUpdate:
+    """Builds a DepthUpdate from an already-parsed depthUpdate payload."""
+    pu = msg_data.get('pu')
+    return DepthUpdate(
+        event_type=msg_data['e'],
+        event_time=int(msg_data.get('E', 0)),
+        symbol=msg_data.get('s', ""),
+        first_update_id=int(msg_data['U']),
+        final_update_id=int(msg_data['u']),
+        prev_final_update_id=int(pu) if pu is not None else None,
+        bids=[(float(p), float(q)) for p, q in msg_data.get('b', [])],
+        asks=[(float(p), float(q)) for p, q in msg_data.get('a', [])],
+    )
+
+
+class DepthDecoder:
+    """
+    Decodes raw depth stream messages into DepthUpdate objects.
+
+    `decode` returns None for well-formed non-depthUpdate events and raises
+    ValueError for malformed messages.
+    """
+    def __init__(self, loads: Callable[[RawMessage], Any] = json.loads, name: str = "json"):
+        self._loads = loads
+        self.name = name
+
+    def loads(self, raw: RawMessage) -> Any:
+        """Parses raw JSON into Python objects with this decoder's JSON backend."""
+        return self._loads(raw)
+
+    def decode(self, raw: RawMessage) -> Optional[DepthUpdate]:
+        try:
+            msg_data = self._loads(raw)
+        except ValueError as e: # json.JSONDecodeError and orjson.JSONDecodeError are ValueErrors
+            raise ValueError(f"Invalid JSON: {e}") from e
+        return self.decode_dict(msg_data)
+
+    def decode_combined(self, raw: RawMessage) -> Tuple[Optional[str], Optional[DepthUpdate]]:
+        """
+        Decodes a combined-stream frame into (stream name, update). Frames
+        without an envelope decode as (None, update).
+        """
+        try:
+            msg_data = self._loads(raw)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+        if isinstance(msg_data, dict) and 'data' in msg_data:
+            return msg_data.get('stream'), self.decode_dict(msg_data['data'])
+        return None, self.decode_dict(msg_data)
+
+    def decode_dict(self, msg_data: Dict[str, Any]) -> Optional[DepthUpdate]:
+        if not isinstance(msg_data, dict):
+            raise ValueError("Depth message is not a JSON object")
+        if msg_data.get('e') != 'depthUpdate':
+            return None
+        try:
+            return depth_update_from_dict(msg_data)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed depthUpdate: {e!r}") from e
+
+
+class MsgspecDepthDecoder(DepthDecoder):
+    """Decodes depthUpdate messages straight into the typed DepthUpdate struct."""
+    def __init__(self):
+        super().__init__(msgspec.json.decode, "msgspec")
+        # strict=False lets msgspec convert Binance's "123.45" strings into floats
+        self._decoder = msgspec.json.Decoder(DepthUpdate, strict=False)
+        self._combined_decoder = msgspec.json.Decoder(CombinedDepthUpdate, strict=False)
+
+    def decode_combined(self, raw: RawMessage) -> Tuple[Optional[str], Optional[DepthUpdate]]:
+        try:
+            envelope = self._combined_decoder.decode(raw)
+        except msgspec.ValidationError:
+            # Subscription acks, other event types, or a bare (non-combined) frame
+            return super().decode_combined(raw)
+        except msgspec.DecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+        if envelope.data.event_type != 'depthUpdate':
+            return envelope.stream, None
+        return envelope.stream, envelope.data
+
+    def decode(self, raw: RawMessage) -> Optional[DepthUpdate]:
+        try:
+            update = self._decoder.decode(raw)
+        except msgspec.ValidationError:
+            # Not shaped like a depthUpdate; find out whether it's another event type
+            try:
+                msg_data = msgspec.json.decode(raw)
+            except msgspec.DecodeError as e:
+                raise ValueError(f"Invalid JSON: {e}") from e
+            return self.decode_dict(msg_data)
+        except msgspec.DecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+        if update.event_type != 'depthUpdate':
+            return None
+        return update
+
+
+DECODERS: Dict[str, Callable[[], DepthDecoder]] = {
+    "json": DepthDecoder,
+}
+if orjson is not None:
+    DECODERS["orjson"] = lambda: DepthDecoder(orjson.loads, "orjson")
+if msgspec is not None:
+    DECODERS["msgspec"] = MsgspecDepthDecoder
+
+
+def get_decoder(name: str = "auto") -> DepthDecoder:
+    """
+    Returns a depth decoder by name ("msgspec", "orjson", "json"), or the
+    fastest one installed for "auto".
+    """
+    if name == "auto":
+        name = next(n for n in ("msgspec", "orjson", "json") if n in DECODERS)
+    try:
+        decoder = DECODERS[name]()
+    except KeyError:
+        raise ValueError(f"Decoder '{name}' is not available. Installed decoders: {', '.join(DECODERS)}.")
+    logging.debug(f"Using '{name}' depth decoder.")
+    return decoder
@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from src.book import PriceLevel, TopChanges
+
+
+def depth_chart_schema() -> Dict[str, Any]:
+    """Columns of the `depth_chart` table, indexed on `key` ("b<i>"/"a<i>" as in `orderbook`)."""
+    return {
+        "key": str,
+        "side": str,
+        "level": int,
+        "price": float,
+        "amount": float,
+        "cumulative_amount": float,   # Amount from the touch out to this level
+        "cumulative_notional": float, # sum(price * amount) over the same levels
+        "signed_cumulative": float,   # cumulative_amount, negative for bids (mirrored depth chart)
+    }
+
+
+class _CumulativeSide:
+    """One side's ladder and its running sums, patched from TopChanges rows."""
+
+    def __init__(self, prefix: str, side: str, levels: int):
+        self.side = side
+        self.sign = -1.0 if side == "bid" else 1.0
+        self.length = 0
+        self._keys = [f"{prefix}{i}" for i in range(levels)]
+        self._price = np.zeros(levels)
+        self._amount = np.zeros(levels)
+        self._cumulative = np.zeros(levels)
+        self._notional = np.zeros(levels)
+
+    def apply(self, changed: List[Tuple[int, PriceLevel]], removed: List[int]) -> Tuple[int, int]:
+        """
+        Applies changed levels and trailing removals, and recomputes the sums
+        from the shallowest change outwards.
+
+        Returns:
+            tuple: [first, stop) range of levels whose rows changed.
+        """
+        if not changed and not removed:
+            return 0, 0
+        first = self.length
+        for i, (price, amount) in changed:
+            self._price[i] = price
+            self._amount[i] = amount
+            first = min(first, i)
+            self.length = max(self.length, i + 1)
+        if removed:
+            self.length = min(self.length, min(removed))
+        stop = self.length
+        if first < stop:
+            base_amount = self._cumulative[first - 1] if first else 0.0
+            base_notional = self._notional[first - 1] if first else 0.0
+            amounts = self._amount[first:stop]
+            np.cumsum(amounts, out=self._cumulative[first:stop])
+            self._cumulative[first:stop] += base_amount
+            np.cumsum(self._price[first:stop] * amounts, out=self._notional[first:stop])
+            self._notional[first:stop] += base_notional
+        return first, stop
+
+    def columns(self, first: int, stop: int, out: Dict[str, List[Any]]) -> None:
+        count = stop - first
+        if count <= 0:
+            return
+        cumulative = self._cumulative[first:stop]
+        out["key"].extend(self._keys[first:stop])
+        out["side"].extend([self.side] * count)
+        out["level"].extend(range(first, stop))
+        out["price"].extend(self._price[first:stop].tolist())
+        out["amount"].extend(self._amount[first:stop].tolist())
+        out["cumulative_amount"].extend(cumulative.tolist())
+        out["cumulative_notional"].extend(self._notional[first:stop].tolist())
+        out["signed_cumulative"].extend((cumulative * self.sign).tolist())
+
+    def removed_keys(self, removed: List[int]) -> List[str]:
+        return [self._keys[i] for i in removed]
+
+
+class DepthChart:
+    """
+    Depth-chart series (cumulative amount and notional by price, per side)
+    for the shared `depth_chart` table.
+
+    Fed the book's top-`levels` changes, it patches its own copy of the
+    ladder and recomputes the running sums only from the shallowest changed
+    level outwards, so the series is derived once per publish on the server
+    and every viewer just reads the table, instead of each view grouping
+    and accumulating the raw `orderbook` rows.
+    """
+
+    def __init__(self, levels: int = 100):
+        """
+        Args:
+            levels (int): Levels per side in the chart.
+        """
+        if levels < 1:
+            raise ValueError("levels must be at least 1.")
+        self.levels = levels
+        self._bids = _CumulativeSide("b", "bid", levels)
+        self._asks = _CumulativeSide("a", "ask", levels)
+
+    def apply(self, changes: TopChanges) -> Tuple[Dict[str, List[Any]], List[str]]:
+        """
+        Returns:
+            tuple: (changed rows as a dict of column lists, empty if none; `key`s to remove).
+        """
+        bid_range = self._bids.apply(changes.bids, changes.removed_bids)
+        ask_range = self._asks.apply(changes.asks, changes.removed_asks)
+        columns: Dict[str, List[Any]] = {name: [] for name in depth_chart_schema()}
+        self._bids.columns(*bid_range, columns)
+        self._asks.columns(*ask_range, columns)
+        removed = self._bids.removed_keys(changes.removed_bids) + self._asks.removed_keys(changes.removed_asks)
+        return (columns if columns["key"] else {}), removed
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import tornado.web
+from perspective import Table
+from src.publisher import PublishStats
+
+
+class Diagnostics:
+    """
+    Samples table and publisher statistics on a low-priority background
+    thread into a ring buffer, so the publishing hot path never creates
+    views or formats tables for inspection.
+
+    Each sample records the table row count, publish and row rates since the
+    previous sample, the age of the last table update and, when a book is
+    attached, its sync state. Samples are served on demand by
+    DiagnosticsHandler (GET /diagnostics?limit=N).
+    """
+    _NICE_INCREMENT = 10 # Linux per-thread niceness for the sampler (best effort)
+
+    def __init__(
+        self,
+        table: Table,
+        publish_stats: PublishStats,
+        order_book: Optional[Any] = None,
+        sample_interval: float = 1.0,
+        history: int = 300
+    ):
+        """
+        Args:
+            table (Table): The Perspective table being published to.
+            publish_stats (PublishStats): Counters shared with the processor.
+            order_book (BinanceOrderBook, optional): Book whose sync state is sampled.
+            sample_interval (float): Seconds between samples.
+            history (int): Number of samples kept.
+        """
+        if sample_interval <= 0:
+            raise ValueError("sample_interval must be positive.")
+        self.table = table
+        self.publish_stats = publish_stats
+        self.order_book = order_book
+        self.sample_interval = sample_interval
+        self._samples: deque = deque(maxlen=history)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous: Optional[Tuple[float, int, int]] = None # (time, publishes, rows)
+
+    def _sample(self) -> Dict[str, Any]:
+        now = time.time()
+        stats = self.publish_stats
+        publishes, rows, last_publish = stats.publishes, stats.rows, stats.last_publish
+        sample: Dict[str, Any] = {
+            "timestamp": now,
+            "table_rows": self.table.size(),
+            "publishes": publishes,
+            "rows_published": rows,
+            "publish_rate": None,
+            "row_rate": None,
+            "last_update_age": now - last_publish if last_publish is not None else None,
+        }
+        if self._previous:
+            then, prev_publishes, prev_rows = self._previous
+            elapsed = now - then
+            if elapsed > 0:
+                sample["publish_rate"] = (publishes - prev_publishes) / elapsed
+                sample["row_rate"] = (rows - prev_rows) / elapsed
+        self._previous = (now, publishes, rows)
+
+        book = self.order_book
+        if book is not None:
+            sample["book"] = {
+                "symbol": book.symbol,
+                "last_update_id": book.last_update_id,
+                "is_stale": book.is_stale,
+                "resync_count": book.resync_count,
+            }
+            if hasattr(book, "get_trim_stats"):
+                sample["book"]["window"] = book.get_trim_stats()
+            if hasattr(book, "get_queue_stats"):
+                sample["book"]["queue"] = book.get_queue_stats()
+        return sample
+
+    def _run(self) -> None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self._NICE_INCREMENT)
+        except (AttributeError, OSError) as e:
+            logging.debug(f"Could not lower diagnostics thread priority: {e}")
+
+        while not self._stop_event.wait(self.sample_interval):
+            try:
+                self._samples.append(self._sample())
+            except Exception as e:
+                logging.error(f"Diagnostics sample failed: {e}")
+
+    def start(self) -> None:
+        """Starts the sampling thread."""
+        if self._thread and self._thread.is_alive():
+            logging.warning("Diagnostics already running.")
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="DiagnosticsThread", daemon=True)
+        self._thread.start()
+        logging.info(f"Diagnostics sampling every {self.sample_interval}s.")
+
+    def stop(self) -> None:
+        """Stops the sampling thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def samples(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns the most recent samples, oldest first."""
+        samples = list(self._samples)
+        return samples[-limit:] if limit else samples
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Returns the most recent sample, if any."""
+        return self._samples[-1] if self._samples else None
+
+    def routes(self) -> List[Tuple[str, type, Dict[str, Any]]]:
+        """Tornado routes serving this instance."""
+        return [(r"/diagnostics", DiagnosticsHandler, {"diagnostics": self})]
+
+
+class DiagnosticsHandler(tornado.web.RequestHandler):
+    """Serves the diagnostics ring buffer as JSON."""
+
+    def initialize(self, diagnostics: Diagnostics) -> None:
+        self.diagnostics = diagnostics
+
+    def get(self) -> None:
+        limit = self.get_argument("limit", None)
+        try:
+            limit = int(limit) if limit else None
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="limit must be an integer")
+        if limit is not None and limit < 0:
+            raise tornado.web.HTTPError(400, reason="limit must not be negative")
+        self.finish({
+            "sample_interval": self.diagnostics.sample_interval,
+            "latest": self.diagnostics.latest(),
+            "samples": self.diagnostics.samples(limit),
+            "publisher": self.diagnostics.publish_stats.summary(),
+        })
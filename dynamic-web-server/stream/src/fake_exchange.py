@@ -0,0 +1,483 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+import tornado.ioloop
+import tornado.web
+import tornado.websocket
+
+
+class SyntheticBook:
+    """
+    A consistent synthetic order book for one symbol.
+
+    Levels are integer ticks around a random-walking mid; bids always sit
+    below the mid and asks above it, so the book never crosses. Every step()
+    mutates the book and returns the matching Binance `depthUpdate` payload,
+    and snapshot() reflects exactly the updates issued so far, so a client
+    following the diff-depth procedure stays in sync. trade() prints a
+    `trade`/`aggTrade` at the touch; trades do not alter the book.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        mid: float = 60000.0,
+        tick_size: float = 0.01,
+        depth: int = 1000,
+        seed: int = 7
+    ):
+        self.symbol = symbol.upper()
+        self.tick_size = tick_size
+        self._decimals = max(0, len(f"{tick_size:f}".rstrip("0").split(".")[1]))
+        self._rng = random.Random(seed)
+        self._mid = int(round(mid / tick_size))
+        self.last_update_id = self._rng.randint(1_000_000, 9_000_000)
+        self.last_trade_id = self._rng.randint(1_000_000, 9_000_000)
+        self.bids: Dict[int, str] = {self._mid - i: self._amount() for i in range(1, depth + 1)}
+        self.asks: Dict[int, str] = {self._mid + i: self._amount() for i in range(1, depth + 1)}
+
+    def _amount(self) -> str:
+        return f"{self._rng.uniform(0.001, 5.0):.8f}"
+
+    def _price(self, tick: int) -> str:
+        return f"{tick * self.tick_size:.{self._decimals}f}"
+
+    def step(self, levels: int = 20) -> Dict[str, Any]:
+        """Advances the book by one diff touching about `levels` price levels."""
+        rng = self._rng
+        changes_b: Dict[int, str] = {}
+        changes_a: Dict[int, str] = {}
+
+        old_mid = self._mid
+        self._mid += int(round(rng.gauss(0, 2)))
+        # Levels the mid moved across must be removed to keep the book uncrossed
+        for tick in range(old_mid + 1, self._mid + 1):
+            if tick in self.asks:
+                changes_a[tick] = "0"
+        for tick in range(self._mid, old_mid):
+            if tick in self.bids:
+                changes_b[tick] = "0"
+
+        half = levels // 2
+        for _ in range(half):
+            tick = self._mid - int(rng.expovariate(1 / 50) + 1)
+            changes_b[tick] = "0" if rng.random() < 0.3 and tick in self.bids else self._amount()
+        for _ in range(levels - half):
+            tick = self._mid + int(rng.expovariate(1 / 50) + 1)
+            changes_a[tick] = "0" if rng.random() < 0.3 and tick in self.asks else self._amount()
+
+        for side, changes in ((self.bids, changes_b), (self.asks, changes_a)):
+            for tick, amount in changes.items():
+                if amount == "0":
+                    side.pop(tick, None)
+                else:
+                    side[tick] = amount
+
+        first_update_id = self.last_update_id + 1
+        self.last_update_id += max(1, len(changes_b) + len(changes_a))
+        return {
+            "e": "depthUpdate",
+            "E": int(time.time() * 1000),
+            "s": self.symbol,
+            "U": first_update_id,
+            "u": self.last_update_id,
+            "b": [[self._price(t), a] for t, a in changes_b.items()],
+            "a": [[self._price(t), a] for t, a in changes_a.items()],
+        }
+
+    def trade(self, aggregate: bool = True) -> Dict[str, Any]:
+        """Returns a Binance `aggTrade` (or `trade`) payload one tick either side of the mid."""
+        rng = self._rng
+        buyer_is_maker = rng.random() < 0.5
+        tick = self._mid - 1 if buyer_is_maker else self._mid + 1
+        now = int(time.time() * 1000)
+        self.last_trade_id += 1
+        payload: Dict[str, Any] = {
+            "e": "aggTrade" if aggregate else "trade",
+            "E": now,
+            "s": self.symbol,
+            "p": self._price(tick),
+            "q": f"{rng.expovariate(1 / 0.05):.8f}",
+            "T": now,
+            "m": buyer_is_maker,
+        }
+        if aggregate:
+            payload.update(a=self.last_trade_id, f=self.last_trade_id, l=self.last_trade_id)
+        else:
+            payload["t"] = self.last_trade_id
+        return payload
+
+    def snapshot(self, limit: int = 100) -> Dict[str, Any]:
+        """Returns a REST `/api/v3/depth` payload for the current book."""
+        bids = sorted(self.bids, reverse=True)[:limit]
+        asks = sorted(self.asks)[:limit]
+        return {
+            "lastUpdateId": self.last_update_id,
+            "bids": [[self._price(t), self.bids[t]] for t in bids],
+            "asks": [[self._price(t), self.asks[t]] for t in asks],
+        }
+
+
+_STREAM_KINDS = ("depth", "trade", "aggTrade")
+
+
+class _DepthStreamHandler(tornado.websocket.WebSocketHandler):
+    """
+    Serves `/ws/<symbol>@<kind>` and `/stream?streams=a@depth@100ms/b@aggTrade`,
+    where kind is `depth` (any speed suffix), `trade` or `aggTrade`.
+    """
+
+    def initialize(self, exchange: "FakeExchange", combined: bool) -> None:
+        self.exchange = exchange
+        self.combined = combined
+        self.symbols: Set[str] = set()
+        self.streams: Dict[str, Dict[str, str]] = {} # symbol -> {kind: stream name}
+
+    def check_origin(self, origin: str) -> bool:
+        return True
+
+    def open(self, stream: Optional[str] = None) -> None:
+        streams = self.get_argument("streams", "") if self.combined else (stream or "")
+        for name in filter(None, streams.split("/")):
+            parts = name.split("@")
+            kind = parts[1] if len(parts) > 1 else "depth"
+            if kind not in _STREAM_KINDS:
+                self.close(1008, f"Unknown stream type: {name}")
+                return
+            self.streams.setdefault(parts[0].upper(), {})[kind] = name
+        self.symbols = set(self.streams)
+        unknown = self.symbols - set(self.exchange.books)
+        if not self.symbols or unknown:
+            self.close(1008, f"Unknown streams: {', '.join(sorted(unknown)) or streams}")
+            return
+        self.exchange.subscribe(self)
+
+    def on_message(self, message: Any) -> None:
+        pass # Subscriptions are fixed by the URL
+
+    def on_close(self) -> None:
+        self.exchange.unsubscribe(self)
+
+
+class _DepthSnapshotHandler(tornado.web.RequestHandler):
+    def initialize(self, exchange: "FakeExchange") -> None:
+        self.exchange = exchange
+
+    def get(self) -> None:
+        book = self.exchange.books.get(self.get_argument("symbol", "").upper())
+        if book is None:
+            self.set_status(400)
+            self.finish({"code": -1121, "msg": "Invalid symbol."})
+            return
+        limit = min(int(self.get_argument("limit", "100")), 5000)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(book.snapshot(limit)))
+
+
+class _ExchangeInfoHandler(tornado.web.RequestHandler):
+    def initialize(self, exchange: "FakeExchange") -> None:
+        self.exchange = exchange
+
+    def get(self) -> None:
+        symbol = self.get_argument("symbol", None)
+        if symbol is None:
+            books = list(self.exchange.books.values())
+        else:
+            books = [self.exchange.books[symbol.upper()]] if symbol.upper() in self.exchange.books else []
+        if not books:
+            self.set_status(400)
+            self.finish({"code": -1121, "msg": "Invalid symbol."})
+            return
+        self.finish({"symbols": [
+            {"symbol": b.symbol, "filters": [{"filterType": "PRICE_FILTER", "tickSize": f"{b.tick_size:.8f}"}]}
+            for b in books
+        ]})
+
+
+class FakeExchange:
+    """
+    Local stand-in for the Binance spot endpoints the stream service uses:
+
+        ws   /ws/<symbol>@depth@100ms           single-symbol diff stream
+        ws   /ws/<symbol>@aggTrade              single-symbol trade stream (or @trade)
+        ws   /stream?streams=<a>@depth@100ms/... combined stream of any of the above
+        GET  /api/v3/depth?symbol=&limit=       REST snapshot
+        GET  /api/v3/exchangeInfo?symbol=       PRICE_FILTER tick size
+
+    Each symbol emits `updates_per_second` diffs (Binance sends 10/s at
+    @100ms; 100-1000 stresses the client at 10-100x) and, to trade stream
+    subscribers, `trades_per_second` trades. Faults can be injected:
+    with `gap_probability` a diff is applied to the book but never sent,
+    which the client must detect and resync from; with `disconnect_interval`
+    every socket is dropped periodically.
+    """
+    _TICK_SECONDS = 0.005 # Emission timer granularity
+    _MAX_BURST_SECONDS = 1.0 # Diffs owed after a stall are capped at this much stream time
+
+    def __init__(
+        self,
+        symbols: Iterable[str] = ("BTCUSDT",),
+        host: str = "127.0.0.1",
+        port: int = 9443,
+        updates_per_second: float = 10.0,
+        levels_per_diff: int = 20,
+        trades_per_second: float = 10.0,
+        depth: int = 1000,
+        tick_size: float = 0.01,
+        gap_probability: float = 0.0,
+        disconnect_interval: Optional[float] = None,
+        seed: int = 7
+    ):
+        """
+        Args:
+            symbols (Iterable[str]): Symbols to simulate.
+            host (str): Interface to bind.
+            port (int): Port for both the WebSocket and REST endpoints.
+            updates_per_second (float): Diffs per second per symbol.
+            levels_per_diff (int): Price levels touched by each diff.
+            trades_per_second (float): Trades per second per symbol on trade streams.
+            depth (int): Initial levels per book side.
+            tick_size (float): Price tick size reported by exchangeInfo.
+            gap_probability (float): Chance that a diff is silently withheld.
+            disconnect_interval (float, optional): Seconds between forced disconnects.
+            seed (int): Seed for reproducible books.
+        """
+        if updates_per_second <= 0:
+            raise ValueError("updates_per_second must be positive.")
+        if not 0.0 <= gap_probability < 1.0:
+            raise ValueError("gap_probability must be in [0, 1).")
+
+        self.host = host
+        self.port = port
+        self.updates_per_second = updates_per_second
+        self.levels_per_diff = levels_per_diff
+        self.trades_per_second = trades_per_second
+        self.gap_probability = gap_probability
+        self.disconnect_interval = disconnect_interval
+        self._rng = random.Random(seed)
+        self.books: Dict[str, SyntheticBook] = {}
+        for i, symbol in enumerate(dict.fromkeys(s.upper() for s in symbols)):
+            mid = 60000.0 / (i + 1)
+            self.books[symbol] = SyntheticBook(symbol, mid=mid, tick_size=tick_size, depth=depth, seed=seed + i)
+        if not self.books:
+            raise ValueError("At least one symbol is required.")
+
+        self._subscribers: Dict[str, Set[_DepthStreamHandler]] = {symbol: set() for symbol in self.books}
+        self._ioloop: Optional[tornado.ioloop.IOLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._timers: List[tornado.ioloop.PeriodicCallback] = []
+        self._emit_start = 0.0
+        self._emitted = 0
+        self._trades_emitted = 0
+
+        # Counters
+        self.diffs_generated = 0
+        self.trades_generated = 0
+        self.messages_sent = 0
+        self.gaps_injected = 0
+        self.disconnects = 0
+
+    @property
+    def wss_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v3"
+
+    def make_app(self) -> tornado.web.Application:
+        return tornado.web.Application([
+            (r"/ws/([^/?]+)", _DepthStreamHandler, {"exchange": self, "combined": False}),
+            (r"/stream", _DepthStreamHandler, {"exchange": self, "combined": True}),
+            (r"/api/v3/depth", _DepthSnapshotHandler, {"exchange": self}),
+            (r"/api/v3/exchangeInfo", _ExchangeInfoHandler, {"exchange": self}),
+        ])
+
+    def subscribe(self, handler: _DepthStreamHandler) -> None:
+        for symbol in handler.symbols:
+            self._subscribers[symbol].add(handler)
+        logging.info(f"Fake exchange client subscribed to {', '.join(sorted(handler.symbols))}.")
+
+    def unsubscribe(self, handler: _DepthStreamHandler) -> None:
+        for subscribers in self._subscribers.values():
+            subscribers.discard(handler)
+
+    def _send(self, symbol: str, kind: str, payload: str) -> None:
+        """Writes one event to every subscriber of `symbol`'s `kind` stream."""
+        for handler in list(self._subscribers[symbol]):
+            stream = handler.streams.get(symbol, {}).get(kind)
+            if stream is None:
+                continue
+            message = f'{{"stream":"{stream}","data":{payload}}}' if handler.combined else payload
+            try:
+                handler.write_message(message)
+                self.messages_sent += 1
+            except tornado.websocket.WebSocketClosedError:
+                self.unsubscribe(handler)
+
+    def _emit_trades(self, now: float) -> None:
+        """Generates the trades owed since the last tick for trade stream subscribers."""
+        due = int((now - self._emit_start) * self.trades_per_second) - self._trades_emitted
+        max_burst = max(1, int(self.trades_per_second * self._MAX_BURST_SECONDS))
+        if due > max_burst:
+            self._trades_emitted += due - max_burst
+            due = max_burst
+        for _ in range(due):
+            for symbol, book in self.books.items():
+                kinds = {kind for handler in self._subscribers[symbol] for kind in handler.streams.get(symbol, ())}
+                for kind in ("aggTrade", "trade"):
+                    if kind in kinds:
+                        self.trades_generated += 1
+                        self._send(symbol, kind, json.dumps(book.trade(aggregate=kind == "aggTrade")))
+        self._trades_emitted += due
+
+    def _emit(self) -> None:
+        """Generates the diffs and trades owed since the last tick and fans them out."""
+        now = time.perf_counter()
+        due = int((now - self._emit_start) * self.updates_per_second) - self._emitted
+        max_burst = max(1, int(self.updates_per_second * self._MAX_BURST_SECONDS))
+        if due > max_burst:
+            # The loop stalled; skip ahead rather than flooding clients
+            self._emitted += due - max_burst
+            due = max_burst
+
+        for _ in range(due):
+            for symbol, book in self.books.items():
+                update = book.step(self.levels_per_diff)
+                self.diffs_generated += 1
+                if self.gap_probability and self._rng.random() < self.gap_probability:
+                    self.gaps_injected += 1
+                    continue
+                if self._subscribers[symbol]:
+                    self._send(symbol, "depth", json.dumps(update))
+        self._emitted += due
+        if self.trades_per_second > 0:
+            self._emit_trades(now)
+
+    def _disconnect_all(self) -> None:
+        handlers = set().union(*self._subscribers.values())
+        if handlers:
+            logging.info(f"Fake exchange dropping {len(handlers)} connection(s).")
+        for handler in handlers:
+            self.disconnects += 1
+            self.unsubscribe(handler)
+            handler.close(1001, "Injected disconnect")
+
+    def _log_stats(self) -> None:
+        stats = self.get_stats()
+        logging.info(
+            f"Fake exchange: {stats['diffs_generated']} diffs, {stats['trades_generated']} trades, {stats['messages_sent']} sent, "
+            f"{stats['gaps_injected']} gaps, {stats['disconnects']} disconnects, {stats['clients']} clients"
+        )
+
+    def _install(self) -> None:
+        """Binds the app and starts the timers on the current IOLoop."""
+        self._ioloop = tornado.ioloop.IOLoop.current()
+        self.make_app().listen(self.port, address=self.host)
+        self._emit_start = time.perf_counter()
+        self._emitted = 0
+        self._trades_emitted = 0
+        self._timers = [tornado.ioloop.PeriodicCallback(self._emit, self._TICK_SECONDS * 1000)]
+        if self.disconnect_interval:
+            self._timers.append(tornado.ioloop.PeriodicCallback(self._disconnect_all, self.disconnect_interval * 1000))
+        for timer in self._timers:
+            timer.start()
+        logging.info(
+            f"Fake exchange listening on {self.wss_url} ({', '.join(self.books)}; "
+            f"{self.updates_per_second:g} diffs/s/symbol, gap p={self.gap_probability}, "
+            f"disconnect every {self.disconnect_interval or 'never'}s)"
+        )
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self._install()
+        self._started.set()
+        self._ioloop.start()
+
+    def start(self) -> None:
+        """Runs the exchange on its own IOLoop in a background thread."""
+        if self._thread and self._thread.is_alive():
+            logging.warning("Fake exchange already running.")
+            return
+        self._started.clear()
+        self._thread = threading.Thread(target=self._run, name="FakeExchangeThread", daemon=True)
+        self._thread.start()
+        if not self._started.wait(timeout=10):
+            raise RuntimeError("Fake exchange failed to start.")
+
+    def stop(self) -> None:
+        """Stops the timers and the IOLoop thread."""
+        if not self._ioloop:
+            return
+
+        def _shutdown() -> None:
+            for timer in self._timers:
+                timer.stop()
+            self._ioloop.stop()
+
+        self._ioloop.add_callback(_shutdown)
+        if self._thread:
+            self._thread.join(timeout=5)
+            if self._thread.is_alive():
+                logging.warning("Fake exchange thread did not terminate cleanly.")
+        logging.info("Fake exchange stopped.")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "diffs_generated": self.diffs_generated,
+            "trades_generated": self.trades_generated,
+            "messages_sent": self.messages_sent,
+            "gaps_injected": self.gaps_injected,
+            "disconnects": self.disconnects,
+            "clients": len(set().union(*self._subscribers.values())),
+            "timestamp": time.time(),
+        }
+
+
+def main() -> None:
+    """Runs the fake exchange in the foreground."""
+    parser = argparse.ArgumentParser(description="Local fake Binance depth stream + REST server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9443)
+    parser.add_argument("--symbols", default="BTCUSDT", help="Comma-separated symbols.")
+    parser.add_argument("--rate", type=float, default=10.0, help="Diffs per second per symbol (Binance: 10).")
+    parser.add_argument("--levels", type=int, default=20, help="Price levels per diff.")
+    parser.add_argument("--trade-rate", type=float, default=10.0, help="Trades per second per symbol on trade streams.")
+    parser.add_argument("--depth", type=int, default=1000, help="Initial levels per side.")
+    parser.add_argument("--tick-size", type=float, default=0.01)
+    parser.add_argument("--gap-probability", type=float, default=0.0)
+    parser.add_argument("--disconnect-interval", type=float, default=None, help="Seconds between forced disconnects.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(process)d [%(threadName)s] %(levelname)s: %(message)s")
+
+    exchange = FakeExchange(
+        symbols=[s.strip() for s in args.symbols.split(",") if s.strip()],
+        host=args.host,
+        port=args.port,
+        updates_per_second=args.rate,
+        levels_per_diff=args.levels,
+        trades_per_second=args.trade_rate,
+        depth=args.depth,
+        tick_size=args.tick_size,
+        gap_probability=args.gap_probability,
+        disconnect_interval=args.disconnect_interval,
+        seed=args.seed
+    )
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    exchange._install()
+    tornado.ioloop.PeriodicCallback(exchange._log_stats, 10_000).start()
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    except KeyboardInterrupt:
+        logging.info("Fake exchange interrupted.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import tornado.web
+
+# Optional: Arrow IPC responses for GET /history?format=arrow. The raw binary
+# format needs only numpy.
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+# Column name -> dtype, in storage and response order
+HISTORY_COLUMNS: Tuple[Tuple[str, Any], ...] = (
+    ("timestamp", np.int64), # Event time E of the update (ms)
+    ("bid", np.float64),
+    ("ask", np.float64),
+    ("bid_size", np.float64),
+    ("ask_size", np.float64),
+    ("spread", np.float64),
+    ("imbalance", np.float64), # (bid_size - ask_size) / (bid_size + ask_size) at the touch
+)
+
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class TopOfBookHistory:
+    """
+    Columnar ring buffer of top-of-book states for one symbol.
+
+    One preallocated numpy array per column holds the most recent `capacity`
+    rows; append() writes one slot per column, so recording costs the same
+    however long the stream runs. A row is only appended when the touch
+    (best prices or sizes) actually changed, making the history a step
+    function of the top of book. Timestamps never decrease, so query()
+    slices a time range with two binary searches and returns column arrays
+    without building per-row Python objects.
+    """
+
+    def __init__(self, symbol: str, capacity: int = 100_000):
+        """
+        Args:
+            symbol (str): Symbol the history belongs to.
+            capacity (int): Rows kept; older rows are overwritten.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self.symbol = symbol
+        self.capacity = capacity
+        self._columns: Dict[str, np.ndarray] = {name: np.zeros(capacity, dtype=dtype) for name, dtype in HISTORY_COLUMNS}
+        self._head = 0 # Next slot to write
+        self._count = 0
+        self._last: Optional[Tuple[float, float, float, float]] = None
+        self._last_timestamp = 0
+        self._lock = threading.Lock()
+        self.appended = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: int, bid: float, bid_size: float, ask: float, ask_size: float) -> bool:
+        """
+        Records the touch at `timestamp` (ms) unless it equals the last recorded
+        one. Returns whether a row was appended.
+        """
+        touch = (bid, bid_size, ask, ask_size)
+        if touch == self._last:
+            return False
+        self._last = touch
+        # Exchange event times can repeat or, across a resync, step back; keep the index sorted
+        if timestamp < self._last_timestamp:
+            timestamp = self._last_timestamp
+        self._last_timestamp = timestamp
+        depth = bid_size + ask_size
+        columns = self._columns
+        with self._lock:
+            slot = self._head
+            columns["timestamp"][slot] = timestamp
+            columns["bid"][slot] = bid
+            columns["ask"][slot] = ask
+            columns["bid_size"][slot] = bid_size
+            columns["ask_size"][slot] = ask_size
+            columns["spread"][slot] = ask - bid
+            columns["imbalance"][slot] = (bid_size - ask_size) / depth if depth else 0.0
+            self._head = (slot + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+        self.appended += 1
+        return True
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        """Slot ranges [start, stop) holding the rows, oldest first."""
+        if self._count < self.capacity:
+            return [(0, self._count)]
+        return [(self._head, self.capacity), (0, self._head)]
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Returns the rows with start <= timestamp < end (ms), oldest first.
+
+        Args:
+            start (int, optional): Inclusive lower bound; from the oldest row if None.
+            end (int, optional): Exclusive upper bound; to the newest row if None.
+            limit (int, optional): Keep only the newest `limit` rows of the range.
+
+        Returns:
+            dict: Column name -> newly allocated numpy array, in HISTORY_COLUMNS order.
+        """
+        with self._lock:
+            timestamps = self._columns["timestamp"]
+            ranges = []
+            for lo, hi in self._segments():
+                segment = timestamps[lo:hi]
+                first = lo + (int(np.searchsorted(segment, start, "left")) if start is not None else 0)
+                last = lo + (int(np.searchsorted(segment, end, "left")) if end is not None else hi - lo)
+                if last > first:
+                    ranges.append((first, last))
+            if limit is not None:
+                remaining = limit
+                kept = []
+                for first, last in reversed(ranges):
+                    if remaining <= 0:
+                        break
+                    first = max(first, last - remaining)
+                    remaining -= last - first
+                    kept.append((first, last))
+                ranges = kept[::-1]
+            return {
+                name: np.concatenate([column[first:last] for first, last in ranges]) if ranges else column[:0].copy()
+                for name, column in self._columns.items()
+            }
+
+
+def to_binary(columns: Dict[str, np.ndarray]) -> Tuple[bytes, str]:
+    """
+    Packs query() columns into one little-endian buffer (each column's values
+    back to back, in order).
+
+    Returns:
+        tuple: (body, layout) where layout is "name:dtype,..." with numpy
+            dtype strings, e.g. "timestamp:<i8,bid:<f8,...".
+    """
+    arrays = [np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")) for array in columns.values()]
+    layout = ",".join(f"{name}:{array.dtype.str}" for name, array in zip(columns, arrays))
+    return b"".join(array.tobytes() for array in arrays), layout
+
+
+def to_arrow(columns: Dict[str, np.ndarray]) -> bytes:
+    """Serializes query() columns as an Arrow IPC stream (one record batch). Requires pyarrow."""
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is not installed.")
+    fields = []
+    arrays = []
+    for name, array in columns.items():
+        if name == "timestamp":
+            fields.append(pyarrow.field(name, pyarrow.timestamp("ms")))
+            arrays.append(pyarrow.array(array, type=pyarrow.timestamp("ms")))
+        else:
+            fields.append(pyarrow.field(name, pyarrow.from_numpy_dtype(array.dtype)))
+            arrays.append(pyarrow.array(array))
+    batch = pyarrow.RecordBatch.from_arrays(arrays, schema=pyarrow.schema(fields))
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+class BookHistories:
+    """Per-symbol TopOfBookHistory buffers, served by HistoryHandler (GET /history)."""
+
+    def __init__(self, capacity: int = 100_000):
+        """
+        Args:
+            capacity (int): Rows kept per symbol.
+        """
+        self.capacity = capacity
+        self.histories: Dict[str, TopOfBookHistory] = {}
+        self._lock = threading.Lock()
+
+    def for_symbol(self, symbol: str) -> TopOfBookHistory:
+        """Returns the symbol's history, creating it on first use."""
+        symbol = symbol.upper()
+        with self._lock:
+            history = self.histories.get(symbol)
+            if history is None:
+                history = self.histories[symbol] = TopOfBookHistory(symbol, self.capacity)
+            return history
+
+    def routes(self) -> List[Tuple[str, type, Dict[str, Any]]]:
+        """Tornado routes serving this instance."""
+        return [(r"/history", HistoryHandler, {"histories": self})]
+
+
+class HistoryHandler(tornado.web.RequestHandler):
+    """
+    Serves a time range of one symbol's top-of-book history.
+
+        GET /history?symbol=BTCUSDT&start=<ms>&end=<ms>&limit=<rows>&format=binary|arrow|json
+
+    `binary` (default) is the columns back to back, described by the
+    X-History-Columns ("name:dtype,...") and X-History-Rows headers; `arrow`
+    is an Arrow IPC stream (needs pyarrow); `json` is column lists for debugging.
+    """
+
+    def initialize(self, histories: BookHistories) -> None:
+        self.histories = histories
+
+    def _int_argument(self, name: str) -> Optional[int]:
+        value = self.get_argument(name, None)
+        if value is None or value == "":
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"{name} must be an integer")
+
+    def get(self) -> None:
+        symbol = self.get_argument("symbol", "").upper()
+        history = self.histories.histories.get(symbol)
+        if history is None:
+            raise tornado.web.HTTPError(404, reason=f"No history for symbol {symbol!r}")
+        start, end, limit = self._int_argument("start"), self._int_argument("end"), self._int_argument("limit")
+        fmt = self.get_argument("format", "binary")
+        if fmt not in ("binary", "arrow", "json"):
+            raise tornado.web.HTTPError(400, reason="format must be binary, arrow or json")
+        if fmt == "arrow" and pyarrow is None:
+            raise tornado.web.HTTPError(501, reason="pyarrow is not installed; use format=binary")
+
+        columns = history.query(start, end, limit)
+        rows = len(columns["timestamp"])
+        self.set_header("X-History-Rows", str(rows))
+        if fmt == "json":
+            self.finish({"symbol": symbol, "rows": rows, "columns": {name: array.tolist() for name, array in columns.items()}})
+        elif fmt == "arrow":
+            self.set_header("Content-Type", ARROW_CONTENT_TYPE)
+            self.finish(to_arrow(columns))
+        else:
+            body, layout = to_binary(columns)
+            self.set_header("Content-Type", "application/octet-stream")
+            self.set_header("X-History-Columns", layout)
+            self.finish(body)
@@ -0,0 +1,283 @@
+import logging
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
+from websocket import WebSocketApp
+from src.binance import BinanceOrderBook
+from src.book import BookSide, Price, PriceLevel, TopChanges
+from src.book_store import BookPersister, BookStore
+from src.decoder import get_decoder
+from src.metrics import LatencyMetrics
+from src.replay import DepthRecorder
+
+
+class OrderBookManager:
+    """
+    Maintains order books for many symbols over a single Binance
+    combined-stream WebSocket (`/stream?streams=a@depth@100ms/b@depth@100ms`).
+
+    One socket and one thread carry every symbol's diffs; frames are decoded
+    once and routed to per-symbol BinanceOrderBook instances, which never open
+    their own connections. Each book follows the usual buffer / snapshot /
+    replay synchronization, with REST snapshots fetched concurrently but at
+    most `max_concurrent_snapshots` at a time (including gap resyncs) to
+    stay within rate limits.
+    """
+    _BASE_WSS_URL = "wss://stream.binance.com:9443/stream"
+    _MAX_STREAMS_PER_CONNECTION = 1024 # Binance's limit for a combined stream
+    _RECONNECT_DELAY_SECONDS = 1.0
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        snapshot_limit: int = 1000,
+        backend: Union[str, Type[BookSide]] = "sorteddict",
+        decoder: str = "auto",
+        max_concurrent_snapshots: int = 4,
+        recorder: Optional[DepthRecorder] = None,
+        base_wss_url: Optional[str] = None,
+        base_api_url: Optional[str] = None,
+        max_levels: Optional[int] = None,
+        max_distance_pct: Optional[float] = None,
+        store_dir: Optional[str] = None,
+        persist_interval: float = 5.0,
+        metrics: Optional[LatencyMetrics] = None
+    ):
+        """
+        Initializes the OrderBookManager instance.
+
+        Args:
+            symbols (Iterable[str]): Trading symbols to track (e.g., ["BTCUSDT", "ETHUSDT"]).
+            snapshot_limit (int): The number of levels for each initial snapshot (max 1000).
+            backend (str | Type[BookSide]): Book side storage passed to every BinanceOrderBook.
+            decoder (str): Depth message decoder used for the combined stream.
+            max_concurrent_snapshots (int): Upper bound on in-flight REST snapshot requests.
+            recorder (DepthRecorder, optional): Logs every combined-stream frame and
+                snapshot for later replay.
+            base_wss_url (str, optional): Overrides the combined-stream endpoint
+                (_BASE_WSS_URL), e.g. "ws://127.0.0.1:9443/stream" for the fake exchange.
+            base_api_url (str, optional): Overrides every book's REST base URL.
+            max_levels (int, optional): Per-side level cap for every book (see BinanceOrderBook).
+            max_distance_pct (float, optional): Distance-from-mid window for every book.
+            store_dir (str, optional): Directory of memory-mapped book files. Books are
+                saved there every `persist_interval` seconds and on stop(), and start()
+                resumes from them where the stream allows, instead of REST snapshots.
+            persist_interval (float): Seconds between saves when `store_dir` is set.
+            metrics (LatencyMetrics, optional): Per-symbol latency histograms for the
+                combined stream's receive/decode/apply stages and the books' publishes.
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        if not symbols:
+            raise ValueError("At least one symbol is required.")
+        if len(symbols) > self._MAX_STREAMS_PER_CONNECTION:
+            raise ValueError(f"A combined stream carries at most {self._MAX_STREAMS_PER_CONNECTION} symbols.")
+        if max_concurrent_snapshots < 1:
+            raise ValueError("max_concurrent_snapshots must be at least 1.")
+
+        self.max_concurrent_snapshots = max_concurrent_snapshots
+        # Shared by every book so gap resyncs after a disconnect can't stampede the REST API
+        snapshot_slots = threading.BoundedSemaphore(max_concurrent_snapshots)
+        # Set by every book alongside its own publisher signal (see wait_for_update)
+        self._updated = threading.Event()
+        self._store = BookStore(store_dir) if store_dir else None
+        self._persist_interval = persist_interval
+        self._persister: Optional[BookPersister] = None
+        self.books: Dict[str, BinanceOrderBook] = {
+            symbol: BinanceOrderBook(
+                symbol=symbol,
+                snapshot_limit=snapshot_limit,
+                backend=backend,
+                decoder=decoder,
+                snapshot_slots=snapshot_slots,
+                recorder=recorder,
+                base_api_url=base_api_url,
+                max_levels=max_levels,
+                max_distance_pct=max_distance_pct,
+                store=self._store,
+                metrics=metrics,
+                update_event=self._updated
+            )
+            for symbol in symbols
+        }
+        streams = "/".join(f"{symbol.lower()}@depth@100ms" for symbol in symbols)
+        self.base_wss_url = (base_wss_url or self._BASE_WSS_URL).rstrip("/")
+        self._stream_url = f"{self.base_wss_url}?streams={streams}"
+        self._decoder = get_decoder(decoder)
+        self._recorder = recorder
+        self._metrics = metrics
+
+        self._ws: Optional[WebSocketApp] = None
+        self._ws_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.books)
+
+    def _on_message(self, ws: WebSocketApp, message: str) -> None:
+        """Decodes a combined-stream frame and routes it to its symbol's book."""
+        if self._stop_event.is_set():
+            return
+        metrics = self._metrics
+        received_at = time.time() if metrics is not None else None
+        if self._recorder:
+            self._recorder.record_frame(message, received_at)
+        try:
+            _, update = self._decoder.decode_combined(message)
+        except ValueError as e:
+            logging.error(f"Error decoding combined stream message: {e} - Data: {message[:100]}...")
+            return
+        if update is None:
+            logging.debug(f"Skipping non-depthUpdate message: {message[:100]}")
+            return
+
+        book = self.books.get(update.symbol)
+        if book is None:
+            logging.debug(f"Dropping update for untracked symbol {update.symbol}")
+            return
+        if metrics is None:
+            book.handle_update(update)
+            return
+        decoded_at = time.time()
+        book.handle_update(update)
+        metrics.record_ingest(update.symbol, update.event_time, received_at, decoded_at, time.time())
+
+    def _on_close(self, ws: WebSocketApp, close_status_code: Optional[int], close_msg: Optional[str]) -> None:
+        """Handles WebSocket connection close."""
+        if self._stop_event.is_set():
+            logging.info("Combined stream connection closed normally.")
+            return
+        logging.warning(f"Combined stream closed: Status={close_status_code}, Msg={close_msg}")
+        # Every book missed diffs while disconnected, so each buffers and takes a fresh snapshot
+        for book in list(self.books.values()):
+            with book._lock:
+                book._begin_resync("Combined stream closed")
+
+    def _on_open(self, ws: WebSocketApp) -> None:
+        """Handles WebSocket connection open."""
+        logging.info(f"Combined stream connection opened for {len(self.books)} symbols.")
+
+    def _on_error(self, ws: WebSocketApp, error: Exception) -> None:
+        """Handles WebSocket errors."""
+        logging.error(f"Combined stream error: {error}")
+
+    def _run_websocket(self) -> None:
+        """Runs the combined-stream WebSocketApp, reconnecting until stopped."""
+        while not self._stop_event.is_set():
+            logging.info(f"Connecting to combined stream: {self._stream_url[:200]}")
+            self._ws = WebSocketApp(
+                self._stream_url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            self._ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
+            if self._stop_event.wait(self._RECONNECT_DELAY_SECONDS):
+                break
+        logging.info("Combined stream run_forever loop exited.")
+
+    def _synchronize_all(self) -> List[str]:
+        """Synchronizes every book with bounded parallelism; returns the symbols that failed."""
+        failed: List[str] = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_snapshots, thread_name_prefix="SnapshotWorker") as pool:
+            futures = {pool.submit(book.synchronize): symbol for symbol, book in self.books.items()}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    future.result()
+                except (ConnectionError, ValueError) as e:
+                    logging.error(f"[{symbol}] Failed to synchronize order book: {e}")
+                    failed.append(symbol)
+        return failed
+
+    def start(self) -> None:
+        """Opens the combined stream and synchronizes every book."""
+        if self._ws_thread and self._ws_thread.is_alive():
+            logging.warning("Order book manager already running.")
+            return
+
+        logging.info(f"Starting order book manager for {len(self.books)} symbols...")
+        self._stop_event.clear()
+
+        # Start WebSocket in a separate thread; books buffer diffs until their snapshot lands
+        self._ws_thread = threading.Thread(target=self._run_websocket, name="OrderBookStreamThread", daemon=True)
+        self._ws_thread.start()
+
+        failed = self._synchronize_all()
+        for symbol in failed:
+            # Stop routing to books that never synchronized so their buffers don't grow forever,
+            # and stop any resync a stream drop started for them
+            self.books.pop(symbol).stop()
+        if not self.books:
+            self.stop()
+            raise ConnectionError("No order book could be synchronized.")
+        if self._store is not None:
+            self._persister = BookPersister(self._store, self.books.values(), self._persist_interval)
+            self._persister.start()
+        warm = sum(book.warm_starts for book in self.books.values())
+        logging.info(f"Order book manager tracking {len(self.books)} symbols ({len(failed)} failed, {warm} warm-started).")
+
+    def stop(self) -> None:
+        """Stops the combined stream and shuts down gracefully."""
+        logging.info("Stopping order book manager...")
+        self._stop_event.set()
+        if self._persister is not None:
+            # Final save while the books are still current
+            self._persister.stop()
+            self._persister = None
+        for book in self.books.values():
+            book.stop()
+
+        if self._ws:
+            self._ws.close()
+
+        if self._ws_thread and self._ws_thread.is_alive():
+            logging.debug("Waiting for combined stream thread to join...")
+            self._ws_thread.join(timeout=5)
+            if self._ws_thread.is_alive():
+                logging.warning("Combined stream thread did not join cleanly.")
+
+        logging.info("Order book manager stopped.")
+
+
+    # --- Public methods ---
+
+    def wait_for_update(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until any book has applied an update that may change a published
+        top-N ladder since the previous call, or until `timeout` seconds pass.
+        Lets one publisher serve many books (see wait_for_batch).
+
+        Returns:
+            bool: True if woken by an update, False on timeout.
+        """
+        if self._updated.wait(timeout):
+            self._updated.clear()
+            return True
+        return False
+
+    def get_book(self, symbol: str) -> BinanceOrderBook:
+        """Returns the order book for a tracked symbol."""
+        try:
+            return self.books[symbol.upper()]
+        except KeyError:
+            raise KeyError(f"Symbol {symbol} is not tracked.")
+
+    def get_bids(self, symbol: str, limit: int = 10) -> List[PriceLevel]:
+        """Returns the top N bid levels for a symbol."""
+        return self.get_book(symbol).get_bids(limit)
+
+    def get_asks(self, symbol: str, limit: int = 10) -> List[PriceLevel]:
+        """Returns the top N ask levels for a symbol."""
+        return self.get_book(symbol).get_asks(limit)
+
+    def get_top_changes(self, symbol: str, limit: int = 10) -> TopChanges:
+        """Returns the top-N rows of a symbol's book that changed since the last call."""
+        return self.get_book(symbol).get_top_changes(limit)
+
+    def get_spread(self, symbol: str) -> Optional[Tuple[Price, Price]]:
+        """Returns the best bid and best ask for a symbol."""
+        return self.get_book(symbol).get_spread()
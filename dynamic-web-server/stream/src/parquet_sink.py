@@ -0,0 +1,314 @@
+import datetime
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Optional: only needed when a sink is configured (PARQUET_DIR)
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# A batch is either row dicts or a dict of equal-length column lists
+Batch = Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+
+
+def _batch_rows(batch: Batch) -> int:
+    if isinstance(batch, dict):
+        return len(next(iter(batch.values()), []))
+    return len(batch)
+
+
+def arrow_schema(schema: Dict[str, Any]) -> Any:
+    """
+    Converts a Perspective-style schema ({column: str | float | int | bool |
+    datetime.datetime}) to an Arrow schema. Datetimes are epoch milliseconds.
+    """
+    types = {
+        str: pyarrow.string(),
+        float: pyarrow.float64(),
+        int: pyarrow.int64(),
+        bool: pyarrow.bool_(),
+        datetime.datetime: pyarrow.timestamp("ms", tz="UTC"),
+        datetime.date: pyarrow.date32(),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in schema.items()])
+
+
+class _PartitionWriter:
+    """One dataset's open Parquet file, written as `<name>.tmp` and renamed when closed."""
+
+    def __init__(self, path: str, partition: str, schema: Any):
+        self.path = path
+        self.partition = partition
+        self.opened_at = time.time()
+        self.rows = 0
+        self.bytes = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._writer = pyarrow.parquet.ParquetWriter(f"{path}.tmp", schema, compression="zstd")
+
+    @property
+    def schema(self) -> Any:
+        return self._writer.schema
+
+    def write(self, table: Any) -> None:
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+        self.bytes += table.nbytes
+
+    def close(self) -> None:
+        self._writer.close()
+        # Readers only ever see complete files (the footer is written on close)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+class ParquetSink:
+    """
+    Persists batches of rows (top-N book changes, analytics, closed candles)
+    to time-partitioned Parquet files from a background thread.
+
+    submit() only enqueues the caller's rows or column lists: no copy, no
+    conversion, and it never blocks. When the bounded queue is full the batch is dropped
+    and counted, so a slow disk costs history rather than publishing latency.
+    The writer thread buffers rows per dataset, converts them to Arrow in
+    bulk every `flush_rows` rows or `flush_interval` seconds, and writes
+    `<directory>/<dataset>/date=YYYY-MM-DD/hour=HH/<dataset>-<time>.parquet`,
+    starting a new file after `rotate_seconds` or `rotate_bytes`, and when
+    the UTC hour changes, so a file never holds rows of a later partition.
+    """
+    _POLL_SECONDS = 0.5
+
+    def __init__(
+        self,
+        directory: str,
+        max_queue: int = 10_000,
+        flush_rows: int = 50_000,
+        flush_interval: float = 5.0,
+        rotate_seconds: float = 3600.0,
+        rotate_bytes: int = 128 * 1024 * 1024
+    ):
+        """
+        Args:
+            directory (str): Root of the dataset directories; created if missing.
+            max_queue (int): Batches that may wait for the writer before new ones are dropped.
+            flush_rows (int): Buffered rows per dataset that trigger a write.
+            flush_interval (float): Seconds after which buffered rows are written anyway.
+            rotate_seconds (float): Age at which a dataset's file is closed and a new one started.
+            rotate_bytes (int): Uncompressed bytes after which a file is rotated.
+        """
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is required for the Parquet sink.")
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1.")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.rotate_seconds = rotate_seconds
+        self.rotate_bytes = rotate_bytes
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._schemas: Dict[str, Any] = {}
+        self._buffers: Dict[str, List[Tuple[Batch, Dict[str, Any]]]] = {}
+        self._buffered_rows: Dict[str, int] = {}
+        self._writers: Dict[str, _PartitionWriter] = {}
+        self._last_flush = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Counters
+        self.batches_submitted = 0
+        self.batches_dropped = 0
+        self.rows_dropped = 0
+        self.rows_written = 0
+        self.files_written = 0
+        self.write_errors = 0
+
+    def add_dataset(self, dataset: str, schema: Dict[str, Any]) -> None:
+        """
+        Declares a dataset's columns (Perspective-style, see arrow_schema()).
+        Undeclared datasets take the schema inferred from their first write,
+        which fails later batches if a column was all None in the first one.
+        """
+        self._schemas[dataset] = arrow_schema(schema)
+
+    def submit(self, dataset: str, rows: Batch, columns: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Queues rows for `dataset`. The rows must not be mutated afterwards.
+
+        Args:
+            dataset (str): Dataset (directory) name, e.g. "orderbook".
+            rows (list | dict): Row dicts, every row of a dataset with the same keys,
+                or a dict of equal-length column lists (e.g. an encoder's output).
+            columns (dict, optional): Constant columns added to every row of this
+                batch at write time, e.g. {"symbol": ..., "event_time": ...}.
+
+        Returns:
+            bool: False if the batch was dropped because the queue is full.
+        """
+        count = _batch_rows(rows)
+        if not count:
+            return True
+        try:
+            self._queue.put_nowait((dataset, rows, columns or {}))
+        except queue.Full:
+            self.batches_dropped += 1
+            self.rows_dropped += count
+            return False
+        self.batches_submitted += 1
+        return True
+
+    def _buffer(self, dataset: str, rows: Batch, columns: Dict[str, Any]) -> None:
+        self._buffers.setdefault(dataset, []).append((rows, columns))
+        self._buffered_rows[dataset] = self._buffered_rows.get(dataset, 0) + _batch_rows(rows)
+
+    def _to_table(self, dataset: str, batches: List[Tuple[Batch, Dict[str, Any]]]) -> Any:
+        """Builds one Arrow table from buffered batches, broadcasting their constant columns."""
+        writer = self._writers.get(dataset)
+        schema = writer.schema if writer is not None else self._schemas.get(dataset)
+        names = schema.names if schema is not None else None
+        data: Dict[str, List[Any]] = {}
+        for batch, columns in batches:
+            count = _batch_rows(batch)
+            if names is None:
+                # Undeclared dataset: columns of its first batch
+                first = batch if isinstance(batch, dict) else batch[0]
+                names = list(first) + [name for name in columns if name not in first]
+            for name in names:
+                column = data.setdefault(name, [])
+                if name in columns:
+                    column.extend([columns[name]] * count)
+                elif isinstance(batch, dict):
+                    column.extend(batch.get(name) or [None] * count)
+                else:
+                    column.extend([row.get(name) for row in batch])
+        return pyarrow.Table.from_pydict(data, schema=schema)
+
+    @staticmethod
+    def _partition(now: datetime.datetime) -> str:
+        return os.path.join(f"date={now:%Y-%m-%d}", f"hour={now:%H}")
+
+    def _open_writer(self, dataset: str, schema: Any) -> _PartitionWriter:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        partition = self._partition(now)
+        path = os.path.join(self.directory, dataset, partition, f"{dataset}-{now:%Y%m%dT%H%M%S%f}.parquet")
+        self._writers[dataset] = _PartitionWriter(path, partition, schema)
+        return self._writers[dataset]
+
+    def _due_rotation(self, writer: _PartitionWriter) -> bool:
+        """True once the file is old or big enough, or the clock has moved into the next partition."""
+        return (
+            time.time() - writer.opened_at >= self.rotate_seconds
+            or writer.bytes >= self.rotate_bytes
+            or writer.partition != self._partition(datetime.datetime.now(datetime.timezone.utc))
+        )
+
+    def _close_writer(self, dataset: str) -> None:
+        writer = self._writers.pop(dataset, None)
+        if writer is None:
+            return
+        try:
+            writer.close()
+            self.files_written += 1
+            logging.info(f"Parquet sink wrote {writer.path} ({writer.rows} rows).")
+        except OSError as e:
+            self.write_errors += 1
+            logging.error(f"Parquet sink failed to close {writer.path}: {e}")
+
+    def _flush(self, dataset: str) -> None:
+        batches = self._buffers.pop(dataset, None)
+        rows = self._buffered_rows.pop(dataset, 0)
+        if not batches:
+            return
+        writer = self._writers.get(dataset)
+        if writer is not None and self._due_rotation(writer):
+            self._close_writer(dataset)
+        try:
+            table = self._to_table(dataset, batches)
+            writer = self._writers.get(dataset)
+            if writer is None:
+                writer = self._open_writer(dataset, table.schema)
+            writer.write(table)
+            self.rows_written += table.num_rows
+        except (OSError, ValueError, TypeError, pyarrow.ArrowException) as e:
+            # Rows that don't fit the file's schema (or a full disk) cost this batch only
+            self.write_errors += 1
+            self.rows_dropped += rows
+            logging.error(f"Parquet sink failed to write {rows} {dataset} rows: {e}")
+
+    def flush_all(self) -> None:
+        """Writes every buffered row; runs on the writer thread (or after it stopped)."""
+        for dataset in list(self._buffers):
+            self._flush(dataset)
+        self._last_flush = time.monotonic()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                dataset, rows, columns = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._buffer(dataset, rows, columns)
+            if self._buffered_rows[dataset] >= self.flush_rows:
+                self._flush(dataset)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                dataset, rows, columns = self._queue.get(timeout=self._POLL_SECONDS)
+                self._buffer(dataset, rows, columns)
+                if self._buffered_rows[dataset] >= self.flush_rows:
+                    self._flush(dataset)
+            except queue.Empty:
+                pass
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush_all()
+                # Rotate idle files too, so a quiet dataset's file is still closed on time
+                for dataset, writer in list(self._writers.items()):
+                    if self._due_rotation(writer):
+                        self._close_writer(dataset)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            logging.warning("Parquet sink already running.")
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ParquetSinkThread", daemon=True)
+        self._thread.start()
+        logging.info(f"Writing Parquet history to {self.directory} (rotating every {self.rotate_seconds:g}s or {self.rotate_bytes // 2**20} MB).")
+
+    def stop(self) -> None:
+        """Stops the writer, writes whatever is queued or buffered and closes every file."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            if self._thread.is_alive():
+                logging.warning("Parquet sink thread did not join cleanly.")
+                return
+        self._drain()
+        self.flush_all()
+        for dataset in list(self._writers):
+            self._close_writer(dataset)
+        stats = self.get_stats()
+        logging.info(
+            f"Parquet sink stopped: {stats['rows_written']} rows in {stats['files_written']} files, "
+            f"{stats['batches_dropped']} batches ({stats['rows_dropped']} rows) dropped, {stats['write_errors']} errors."
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "batches_submitted": self.batches_submitted,
+            "batches_dropped": self.batches_dropped,
+            "rows_dropped": self.rows_dropped,
+            "rows_written": self.rows_written,
+            "files_written": self.files_written,
+            "write_errors": self.write_errors,
+            "queued_batches": self._queue.qsize(),
+            "open_files": len(self._writers),
+            "timestamp": time.time(),
+        }
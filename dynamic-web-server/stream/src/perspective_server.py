@@ -1,11 +1,21 @@
+import itertools
 import logging
 import threading
+import time
+from collections import OrderedDict
 import tornado.web
 import tornado.ioloop
-from typing import Dict, Any, Optional
+from tornado.websocket import WebSocketClosedError
+from typing import Callable, Dict, Any, Iterator, List, Optional, Set, Tuple
 from perspective import Server, Table
 from perspective.handlers.tornado import PerspectiveTornadoHandler
 
+# Optional: merging queued on_update(mode="row") deltas for slow viewers
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(process)d [%(threadName)s] %(levelname)s: %(message)s"
@@ -19,33 +29,636 @@ ORDER_BOOK_SCHEMA: Dict[str, Any] = {
 }
 
 
+# Perspective 3.x websocket requests are protobuf `Request` messages. The registry only
+# reads the few top-level fields it needs to see which tables a session uses.
+_REQ_ENTITY_ID = 2         # string: table name, or view id for view requests
+_REQ_GET_HOSTED_TABLES = 4 # the client lists tables before it opens one
+_REQ_TABLE_MAKE_VIEW = 6   # message whose field 1 is the new view's id
+_REQ_VIEW_DELETE = 11
+# Server -> client `Response` messages: same msg_id/entity_id header
+_RESP_VIEW_ON_UPDATE = 21  # message whose field 1 is the Arrow delta (row-mode subscriptions only)
+_WIRE_VARINT = 0
+_WIRE_LEN = 2
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _protobuf_fields(data: bytes) -> Iterator[Tuple[int, Any]]:
+    """Yields (field number, value) for varint and length-delimited fields; stops at anything else."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == _WIRE_VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == _WIRE_LEN:
+            length, pos = _read_varint(data, pos)
+            value = data[pos:pos + length]
+            pos += length
+        else:
+            return
+        yield field, value
+
+
+def _encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if not value:
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+
+def _encode_fields(fields: List[Tuple[int, Any]]) -> bytes:
+    """Inverse of _protobuf_fields: ints as varints, bytes as length-delimited fields."""
+    out = bytearray()
+    for field, value in fields:
+        if isinstance(value, int):
+            out += _encode_varint(field << 3 | _WIRE_VARINT) + _encode_varint(value)
+        else:
+            out += _encode_varint(field << 3 | _WIRE_LEN) + _encode_varint(len(value)) + value
+    return bytes(out)
+
+
+def parse_update(message: bytes) -> Optional[Tuple[Tuple[Any, Any], List[Tuple[int, Any]], Optional[bytes]]]:
+    """
+    Recognizes a view on_update push.
+
+    Returns:
+        tuple | None: ((view id, subscription msg_id), top-level fields, Arrow delta or
+            None) for on_update pushes; None for anything else, e.g. request replies.
+    """
+    try:
+        fields = list(_protobuf_fields(message))
+        header = dict(field for field in fields if field[0] in (1, 2))
+        for field, value in fields:
+            if field == _RESP_VIEW_ON_UPDATE and isinstance(value, bytes):
+                delta = next((v for f, v in _protobuf_fields(value) if f == 1 and isinstance(v, bytes)), None)
+                return (header.get(2), header.get(1)), fields, delta
+    except IndexError:
+        pass
+    return None
+
+
+def merge_deltas(deltas: List[bytes], index: Optional[str]) -> bytes:
+    """
+    Concatenates row-mode Arrow deltas, oldest first, into one. When the
+    rows carry the table's `index` column only the latest row per key is
+    kept. Requires pyarrow.
+    """
+    merged = pyarrow.concat_tables([pyarrow.ipc.open_stream(delta).read_all() for delta in deltas])
+    # Each delta has its own string dictionaries; write one batch with one dictionary per column
+    merged = merged.unify_dictionaries().combine_chunks()
+    if index and index in merged.column_names:
+        latest = {key: row for row, key in enumerate(merged.column(index).to_pylist())}
+        merged = merged.take(sorted(latest.values()))
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, merged.schema) as writer:
+        writer.write_table(merged)
+    return sink.getvalue().to_pybytes()
+
+
+def parse_request(message: bytes) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    """
+    Extracts what the table registry needs from a client request.
+
+    Returns:
+        tuple: (entity id, request field number, new view id for make-view requests);
+            (None, None, None) if the message can't be parsed.
+    """
+    entity_id = kind = view_id = None
+    try:
+        for field, value in _protobuf_fields(message):
+            if field == _REQ_ENTITY_ID and isinstance(value, bytes):
+                entity_id = value.decode()
+            elif field > _REQ_ENTITY_ID:
+                kind = field
+                if field == _REQ_TABLE_MAKE_VIEW and isinstance(value, bytes):
+                    for inner_field, inner_value in _protobuf_fields(value):
+                        if inner_field == 1 and isinstance(inner_value, bytes):
+                            view_id = inner_value.decode()
+                            break
+    except (IndexError, UnicodeDecodeError):
+        return None, None, None
+    return entity_id, kind, view_id
+
+
+class RegisteredTable:
+    """A table the registry can create on demand, and drop again when nobody views it."""
+
+    def __init__(
+        self,
+        name: str,
+        schema: Dict[str, Any],
+        index: Optional[str],
+        limit: Optional[int],
+        idle_seconds: Optional[float],
+        on_first_view: Optional[Callable[[Table], None]]
+    ):
+        self.name = name
+        self.schema = schema
+        self.index = index
+        self.limit = limit
+        self.idle_seconds = idle_seconds # None: never dropped for idleness
+        self.on_first_view = on_first_view
+        self.table: Optional[Table] = None
+        self.views: Set[str] = set() # Open client views on this table
+        self.last_used = time.monotonic()
+        self.creations = 0
+        self.drops = 0
+
+
+class _ClientHandler(PerspectiveTornadoHandler):
+    """
+    PerspectiveTornadoHandler with per-viewer flow control, which also tells
+    the registry which tables each session uses.
+
+    Responses go straight to the socket while fewer than the server's
+    `client_high_water_bytes` are written but not yet flushed. Beyond that
+    they wait in a per-connection queue, where view updates are conflated:
+    a newer on_update push for the same subscription replaces the queued one
+    (plain notifications are identical, row-mode deltas are merged keeping
+    the latest row per index key). Pushes are only conflated with those
+    queued after the last request reply, so nothing moves across a reply.
+    A viewer whose queue exceeds `client_max_buffer_bytes`, or whose oldest
+    queued message is older than `client_max_lag_seconds`, is disconnected.
+    """
+    _ids = itertools.count(1)
+
+    def initialize(self, perspective_server: Server, registry: "PerspectiveServer") -> None:
+        super().initialize(perspective_server=perspective_server)
+        self.registry = registry
+        self.views: Dict[str, str] = {} # view id -> table name
+        self.client_id = next(self._ids)
+        self.connected_at = time.time()
+        self._inflight_bytes = 0 # Written to the stream, not yet flushed to the socket
+        self._pending: "OrderedDict[Any, Tuple[bytes, float]]" = OrderedDict() # key -> (message, first queued at)
+        self._pending_bytes = 0
+        self._generation = 0 # Bumped by each queued reply; update keys only conflate within one generation
+        self._closing = False
+        # Counters
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.updates_conflated = 0
+        self.max_lag_seconds = 0.0
+
+    def open(self) -> None:
+        self.session = self.server.new_session(self._send)
+        self.registry._on_session_opened(self)
+
+    def on_message(self, msg: bytes) -> None:
+        if not isinstance(msg, bytes):
+            return
+        self.registry._on_request(self, msg)
+        self.session.handle_request(msg)
+        self.loop.call_later(0, self._poll)
+
+    def _poll(self) -> None:
+        # The connection may have closed (and its session been deleted) since the request
+        if hasattr(self, "session"):
+            self.session.poll()
+
+    def on_close(self) -> None:
+        super().on_close()
+        self._pending.clear()
+        self.registry._on_session_closed(self)
+
+    def _send(self, message: bytes) -> None:
+        """Session callback for every response and update push."""
+        if self._closing:
+            return
+        high_water = self.registry.client_high_water_bytes
+        if not self._pending and (high_water is None or self._inflight_bytes < high_water):
+            self._write(message)
+            return
+        self._enqueue(message)
+        self.check_lag()
+
+    def _enqueue(self, message: bytes) -> None:
+        update = parse_update(message)
+        if update is None:
+            self._generation += 1
+            self._pending[self._generation] = (message, time.monotonic())
+            self._pending_bytes += len(message)
+            return
+        subscription, fields, delta = update
+        key = (subscription, self._generation)
+        queued = self._pending.get(key)
+        if queued is not None:
+            merged = self._conflate(queued[0], message, subscription, fields, delta)
+            if merged is not None:
+                self._pending[key] = (merged, queued[1])
+                self._pending_bytes += len(merged) - len(queued[0])
+                self.updates_conflated += 1
+                return
+            # Deltas that can't be merged are all kept, in order
+            key = (subscription, self._generation, len(self._pending))
+            self._generation += 1
+        self._pending[key] = (message, time.monotonic())
+        self._pending_bytes += len(message)
+
+    def _conflate(
+        self,
+        queued: bytes,
+        message: bytes,
+        subscription: Tuple[Any, Any],
+        fields: List[Tuple[int, Any]],
+        delta: Optional[bytes]
+    ) -> Optional[bytes]:
+        """Returns the push replacing a queued one for the same subscription, or None if they can't be merged."""
+        if delta is None:
+            # Plain notifications: the viewer re-reads the view, so one is as good as many
+            return message
+        queued_delta = parse_update(queued)[2]
+        if queued_delta is None or pyarrow is None:
+            return None
+        try:
+            merged = merge_deltas([queued_delta, delta], self.registry._view_index(self.views.get(subscription[0])))
+        except pyarrow.ArrowException as e:
+            logging.warning(f"Viewer {self.client_id}: could not merge update deltas: {e}")
+            return None
+        return _encode_fields([
+            (field, _encode_fields([(1, merged)]) if field == _RESP_VIEW_ON_UPDATE else value)
+            for field, value in fields
+        ])
+
+    def _write(self, message: bytes) -> None:
+        try:
+            future = self.write_message(message, binary=True)
+        except WebSocketClosedError:
+            return
+        size = len(message)
+        self._inflight_bytes += size
+        self.messages_sent += 1
+        self.bytes_sent += size
+        future.add_done_callback(lambda f: self._on_flushed(f, size))
+
+    def _on_flushed(self, future: Any, size: int) -> None:
+        self._inflight_bytes -= size
+        if future.exception() is None and self._pending:
+            self._flush()
+
+    def _flush(self) -> None:
+        high_water = self.registry.client_high_water_bytes
+        while self._pending and not self._closing and (high_water is None or self._inflight_bytes < high_water):
+            _, (message, _) = self._pending.popitem(last=False)
+            self._pending_bytes -= len(message)
+            self._write(message)
+
+    def lag_seconds(self) -> float:
+        """Age of the oldest queued message: how far behind the viewer's tables are."""
+        if not self._pending:
+            return 0.0
+        return time.monotonic() - next(iter(self._pending.values()))[1]
+
+    def check_lag(self) -> bool:
+        """Disconnects the viewer if it is too far behind; returns whether it was."""
+        if self._closing:
+            return True
+        lag = self.lag_seconds()
+        self.max_lag_seconds = max(self.max_lag_seconds, lag)
+        max_buffer, max_lag = self.registry.client_max_buffer_bytes, self.registry.client_max_lag_seconds
+        if (max_buffer is not None and self._pending_bytes > max_buffer) or (max_lag is not None and lag > max_lag):
+            logging.warning(
+                f"Disconnecting slow viewer {self.client_id} ({self.request.remote_ip}): "
+                f"{len(self._pending)} messages ({self._pending_bytes} bytes) queued, {lag:.1f}s behind."
+            )
+            self._closing = True
+            self._pending.clear()
+            self._pending_bytes = 0
+            self.registry.slow_client_disconnects += 1
+            self.close(1013, "Too far behind")
+            return True
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "client_id": self.client_id,
+            "remote_ip": self.request.remote_ip,
+            "connected_seconds": time.time() - self.connected_at,
+            "views": len(self.views),
+            "messages_sent": self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+            "inflight_bytes": self._inflight_bytes,
+            "queued_messages": len(self._pending),
+            "queued_bytes": self._pending_bytes,
+            "updates_conflated": self.updates_conflated,
+            "lag_seconds": self.lag_seconds(),
+            "max_lag_seconds": self.max_lag_seconds,
+        }
+
+
+class ClientsHandler(tornado.web.RequestHandler):
+    """Serves per-viewer flow-control stats as JSON (GET /clients)."""
+
+    def initialize(self, perspective_server: "PerspectiveServer") -> None:
+        self.perspective_server = perspective_server
+
+    def get(self) -> None:
+        self.finish(self.perspective_server.get_client_stats())
+
+
 class PerspectiveServer:
-    def __init__(self, table_name: str = "orderbook", port: int = 5001):
+    """
+    Hosts Perspective tables over one websocket (/orderbook) on a Tornado
+    IOLoop thread.
+
+    Tables live in a registry by name. add_table() creates one right away;
+    register_table(lazy=True) only declares it. Clients only open tables
+    they see listed, so a client listing tables gets every lazy one created
+    empty, but a table is only seeded (its `on_first_view` callback) when a
+    view is made on it, and producers check has_views() to publish only to
+    tables somebody is watching. Tables registered with `idle_seconds` are
+    dropped once no client has had a view open on them for that long, and
+    re-created on the next listing. Producers on other threads publish
+    through update_table() on the loop, which skips tables that don't
+    currently exist.
+
+    Each websocket viewer gets its own send queue with update conflation and
+    a slow-consumer cutoff (see _ClientHandler); GET /clients reports them.
+    """
+    _REAP_INTERVAL_SECONDS = 5.0
+
+    def __init__(
+        self,
+        table_name: Optional[str] = "orderbook",
+        port: int = 5001,
+        reuse_port: bool = False,
+        client_high_water_bytes: Optional[int] = 1 << 20,
+        client_max_buffer_bytes: Optional[int] = 64 << 20,
+        client_max_lag_seconds: Optional[float] = 30.0
+    ):
+        """
+        Args:
+            table_name (str, optional): Name of the main order book table; None starts
+                without one (e.g. a relay, whose tables mirror another server's).
+            port (int): Port of the websocket and HTTP routes.
+            reuse_port (bool): Bind with SO_REUSEPORT so several processes share the port.
+            client_high_water_bytes (int, optional): Unflushed bytes per viewer beyond
+                which responses are queued and conflated; None never queues.
+            client_max_buffer_bytes (int, optional): Queued bytes at which a viewer is
+                disconnected; None never.
+            client_max_lag_seconds (float, optional): Age of a viewer's oldest queued
+                message at which it is disconnected; None never.
+        """
         self.table_name = table_name
         self.port = port
+        self.reuse_port = reuse_port
+        self.client_high_water_bytes = client_high_water_bytes
+        self.client_max_buffer_bytes = client_max_buffer_bytes
+        self.client_max_lag_seconds = client_max_lag_seconds
+        self.clients: Set[_ClientHandler] = set()
+        self.slow_client_disconnects = 0
         self._stop_event = threading.Event()
         self._ioloop: Optional[tornado.ioloop.IOLoop] = tornado.ioloop.IOLoop().current()
         self._thread: Optional[threading.Thread] = None
+        self._reaper: Optional[tornado.ioloop.PeriodicCallback] = None
 
         self.server = Server()
         self.client = self.server.new_local_client()
-        self.table = self.client.table(
-            ORDER_BOOK_SCHEMA,
-            name=self.table_name,
-            index="depth"
-        )
+        self._registry: Dict[str, RegisteredTable] = {}
+        self._lock = threading.Lock()
+        self.tables: Dict[str, Table] = {} # Tables that currently exist
+        self.table = self.add_table(self.table_name, ORDER_BOOK_SCHEMA, index="depth") if table_name else None
+
+    def register_table(
+        self,
+        name: str,
+        schema: Dict[str, Any],
+        index: Optional[str] = None,
+        limit: Optional[int] = None,
+        lazy: bool = True,
+        idle_seconds: Optional[float] = None,
+        on_first_view: Optional[Callable[[Table], None]] = None
+    ) -> Optional[Table]:
+        """
+        Declares a table by name.
+
+        Args:
+            name (str): Table name clients open.
+            schema (dict): Perspective schema.
+            index (str, optional): Primary key column.
+            limit (int, optional): Row cap for append-only tables.
+            lazy (bool): Create when a client lists tables instead of now.
+            idle_seconds (float, optional): Drop the table after this long without open views.
+            on_first_view (callable, optional): Called with the table whenever a view is
+                made on it while it has none, e.g. to seed it with current state before
+                publishing resumes. Runs on the IOLoop, before the view is created.
+
+        Returns:
+            Table | None: The table if it was created now.
+        """
+        with self._lock:
+            if name in self._registry:
+                raise ValueError(f"Perspective Table '{name}' already exists.")
+            self._registry[name] = RegisteredTable(name, schema, index, limit, idle_seconds, on_first_view)
+        return None if lazy else self.create_table(name)
+
+    def add_table(self, name: str, schema: Dict[str, Any], index: Optional[str] = None, limit: Optional[int] = None) -> Table:
+        """Creates another table served over the same /orderbook websocket."""
+        return self.register_table(name, schema, index=index, limit=limit, lazy=False)
+
+    def create_table(self, name: str) -> Table:
+        """Creates a registered table if it doesn't exist yet; returns it."""
+        with self._lock:
+            entry = self._registry.get(name)
+            if entry is None:
+                raise KeyError(f"Perspective Table '{name}' is not registered.")
+            if entry.table is not None:
+                return entry.table
+            kwargs: Dict[str, Any] = {"name": name}
+            if entry.index:
+                kwargs["index"] = entry.index
+            if entry.limit:
+                kwargs["limit"] = entry.limit
+            table = entry.table = self.client.table(entry.schema, **kwargs)
+            self.tables[name] = table
+            entry.creations += 1
+            entry.last_used = time.monotonic()
+        logging.info(f"Perspective Table '{name}' created{f' with index {entry.index!r}' if entry.index else ''}.")
+        return table
+
+    def drop_table(self, name: str, unregister: bool = False) -> bool:
+        """
+        Deletes a table to free its memory. A registered table can be created
+        again (lazily or via create_table()) unless `unregister` is set.
+
+        Returns:
+            bool: Whether a table was deleted.
+        """
+        with self._lock:
+            entry = self._registry.get(name)
+            if entry is None:
+                return False
+            table = entry.table
+            if table is not None:
+                try:
+                    table.delete()
+                except Exception as e:
+                    # Views held in-process (not by clients) keep a table alive
+                    logging.warning(f"Could not drop Perspective Table '{name}': {e}")
+                    return False
+                entry.table = None
+                entry.views.clear()
+                entry.drops += 1
+                self.tables.pop(name, None)
+            if unregister:
+                del self._registry[name]
+        if table is not None:
+            logging.info(f"Perspective Table '{name}' dropped.")
+        return table is not None
+
+    def update_table(self, name: str, data: Any = None, removed: Optional[List[Any]] = None) -> bool:
+        """
+        Applies rows (and removals by key) to a table if it currently exists.
+        Call on the IOLoop, e.g. via get_loop().add_callback().
+
+        Returns:
+            bool: False if the table doesn't exist (not created yet, or dropped).
+        """
+        table = self.tables.get(name)
+        if table is None:
+            return False
+        if removed:
+            table.remove(removed)
+        if data:
+            table.update(data)
+        return True
+
+    def table_names(self) -> List[str]:
+        """Names of all registered tables, created or not."""
+        with self._lock:
+            return list(self._registry)
+
+    def is_created(self, name: str) -> bool:
+        return name in self.tables
+
+    def has_views(self, name: str) -> bool:
+        """Whether any client has a view open on the table, i.e. whether publishing to it is worthwhile."""
+        entry = self._registry.get(name)
+        return entry is not None and bool(entry.views)
+
+    def get_table_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per registered table: whether it exists, open client views and creation/drop counts."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "created": entry.table is not None,
+                    "views": len(entry.views),
+                    "idle_seconds": now - entry.last_used if not entry.views else 0.0,
+                    "idle_limit": entry.idle_seconds,
+                    "creations": entry.creations,
+                    "drops": entry.drops,
+                }
+                for name, entry in self._registry.items()
+            }
+
+    def _on_request(self, handler: _ClientHandler, message: bytes) -> None:
+        """Creates lazy tables before the server sees a client's request, and tracks its views."""
+        entity_id, kind, view_id = parse_request(message)
+        if kind == _REQ_GET_HOSTED_TABLES:
+            # Clients only open tables they see listed, so list every lazy one; an empty
+            # table costs little, and it is only seeded and published to once viewed
+            for name in self.table_names():
+                if not self.is_created(name):
+                    self.create_table(name)
+            return
+        if entity_id is None:
+            return
+        table_name = entity_id if entity_id in self._registry else handler.views.get(entity_id)
+        if table_name is None:
+            return
+        entry = self._registry.get(table_name)
+        if entry is None:
+            return
+        if entry.table is None:
+            self.create_table(table_name)
+        entry.last_used = time.monotonic()
+        if kind == _REQ_TABLE_MAKE_VIEW and view_id:
+            if not entry.views and entry.on_first_view is not None:
+                # Seed before the view reads the table; publishing resumes once it is registered
+                try:
+                    entry.on_first_view(entry.table)
+                except Exception as e:
+                    logging.error(f"Error seeding Perspective Table '{table_name}': {e}")
+            handler.views[view_id] = table_name
+            entry.views.add(view_id)
+        elif kind == _REQ_VIEW_DELETE:
+            handler.views.pop(entity_id, None)
+            entry.views.discard(entity_id)
+
+    def _view_index(self, table_name: Optional[str]) -> Optional[str]:
+        entry = self._registry.get(table_name) if table_name else None
+        return entry.index if entry else None
+
+    def _on_session_opened(self, handler: _ClientHandler) -> None:
+        self.clients.add(handler)
+
+    def _on_session_closed(self, handler: _ClientHandler) -> None:
+        self.clients.discard(handler)
+        now = time.monotonic()
+        for view_id, table_name in handler.views.items():
+            entry = self._registry.get(table_name)
+            if entry is not None:
+                entry.views.discard(view_id)
+                entry.last_used = now
+        handler.views.clear()
+
+    def _reap_idle_tables(self) -> None:
+        """Drops tables that have had no open views for their `idle_seconds`."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                name for name, entry in self._registry.items()
+                if entry.table is not None and entry.idle_seconds is not None
+                and not entry.views and now - entry.last_used >= entry.idle_seconds
+            ]
+        for name in idle:
+            self.drop_table(name)
+
+    def _housekeeping(self) -> None:
+        self._reap_idle_tables()
+        # Also catches viewers whose socket stalled with nothing new to queue
+        for client in list(self.clients):
+            client.check_lag()
 
-        logging.info(f"Perspective Table '{self.table_name}' created with index 'depth'.")
+    def get_client_stats(self) -> Dict[str, Any]:
+        """Flow-control stats of every connected viewer."""
+        return {
+            "clients": [client.get_stats() for client in list(self.clients)],
+            "slow_client_disconnects": self.slow_client_disconnects,
+            "high_water_bytes": self.client_high_water_bytes,
+            "max_buffer_bytes": self.client_max_buffer_bytes,
+            "max_lag_seconds": self.client_max_lag_seconds,
+        }
 
-    def setup_routes(self) -> None:
+    def setup_routes(self, extra_routes: Optional[List[Any]] = None) -> None:
+        """Binds the Perspective websocket (/orderbook) plus any extra Tornado routes."""
         try:
             app = tornado.web.Application([
-                (r"/orderbook", PerspectiveTornadoHandler, {
-                    "perspective_server": self.server
+                (r"/orderbook", _ClientHandler, {
+                    "perspective_server": self.server,
+                    "registry": self
                 }),
+                (r"/clients", ClientsHandler, {"perspective_server": self}),
+                *(extra_routes or []),
             ])
-            app.listen(self.port)
+            app.listen(self.port, reuse_port=self.reuse_port)
             logging.info(f"Tornado server listening on port {self.port}...")
+            self._reaper = tornado.ioloop.PeriodicCallback(self._housekeeping, self._REAP_INTERVAL_SECONDS * 1000)
+            self._reaper.start()
 
         except Exception as e:
             logging.error(f"Error while running Tornado server: {e}")
@@ -86,9 +699,11 @@ class PerspectiveServer:
         self._stop_event.set()
         logging.info("Perspective server stopped.")
 
-    def get_table(self) -> Table:
-        """Returns the Perspective Table instance."""
-        return self.table
+    def get_table(self, name: Optional[str] = None) -> Optional[Table]:
+        """Returns the main table, or the named table if it currently exists."""
+        if name is None:
+            return self.table
+        return self.tables.get(name)
 
     def get_loop(self) -> tornado.ioloop.IOLoop:
         """Returns the IOLoop instance, if initialized."""
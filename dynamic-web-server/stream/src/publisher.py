@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from src.book import TopChanges
+from src.metrics import LatencyMetrics
+
+
+class PublishStats:
+    """
+    Counts publishes, rows and removals, for diagnostics and the periodic log.
+
+    Latency is not measured here: publishes record their stages, including
+    the exchange-to-table `end_to_end` latency of the newest and oldest
+    change in each batch, in LatencyMetrics. Given the same `metrics`, the
+    summary and log include those histograms.
+    """
+
+    def __init__(self, metrics: Optional[LatencyMetrics] = None):
+        self._lock = threading.Lock()
+        self.metrics = metrics
+        self.publishes = 0
+        self.rows = 0
+        self.removed_rows = 0
+        self.last_publish: Optional[float] = None
+
+    def record(self, changes: TopChanges, rows: int, removed: int, published_at: Optional[float] = None) -> None:
+        """Records a publish of `rows` upserts and `removed` deletions for `changes`."""
+        published_at = published_at if published_at is not None else time.time()
+        with self._lock:
+            self.publishes += 1
+            self.rows += rows
+            self.removed_rows += removed
+            self.last_publish = published_at
+
+    def latency(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Returns the end-to-end stages of LatencyMetrics, {stage: {symbol: summary}}; empty without metrics."""
+        if self.metrics is None:
+            return {}
+        snapshot = self.metrics.snapshot()
+        return {stage: snapshot[stage] for stage in ("end_to_end", "oldest_end_to_end") if stage in snapshot}
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns the counters and the end-to-end latency histograms."""
+        with self._lock:
+            summary = {
+                "publishes": self.publishes,
+                "rows": self.rows,
+                "removed_rows": self.removed_rows,
+            }
+        summary["latency"] = self.latency()
+        summary["timestamp"] = time.time()
+        return summary
+
+
+def wait_for_batch(
+    order_book: Any,
+    stop_event: threading.Event,
+    min_interval: float,
+    max_latency: float,
+    last_publish: float,
+    burst_gap: float = 0.002,
+    idle_timeout: float = 0.5
+) -> bool:
+    """
+    Blocks until a batch of book updates is ready to publish.
+
+    Sleeps without polling until the book signals an update. Updates that
+    follow each other less than `burst_gap` apart (a backlog being drained,
+    a buffered replay) are merged into one batch, and a batch is held back
+    until `min_interval` after the previous publish so bursts coalesce. A
+    batch is always released once `max_latency` has passed since its first
+    update.
+
+    Args:
+        order_book: A BinanceOrderBook or OrderBookManager (anything with wait_for_update).
+        stop_event (threading.Event): Returns False as soon as this is set.
+        min_interval (float): Minimum spacing between publishes.
+        max_latency (float): Upper bound on how long the first change of a batch waits.
+        last_publish (float): time.monotonic() of the previous publish.
+        burst_gap (float): Silence that ends a burst.
+        idle_timeout (float): How often an idle wait re-checks `stop_event`.
+
+    Returns:
+        bool: True when a batch is ready, False if stopping.
+    """
+    while not order_book.wait_for_update(idle_timeout):
+        if stop_event.is_set():
+            return False
+    deadline = time.monotonic() + max_latency
+    earliest = last_publish + min_interval
+
+    while not stop_event.is_set():
+        now = time.monotonic()
+        if now >= deadline:
+            return True
+        if now < earliest:
+            # Too soon after the previous publish; let the burst accumulate
+            stop_event.wait(min(earliest, deadline) - now)
+            continue
+        if not order_book.wait_for_update(min(burst_gap, deadline - now)):
+            return True # Burst went quiet
+    return False
+
+
+async def wait_for_batch_async(
+    order_book: Any,
+    stop_event: threading.Event,
+    min_interval: float,
+    max_latency: float,
+    last_publish: float,
+    burst_gap: float = 0.002,
+    idle_timeout: float = 0.5
+) -> bool:
+    """Coroutine counterpart of wait_for_batch for AsyncBinanceOrderBook."""
+    while not await order_book.wait_for_update_async(idle_timeout):
+        if stop_event.is_set():
+            return False
+    deadline = time.monotonic() + max_latency
+    earliest = last_publish + min_interval
+
+    while not stop_event.is_set():
+        now = time.monotonic()
+        if now >= deadline:
+            return True
+        if now < earliest:
+            await asyncio.sleep(min(earliest, deadline) - now)
+            continue
+        if not await order_book.wait_for_update_async(min(burst_gap, deadline - now)):
+            return True
+    return False
+
+
+def log_publish_stats(stats: PublishStats, label: str = "") -> None:
+    summary = stats.summary()
+    newest, oldest = summary["latency"].get("end_to_end", {}), summary["latency"].get("oldest_end_to_end", {})
+    if not newest:
+        return
+    for symbol, latency in newest.items():
+        line = f"{label}{summary['publishes']} publishes, {summary['rows']} rows; {symbol} E->table.update latency "
+        if symbol in oldest:
+            line += f"oldest p50 {oldest[symbol]['p50_ms']:.1f}ms p99 {oldest[symbol]['p99_ms']:.1f}ms, "
+        logging.info(line + f"newest p50 {latency['p50_ms']:.1f}ms p99 {latency['p99_ms']:.1f}ms")
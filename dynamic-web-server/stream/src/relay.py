@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import multiprocessing as mp
+import signal
+import time
+from typing import Any, Dict, List, Optional
+import perspective
+import tornado.web
+from tornado.websocket import WebSocketClientConnection, websocket_connect
+from src.perspective_server import PerspectiveServer, parse_update
+
+
+class _Replica:
+    """One mirrored table: the upstream row-mode subscription and the local copy it feeds."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.index: Optional[str] = None
+        self.upstream_view: Any = None
+        self.local: Any = None
+        self.ready = False # Snapshot applied; deltas go straight to `local`
+        self.after_snapshot = False # The snapshot reply has been read; deltas are newer than it
+        self.buffered: List[bytes] = []
+        self.deltas = 0
+        self.snapshots = 0
+
+    def on_delta(self, _port_id: int, delta: bytes) -> None:
+        # Runs inline in AsyncClient.handle_response, so in websocket message order
+        if self.ready:
+            self.local.update(delta)
+            self.deltas += 1
+        elif self.after_snapshot:
+            self.buffered.append(delta)
+        # Otherwise the pending snapshot already contains this change
+
+
+class PerspectiveRelay:
+    """
+    Mirrors tables of an upstream PerspectiveServer into a local one and
+    serves them to viewers, so the upstream process only feeds relays
+    however many browsers are connected.
+
+    Each table is copied from an Arrow snapshot and then kept current with
+    the upstream view's row-mode on_update deltas. The subscription is made
+    before the snapshot; deltas read before the snapshot reply are already
+    part of it and skipped, later ones are buffered until it is applied. All
+    requests go out one at a time so the snapshot reply can be told apart on
+    the socket. Row-mode deltas don't carry removals, so indexed tables are
+    compared with upstream row counts every `reconcile_interval` seconds and
+    re-snapshotted (in place, keeping viewers' views) when they differ. When
+    the upstream connection drops, the relay keeps serving the last state
+    and re-snapshots after reconnecting.
+    """
+    _RECONNECT_DELAY_SECONDS = 2.0
+    _REQUEST_TIMEOUT_SECONDS = 30.0
+
+    def __init__(
+        self,
+        server: PerspectiveServer,
+        upstream_url: str,
+        tables: Optional[List[str]] = None,
+        reconcile_interval: float = 1.0
+    ):
+        """
+        Args:
+            server (PerspectiveServer): Local server whose tables viewers open; created without a main table.
+            upstream_url (str): Websocket URL of the primary, e.g. "ws://127.0.0.1:5001/orderbook".
+            tables (List[str], optional): Tables to mirror; all of the upstream's when None.
+                The relay's views keep every mirrored lazy table published, so name them to keep the rest idle.
+            reconcile_interval (float): Seconds between row-count checks of indexed tables.
+        """
+        self.server = server
+        self.upstream_url = upstream_url
+        self.tables = tables
+        self.reconcile_interval = reconcile_interval
+        self.replicas: Dict[str, _Replica] = {}
+        self.connected = False
+        self.connects = 0
+        self.resnapshots = 0
+        self._ws: Optional[WebSocketClientConnection] = None
+        self._client: Optional[perspective.AsyncClient] = None
+        self._request_lock = asyncio.Lock()
+        self._awaiting_snapshot: Optional[_Replica] = None
+        self._stopping = False
+
+    async def _send(self, request: bytes) -> None:
+        await self._ws.write_message(request, binary=True)
+
+    async def _read(self, ws: WebSocketClientConnection, client: perspective.AsyncClient) -> None:
+        while True:
+            message = await ws.read_message()
+            if message is None:
+                return
+            replica = self._awaiting_snapshot
+            if replica is not None and parse_update(message) is None:
+                # The only request in flight is the snapshot, so this is its reply
+                replica.after_snapshot = True
+                self._awaiting_snapshot = None
+            await client.handle_response(message)
+
+    async def _request(self, call: Any, snapshot_of: Optional[_Replica] = None) -> Any:
+        async with self._request_lock:
+            self._awaiting_snapshot = snapshot_of
+            try:
+                # A reply that never comes (upstream gone mid-request) ends the session
+                return await asyncio.wait_for(call(), self._REQUEST_TIMEOUT_SECONDS)
+            finally:
+                self._awaiting_snapshot = None
+
+    async def _snapshot(self, replica: _Replica, table: Any) -> None:
+        replica.ready = replica.after_snapshot = False
+        replica.buffered = []
+        if replica.upstream_view is None:
+            replica.upstream_view = await self._request(table.view)
+            await self._request(lambda: replica.upstream_view.on_update(replica.on_delta, mode="row"))
+        arrow = await self._request(replica.upstream_view.to_arrow, snapshot_of=replica)
+        if replica.local is None:
+            replica.index = table.get_index()
+            schema = await self._request(table.schema)
+            replica.local = self.server.add_table(replica.name, schema, index=replica.index, limit=table.get_limit())
+            replica.local.update(arrow)
+        else:
+            replica.local.replace(arrow)
+        for delta in replica.buffered:
+            replica.local.update(delta)
+        replica.buffered = []
+        replica.ready = True
+        replica.snapshots += 1
+
+    async def _reconcile(self, tables: Dict[str, Any]) -> None:
+        while self.connected:
+            await asyncio.sleep(self.reconcile_interval)
+            for name, replica in self.replicas.items():
+                if not self.connected or replica.index is None or not replica.ready:
+                    continue
+                upstream_rows = await self._request(replica.upstream_view.num_rows)
+                if upstream_rows != replica.local.size():
+                    # Rows were removed upstream (or are still in flight); copy the table afresh
+                    await self._snapshot(replica, tables[name])
+                    self.resnapshots += 1
+
+    async def _session(self) -> None:
+        self._ws = ws = await websocket_connect(self.upstream_url, max_message_size=1 << 30)
+        self._client = client = perspective.AsyncClient(self._send)
+        reader = asyncio.ensure_future(self._read(ws, client))
+        reconciler = None
+        try:
+            names = self.tables or await self._request(client.get_hosted_table_names)
+            tables = {}
+            for name in names:
+                tables[name] = await self._request(lambda: client.open_table(name))
+                replica = self.replicas.setdefault(name, _Replica(name))
+                replica.upstream_view = None
+                await self._snapshot(replica, tables[name])
+            self.connected = True
+            self.connects += 1
+            logging.info(f"Relay mirroring {len(tables)} tables from {self.upstream_url}: {', '.join(tables)}.")
+            reconciler = asyncio.ensure_future(self._reconcile(tables))
+            await reader
+        finally:
+            self.connected = False
+            for replica in self.replicas.values():
+                replica.ready = False
+            if reconciler is not None:
+                reconciler.cancel()
+            reader.cancel()
+            ws.close()
+
+    async def run(self) -> None:
+        """Mirrors the upstream tables until stop(), reconnecting when the connection drops."""
+        while not self._stopping:
+            try:
+                await self._session()
+                if not self._stopping:
+                    logging.warning(f"Relay lost upstream {self.upstream_url}; reconnecting.")
+            except Exception as e:
+                logging.error(f"Relay upstream error ({self.upstream_url}): {e}")
+            if not self._stopping:
+                await asyncio.sleep(self._RECONNECT_DELAY_SECONDS)
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._ws is not None:
+            self._ws.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "upstream": self.upstream_url,
+            "connected": self.connected,
+            "connects": self.connects,
+            "resnapshots": self.resnapshots,
+            "tables": {
+                name: {"ready": r.ready, "rows": r.local.size() if r.local else 0, "deltas": r.deltas, "snapshots": r.snapshots}
+                for name, r in self.replicas.items()
+            },
+            "timestamp": time.time(),
+        }
+
+    def routes(self) -> List[Any]:
+        return [(r"/relay", RelayStatsHandler, {"relay": self})]
+
+
+class RelayStatsHandler(tornado.web.RequestHandler):
+    """Serves the relay's replication state as JSON (GET /relay)."""
+
+    def initialize(self, relay: PerspectiveRelay) -> None:
+        self.relay = relay
+
+    def get(self) -> None:
+        self.finish(self.relay.get_stats())
+
+
+def run_relay(
+    upstream_url: str,
+    port: int,
+    tables: Optional[List[str]],
+    server_kwargs: Dict[str, Any],
+    stop_event: Any
+) -> None:
+    """Relay process entry point: serves mirrored tables on a port shared with the other relays."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(process)d [%(threadName)s] %(levelname)s: %(message)s")
+    # Ctrl+C reaches the whole process group; the parent decides when relays stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    server = PerspectiveServer(table_name=None, port=port, reuse_port=True, **server_kwargs)
+    relay = PerspectiveRelay(server, upstream_url, tables)
+    server.setup_routes(relay.routes())
+    server.start()
+    loop = server.get_loop()
+    asyncio.run_coroutine_threadsafe(relay.run(), loop.asyncio_loop)
+    stop_event.wait()
+    loop.add_callback(relay.stop)
+    time.sleep(0.2)
+
+
+class RelayTier:
+    """
+    Runs `processes` relay processes (see PerspectiveRelay) that mirror the
+    primary's tables over loopback websockets and share one viewer port
+    through SO_REUSEPORT, so the kernel spreads browser connections across
+    them and viewer load scales with cores instead of landing on the
+    primary's IOLoop.
+    """
+
+    def __init__(
+        self,
+        upstream_url: str,
+        processes: int = 2,
+        port: int = 5002,
+        tables: Optional[List[str]] = None,
+        **server_kwargs: Any
+    ):
+        """
+        Args:
+            upstream_url (str): Websocket URL of the primary.
+            processes (int): Relay processes to run.
+            port (int): Viewer port shared by the relays.
+            tables (List[str], optional): Tables to mirror; all of the primary's when None.
+            **server_kwargs: Passed to each relay's PerspectiveServer (client flow-control limits).
+        """
+        if processes < 1:
+            raise ValueError("processes must be at least 1.")
+        self.upstream_url = upstream_url
+        self.processes = processes
+        self.port = port
+        self.tables = tables
+        self._server_kwargs = server_kwargs
+        # spawn: the parent already runs threads (Tornado, websocket), which fork does not copy safely
+        self._ctx = mp.get_context("spawn")
+        self._stop_event = self._ctx.Event()
+        self._processes: List[Any] = []
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        for i in range(self.processes):
+            process = self._ctx.Process(
+                target=run_relay,
+                args=(self.upstream_url, self.port, self.tables, self._server_kwargs, self._stop_event),
+                name=f"PerspectiveRelay-{i}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        logging.info(f"Started {self.processes} relay processes serving port {self.port} from {self.upstream_url}.")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                logging.warning(f"Relay process {process.pid} did not exit; terminating.")
+                process.terminate()
+                process.join(timeout=5)
+        self._processes = []
+        logging.info("Relay processes stopped.")
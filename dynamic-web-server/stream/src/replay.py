@@ -0,0 +1,241 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterator, NamedTuple, Optional, Union
+
+
+# On-disk log layout:
+#   header:  MAGIC (4 bytes) + version (uint8)
+#   record:  kind (uint8), receive time (float64, epoch seconds),
+#            symbol length (uint16), payload length (uint32), symbol, payload
+# Files ending in .gz (or opened with compress=True) are gzip streams of the
+# same bytes; appending adds a gzip member, which readers handle transparently.
+MAGIC = b"BDRL"
+VERSION = 1
+_HEADER = struct.Struct("<4sB")
+_RECORD = struct.Struct("<BdHI")
+
+RECORD_SNAPSHOT = 1 # REST depth snapshot body (JSON), tagged with its symbol
+RECORD_FRAME = 2    # Raw websocket frame, exactly as received
+
+
+class Record(NamedTuple):
+    kind: int
+    received_at: float
+    symbol: str
+    payload: bytes
+
+
+def _open(path: str, mode: str, compress: Optional[bool]) -> BinaryIO:
+    if compress is None:
+        compress = path.endswith(".gz")
+    return gzip.open(path, mode) if compress else open(path, mode)
+
+
+class DepthRecorder:
+    """
+    Appends raw snapshot and depth frames, with receive timestamps, to a
+    compact length-prefixed log. Safe to call from the websocket thread and
+    snapshot threads at the same time.
+    """
+
+    def __init__(self, path: str, compress: Optional[bool] = None):
+        """
+        Args:
+            path (str): Log file; created if missing, appended to otherwise.
+            compress (bool, optional): Gzip the log. Defaults to True for paths ending in .gz.
+        """
+        self.path = path
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = _open(path, "ab", compress)
+        self._lock = threading.Lock()
+        self.records_written = 0
+        self.bytes_written = 0
+        if is_new:
+            self._file.write(_HEADER.pack(MAGIC, VERSION))
+
+    def _write(self, kind: int, payload: Union[str, bytes], symbol: str, received_at: Optional[float]) -> None:
+        if isinstance(payload, str):
+            payload = payload.encode()
+        symbol_bytes = symbol.encode()
+        header = _RECORD.pack(kind, received_at if received_at is not None else time.time(), len(symbol_bytes), len(payload))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(header + symbol_bytes + payload)
+            self.records_written += 1
+            self.bytes_written += len(header) + len(symbol_bytes) + len(payload)
+
+    def record_snapshot(self, symbol: str, payload: Union[str, bytes], received_at: Optional[float] = None) -> None:
+        """Records a REST depth snapshot body for `symbol`."""
+        self._write(RECORD_SNAPSHOT, payload, symbol, received_at)
+
+    def record_frame(self, payload: Union[str, bytes], received_at: Optional[float] = None) -> None:
+        """Records a raw websocket frame (single or combined stream)."""
+        self._write(RECORD_FRAME, payload, "", received_at)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        logging.info(f"Recorder closed: {self.records_written} records, {self.bytes_written} bytes -> {self.path}")
+
+
+def read_records(path: str, compress: Optional[bool] = None) -> Iterator[Record]:
+    """Iterates over the records of a depth log."""
+    with _open(path, "rb", compress) as f:
+        magic, version = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a depth log (bad magic {magic!r}).")
+        if version != VERSION:
+            raise ValueError(f"Unsupported depth log version {version}.")
+        while True:
+            head = f.read(_RECORD.size)
+            if not head:
+                return
+            if len(head) < _RECORD.size:
+                logging.warning(f"Truncated record header at end of {path}; stopping.")
+                return
+            kind, received_at, symbol_len, payload_len = _RECORD.unpack(head)
+            body = f.read(symbol_len + payload_len)
+            if len(body) < symbol_len + payload_len:
+                logging.warning(f"Truncated record body at end of {path}; stopping.")
+                return
+            yield Record(kind, received_at, body[:symbol_len].decode(), body[symbol_len:])
+
+
+class ReplayStats(NamedTuple):
+    frames: int
+    snapshots: int
+    elapsed_seconds: float
+    recorded_seconds: float
+    max_lag_seconds: float
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class DepthReplayer:
+    """
+    Feeds a recorded depth log into one BinanceOrderBook, or several books
+    keyed by symbol, at recorded pace scaled by `speed` (1.0 = real time,
+    10.0 = ten times faster) or as fast as possible (speed=None).
+
+    Books should be created with auto_resync=False: a gap in the recording is
+    then healed by the next recorded snapshot rather than a live REST call.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, compress: Optional[bool] = None):
+        if speed is not None and speed <= 0:
+            raise ValueError("Speed must be positive, or None for max speed.")
+        self.path = path
+        self.speed = speed
+        self.compress = compress
+
+    def replay(self, books: Any, stop_event: Optional[threading.Event] = None) -> ReplayStats:
+        """
+        Replays the log into `books` (a BinanceOrderBook or a dict of them by symbol).
+
+        Returns:
+            ReplayStats: Counts, wall time, recorded time span and worst pacing lag.
+        """
+        by_symbol: Dict[str, Any] = books if isinstance(books, dict) else {books.symbol: books}
+        decoder = next(iter(by_symbol.values()))._decoder
+
+        frames = snapshots = 0
+        max_lag = 0.0
+        first_ts: Optional[float] = None
+        last_ts = 0.0
+        wall_start = time.perf_counter()
+
+        for record in read_records(self.path, self.compress):
+            if stop_event is not None and stop_event.is_set():
+                break
+            if first_ts is None:
+                first_ts = record.received_at
+            last_ts = record.received_at
+
+            if self.speed is not None:
+                due = wall_start + (record.received_at - first_ts) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    max_lag = max(max_lag, -delay)
+
+            if record.kind == RECORD_SNAPSHOT:
+                book = by_symbol.get(record.symbol)
+                if book is not None:
+                    book.load_snapshot(json.loads(record.payload))
+                    snapshots += 1
+            elif record.kind == RECORD_FRAME:
+                frames += 1
+                # Frames may be bare (single-symbol stream) or combined-stream envelopes
+                try:
+                    _, update = decoder.decode_combined(record.payload)
+                except ValueError as e:
+                    logging.error(f"Skipping undecodable recorded frame: {e}")
+                    continue
+                if update is not None and update.symbol in by_symbol:
+                    by_symbol[update.symbol].handle_update(update)
+
+        return ReplayStats(
+            frames=frames,
+            snapshots=snapshots,
+            elapsed_seconds=time.perf_counter() - wall_start,
+            recorded_seconds=(last_ts - first_ts) if first_ts is not None else 0.0,
+            max_lag_seconds=max_lag,
+        )
+
+
+def main() -> None:
+    """Records live depth streams to a log, or replays a log into order books."""
+    parser = argparse.ArgumentParser(description="Record or replay Binance depth streams.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Record live snapshot + depth frames.")
+    rec.add_argument("path")
+    rec.add_argument("--symbols", default="BTCUSDT", help="Comma-separated symbols.")
+    rec.add_argument("--duration", type=float, default=60.0, help="Seconds to record.")
+
+    rep = sub.add_parser("replay", help="Replay a log into fresh order books and print stats.")
+    rep.add_argument("path")
+    rep.add_argument("--speed", type=float, default=None, help="Playback multiplier (omit for max speed).")
+    rep.add_argument("--backend", default="sorteddict")
+    rep.add_argument("--tick-size", type=float, default=None)
+    args = parser.parse_args()
+
+    from src.binance import BinanceOrderBook
+    from src.manager import OrderBookManager
+
+    if args.command == "record":
+        recorder = DepthRecorder(args.path)
+        manager = OrderBookManager(symbols=args.symbols.split(","), recorder=recorder)
+        try:
+            manager.start()
+            time.sleep(args.duration)
+        finally:
+            manager.stop()
+            recorder.close()
+        return
+
+    symbols = {r.symbol for r in read_records(args.path) if r.kind == RECORD_SNAPSHOT}
+    books = {
+        s: BinanceOrderBook(symbol=s, backend=args.backend, tick_size=args.tick_size, auto_resync=False)
+        for s in symbols
+    }
+    stats = DepthReplayer(args.path, speed=args.speed).replay(books)
+    print(f"{stats.frames} frames, {stats.snapshots} snapshots in {stats.elapsed_seconds:.3f}s "
+          f"({stats.frames_per_second:,.0f} frames/s; recorded span {stats.recorded_seconds:.1f}s, max lag {stats.max_lag_seconds * 1e3:.1f}ms)")
+    for symbol, book in books.items():
+        print(f"{symbol}: last_update_id={book.last_update_id} stale={book.is_stale} spread={book.get_spread()}")
+
+
+if __name__ == "__main__":
+    main()
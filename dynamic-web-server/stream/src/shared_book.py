@@ -0,0 +1,326 @@
+import logging
+import multiprocessing as mp
+import signal
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.book import PriceLevel, TopChanges, TopNTracker
+
+
+# Shared block layout: an int64 header followed by float64 levels[2][capacity][2]
+# (side 0 = bids best-first, side 1 = asks best-first; each level is price, amount).
+_SEQ = 0             # Seqlock sequence: odd while the writer is mid-update
+_CAPACITY = 1        # Levels per side the block can hold
+_BID_COUNT = 2
+_ASK_COUNT = 3
+_LAST_UPDATE_ID = 4
+_FIRST_EVENT_TIME = 5 # E (ms) of the oldest change in this publish
+_LAST_EVENT_TIME = 6  # E (ms) of the newest change in this publish
+_IS_STALE = 7
+_RESYNC_COUNT = 8
+_HEADER_WORDS = 16
+_HEADER_BYTES = _HEADER_WORDS * 8
+
+
+def _block_size(capacity: int) -> int:
+    return _HEADER_BYTES + 2 * capacity * 2 * 8
+
+
+class _LadderSide:
+    """Presents a copied ladder through the BookSide.top() interface TopNTracker reads."""
+
+    def __init__(self, levels: List[PriceLevel]):
+        self._levels = levels
+
+    def top(self, limit: int) -> List[PriceLevel]:
+        return self._levels[:limit]
+
+
+class SharedTopOfBookWriter:
+    """
+    Publishes the top-N ladder of one book into a shared memory block using a
+    seqlock: the sequence number is made odd, the levels and metadata are
+    written, and the sequence is made even again. Readers never block the
+    writer and retry if the sequence moved under them.
+    """
+
+    def __init__(self, name: str, update_event: Optional[Any] = None):
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._header = np.ndarray((_HEADER_WORDS,), dtype=np.int64, buffer=self._shm.buf)
+        self.capacity = int(self._header[_CAPACITY])
+        self._levels = np.ndarray((2, self.capacity, 2), dtype=np.float64, buffer=self._shm.buf, offset=_HEADER_BYTES)
+        self._update_event = update_event
+
+    def publish(
+        self,
+        bids: List[PriceLevel],
+        asks: List[PriceLevel],
+        last_update_id: Optional[int],
+        first_event_time: Optional[int],
+        last_event_time: Optional[int],
+        is_stale: bool,
+        resync_count: int
+    ) -> None:
+        """Writes one consistent top-of-book snapshot."""
+        header, levels = self._header, self._levels
+        bids, asks = bids[:self.capacity], asks[:self.capacity]
+
+        header[_SEQ] += 1 # Odd: update in progress
+        if bids:
+            levels[0, :len(bids)] = bids
+        if asks:
+            levels[1, :len(asks)] = asks
+        header[_BID_COUNT] = len(bids)
+        header[_ASK_COUNT] = len(asks)
+        header[_LAST_UPDATE_ID] = last_update_id if last_update_id is not None else -1
+        header[_FIRST_EVENT_TIME] = first_event_time if first_event_time is not None else -1
+        header[_LAST_EVENT_TIME] = last_event_time if last_event_time is not None else -1
+        header[_IS_STALE] = int(is_stale)
+        header[_RESYNC_COUNT] = resync_count
+        header[_SEQ] += 1 # Even: consistent
+
+        if self._update_event is not None:
+            self._update_event.set()
+
+    def close(self) -> None:
+        # numpy views must be released before the mapping can close
+        del self._header, self._levels
+        self._shm.close()
+
+
+class SharedTopOfBookReader:
+    """
+    Reads the ladder published by SharedTopOfBookWriter without locks or
+    pickling, retrying whenever the writer was mid-update.
+
+    Implements the subset of the BinanceOrderBook API the publisher and
+    diagnostics use (wait_for_update, get_top_changes, get_bids/get_asks and
+    the sync-state attributes), so run_processor works unchanged.
+    """
+    _MAX_RETRIES = 1000
+
+    def __init__(self, name: str, symbol: str, update_event: Optional[Any] = None):
+        self.symbol = symbol.upper()
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._header = np.ndarray((_HEADER_WORDS,), dtype=np.int64, buffer=self._shm.buf)
+        self.capacity = int(self._header[_CAPACITY])
+        self._levels = np.ndarray((2, self.capacity, 2), dtype=np.float64, buffer=self._shm.buf, offset=_HEADER_BYTES)
+        self._update_event = update_event
+        self._trackers: Dict[int, Tuple[TopNTracker, TopNTracker]] = {}
+        self._published_seq = -1
+        self.retries = 0 # Reads that raced the writer
+
+        self.last_update_id: Optional[int] = None
+        self.is_stale: bool = True
+        self.resync_count: int = 0
+
+    def read(self) -> Tuple[int, List[PriceLevel], List[PriceLevel], List[int]]:
+        """
+        Copies one consistent snapshot out of the block.
+
+        Returns:
+            Tuple: (sequence, bids, asks, header words).
+        """
+        header, levels = self._header, self._levels
+        for _ in range(self._MAX_RETRIES):
+            seq = int(header[_SEQ])
+            if seq & 1:
+                self.retries += 1
+                continue
+            words = header[:_HEADER_WORDS].tolist()
+            bids = levels[0, :words[_BID_COUNT]].tolist()
+            asks = levels[1, :words[_ASK_COUNT]].tolist()
+            if int(header[_SEQ]) == seq:
+                return seq, [tuple(level) for level in bids], [tuple(level) for level in asks], words
+            self.retries += 1
+        raise RuntimeError("Shared top-of-book kept changing during read; writer is too fast or stuck.")
+
+    def _read_state(self) -> Tuple[int, List[PriceLevel], List[PriceLevel], List[int]]:
+        seq, bids, asks, words = self.read()
+        self.last_update_id = words[_LAST_UPDATE_ID] if words[_LAST_UPDATE_ID] >= 0 else None
+        self.is_stale = bool(words[_IS_STALE])
+        self.resync_count = words[_RESYNC_COUNT]
+        return seq, bids, asks, words
+
+    def wait_for_update(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the writer publishes (see BinanceOrderBook.wait_for_update)."""
+        if self._update_event is None:
+            time.sleep(timeout or 0)
+            return int(self._header[_SEQ]) != self._published_seq
+        if self._update_event.wait(timeout):
+            self._update_event.clear()
+            return True
+        return False
+
+    def get_top_changes(self, limit: int = 10) -> TopChanges:
+        """Returns rows that changed since the previous call (see BinanceOrderBook.get_top_changes)."""
+        seq, bids, asks, words = self._read_state()
+        trackers = self._trackers.get(limit)
+        if trackers is None:
+            trackers = self._trackers[limit] = (TopNTracker(limit, descending=True), TopNTracker(limit, descending=False))
+        bid_tracker, ask_tracker = trackers
+        if seq == self._published_seq:
+            return TopChanges([], [], [], [])
+        bid_tracker.reset()
+        ask_tracker.reset()
+        changed_bids, removed_bids = bid_tracker.diff(_LadderSide(bids))
+        changed_asks, removed_asks = ask_tracker.diff(_LadderSide(asks))
+        self._published_seq = seq
+        first_event_time = words[_FIRST_EVENT_TIME] if words[_FIRST_EVENT_TIME] >= 0 else None
+        last_event_time = words[_LAST_EVENT_TIME] if words[_LAST_EVENT_TIME] >= 0 else None
+        return TopChanges(changed_bids, changed_asks, removed_bids, removed_asks, first_event_time, last_event_time)
+
+    def get_bids(self, limit: int = 10) -> List[PriceLevel]:
+        return self._read_state()[1][:limit]
+
+    def get_asks(self, limit: int = 10) -> List[PriceLevel]:
+        return self._read_state()[2][:limit]
+
+    def get_analytics(self) -> Optional[Dict[str, Any]]:
+        """Analytics live with the full book in the ingestion process and are not shared."""
+        return None
+
+    def get_bucket_changes(self) -> Dict[float, Tuple[List[Dict[str, Any]], List[str]]]:
+        """Price buckets, like analytics, need the full book and are not shared."""
+        return {}
+
+    def get_spread(self) -> Optional[Tuple[float, float]]:
+        _, bids, asks, _ = self._read_state()
+        if not bids or not asks:
+            return None
+        return bids[0][0], asks[0][0]
+
+    def close(self) -> None:
+        del self._header, self._levels
+        self._shm.close()
+
+
+def _run_ingestion(
+    shm_name: str,
+    symbols: List[str],
+    display_symbol: str,
+    manager_kwargs: Dict[str, Any],
+    ready_event: Any,
+    stop_event: Any,
+    update_event: Any
+) -> None:
+    """Child process entry point: maintains the books and publishes the display symbol's top-N."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(process)d [%(threadName)s] %(levelname)s: %(message)s")
+    # Ctrl+C reaches the whole process group; the parent decides when ingestion stops
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from src.manager import OrderBookManager
+
+    writer = SharedTopOfBookWriter(shm_name, update_event)
+    manager = OrderBookManager(symbols=symbols, **manager_kwargs)
+    try:
+        manager.start()
+        book = manager.get_book(display_symbol)
+        ready_event.set()
+        logging.info(f"Ingestion process publishing {display_symbol} top-{writer.capacity} to shared memory '{shm_name}'.")
+        published = None # (last_update_id, is_stale) of the last write
+        while not stop_event.is_set():
+            if not book.wait_for_update(0.5):
+                continue
+            changes = book.get_top_changes(writer.capacity)
+            bids, asks, last_update_id, is_stale = book.get_top_state(writer.capacity)
+            # A resync flips is_stale, and moves last_update_id, without touching the top-N
+            if changes.is_empty() and (last_update_id, is_stale) == published:
+                continue
+            writer.publish(bids, asks, last_update_id, changes.first_event_time, changes.last_event_time, is_stale, book.resync_count)
+            published = (last_update_id, is_stale)
+    except (ConnectionError, KeyError) as e:
+        logging.error(f"Ingestion process failed: {e}")
+    finally:
+        manager.stop()
+        writer.close()
+
+
+class OrderBookProcess:
+    """
+    Runs OrderBookManager (websocket parsing and book maintenance) in a child
+    process, publishing the display symbol's top-N ladder into shared memory.
+
+    The parent reads it through `reader`, a SharedTopOfBookReader, so the
+    Perspective process never contends with ingestion for the GIL and no
+    book data is pickled across the process boundary. The parent owns the
+    block; spawned children share its resource tracker, so attaching from
+    the child does not risk an early unlink.
+    """
+    _START_TIMEOUT_SECONDS = 60.0
+
+    def __init__(
+        self,
+        symbols: List[str],
+        display_symbol: str,
+        levels: int = 10,
+        **manager_kwargs: Any
+    ):
+        """
+        Args:
+            symbols (List[str]): Symbols the child's OrderBookManager tracks.
+            display_symbol (str): Symbol whose ladder is shared.
+            levels (int): Levels per side held in shared memory.
+            **manager_kwargs: Passed to OrderBookManager in the child (snapshot_limit,
+                max_concurrent_snapshots, base_wss_url, base_api_url, ...).
+        """
+        if levels < 1:
+            raise ValueError("levels must be at least 1.")
+        self.symbols = [s.upper() for s in symbols]
+        self.display_symbol = display_symbol.upper()
+        self.levels = levels
+        self._manager_kwargs = manager_kwargs
+        # spawn: the parent already runs threads (Tornado, websocket), which fork does not copy safely
+        self._ctx = mp.get_context("spawn")
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._process = None
+        self._stop_event = self._ctx.Event()
+        self._update_event = self._ctx.Event()
+        self.reader: Optional[SharedTopOfBookReader] = None
+
+    def start(self) -> None:
+        """Creates the shared block, spawns the ingestion process and waits for its first sync."""
+        self._shm = shared_memory.SharedMemory(create=True, size=_block_size(self.levels))
+        header = np.ndarray((_HEADER_WORDS,), dtype=np.int64, buffer=self._shm.buf)
+        header[:] = 0
+        header[_CAPACITY] = self.levels
+        header[_LAST_UPDATE_ID] = header[_FIRST_EVENT_TIME] = header[_LAST_EVENT_TIME] = -1
+        header[_IS_STALE] = 1
+        del header
+
+        ready_event = self._ctx.Event()
+        self._stop_event.clear()
+        self._process = self._ctx.Process(
+            target=_run_ingestion,
+            args=(self._shm.name, self.symbols, self.display_symbol, self._manager_kwargs,
+                  ready_event, self._stop_event, self._update_event),
+            name="OrderBookIngestion",
+            daemon=True
+        )
+        self._process.start()
+
+        deadline = time.monotonic() + self._START_TIMEOUT_SECONDS
+        while not ready_event.wait(0.5):
+            if not self._process.is_alive() or time.monotonic() > deadline:
+                self.stop()
+                raise ConnectionError("Order book ingestion process failed to start.")
+        self.reader = SharedTopOfBookReader(self._shm.name, self.display_symbol, self._update_event)
+        logging.info(f"Order book ingestion process {self._process.pid} started.")
+
+    def stop(self) -> None:
+        """Stops the ingestion process and releases the shared block."""
+        self._stop_event.set()
+        if self._process is not None:
+            self._process.join(timeout=10)
+            if self._process.is_alive():
+                logging.warning("Ingestion process did not exit; terminating.")
+                self._process.terminate()
+                self._process.join(timeout=5)
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        logging.info("Order book ingestion process stopped.")
@@ -0,0 +1,221 @@
+import logging
+import ssl
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from websocket import WebSocketApp
+from src.candles import CandleAggregator
+from src.decoder import RawMessage, get_decoder
+
+TRADE_STREAMS = ("trade", "aggTrade")
+
+
+class Trade(NamedTuple):
+    """A decoded `trade` or `aggTrade` event."""
+    symbol: str
+    event_time: int # E (ms)
+    trade_time: int # T (ms)
+    trade_id: int   # t for trades, a for aggregate trades
+    price: float
+    quantity: float
+    buyer_is_maker: bool
+
+
+def decode_trade(msg_data: Any) -> Optional[Trade]:
+    """
+    Builds a Trade from a parsed `trade`/`aggTrade` payload, with or without
+    the combined-stream envelope. Returns None for other events.
+    """
+    if isinstance(msg_data, dict) and 'data' in msg_data:
+        msg_data = msg_data['data']
+    if not isinstance(msg_data, dict):
+        raise ValueError("Trade message is not a JSON object")
+    event_type = msg_data.get('e')
+    if event_type not in TRADE_STREAMS:
+        return None
+    try:
+        return Trade(
+            symbol=msg_data['s'],
+            event_time=int(msg_data.get('E', 0)),
+            trade_time=int(msg_data['T']),
+            trade_id=int(msg_data['t'] if event_type == 'trade' else msg_data['a']),
+            price=float(msg_data['p']),
+            quantity=float(msg_data['q']),
+            buyer_is_maker=bool(msg_data.get('m', False)),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed {event_type}: {e!r}") from e
+
+
+class TradeStream:
+    """
+    Consumes Binance `@trade` or `@aggTrade` events for many symbols over one
+    combined-stream WebSocket and folds every trade into per-symbol
+    CandleAggregators (e.g. 1s/1m/5m OHLCV + VWAP).
+
+    Candles are maintained incrementally as trades arrive; a publisher waits
+    on wait_for_update() and pulls only the candles that closed or changed
+    via get_candle_changes(). The connection is re-opened after drops; trades
+    missed meanwhile are simply absent from the candles.
+    """
+    _BASE_WSS_URL = "wss://stream.binance.com:9443/stream"
+    _RECONNECT_DELAY_SECONDS = 1.0
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        stream: str = "aggTrade",
+        intervals: Iterable[int] = (1, 60, 300),
+        capacity: int = 1000,
+        decoder: str = "auto",
+        base_wss_url: Optional[str] = None
+    ):
+        """
+        Args:
+            symbols (Iterable[str]): Trading symbols (e.g., ["BTCUSDT", "ETHUSDT"]).
+            stream (str): "aggTrade" (default) or "trade".
+            intervals (Iterable[int]): Candle lengths in seconds.
+            capacity (int): Closed candles kept per symbol and interval.
+            decoder (str): JSON backend, as for get_decoder().
+            base_wss_url (str, optional): Overrides the combined-stream endpoint
+                (_BASE_WSS_URL), e.g. "ws://127.0.0.1:9443/stream" for the fake exchange.
+        """
+        if stream not in TRADE_STREAMS:
+            raise ValueError(f"Trade stream must be one of: {', '.join(TRADE_STREAMS)}.")
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        if not symbols:
+            raise ValueError("At least one symbol is required.")
+
+        self.stream = stream
+        self.aggregators: Dict[str, CandleAggregator] = {
+            symbol: CandleAggregator(symbol, intervals, capacity) for symbol in symbols
+        }
+        streams = "/".join(f"{symbol.lower()}@{stream}" for symbol in symbols)
+        self.base_wss_url = (base_wss_url or self._BASE_WSS_URL).rstrip("/")
+        self._stream_url = f"{self.base_wss_url}?streams={streams}"
+        self._decoder = get_decoder(decoder)
+
+        self._lock = threading.Lock()
+        self._updated = threading.Event()
+        self._stop_event = threading.Event()
+        self._ws: Optional[WebSocketApp] = None
+        self._ws_thread: Optional[threading.Thread] = None
+
+        # Counters
+        self.trades = 0
+        self.last_trade_id: Dict[str, int] = {}
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.aggregators)
+
+    def feed(self, message: RawMessage) -> None:
+        """Decodes a raw trade frame and folds it into its symbol's candles."""
+        try:
+            trade = decode_trade(self._decoder.loads(message))
+        except ValueError as e:
+            logging.error(f"Error decoding trade message: {e} - Data: {message[:100]}...")
+            return
+        if trade is None:
+            return
+        self.add_trade(trade)
+
+    def add_trade(self, trade: Trade) -> None:
+        aggregator = self.aggregators.get(trade.symbol)
+        if aggregator is None:
+            return
+        with self._lock:
+            aggregator.add(trade.trade_time, trade.price, trade.quantity)
+            self.trades += 1
+            self.last_trade_id[trade.symbol] = trade.trade_id
+        self._updated.set()
+
+    def wait_for_update(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until a trade arrives (or `timeout` passes); returns whether one did."""
+        if not self._updated.wait(timeout):
+            return False
+        self._updated.clear()
+        return True
+
+    def get_candle_changes(self, now: Optional[int] = None) -> Tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        """
+        Returns candles that closed and live candles that changed since the
+        previous call, across every symbol.
+
+        Args:
+            now (int, optional): Wall clock (ms) used to close candles that have
+                ended without a newer trade; defaults to the current time.
+
+        Returns:
+            tuple: ({interval label: closed candle rows}, live candle rows).
+        """
+        now = now if now is not None else int(time.time() * 1000)
+        closed: Dict[str, List[Dict[str, Any]]] = {}
+        live: List[Dict[str, Any]] = []
+        with self._lock:
+            for aggregator in self.aggregators.values():
+                symbol_closed, symbol_live = aggregator.changes(now)
+                for label, rows in symbol_closed.items():
+                    closed.setdefault(label, []).extend(rows)
+                live.extend(symbol_live)
+        return closed, live
+
+    def get_history(self, symbol: str, label: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns the retained closed candles of one symbol and interval, oldest first."""
+        with self._lock:
+            for series in self.aggregators[symbol.upper()].series:
+                if series.label == label:
+                    return series.history(limit)
+        raise KeyError(f"No {label} candles for {symbol}.")
+
+    def _on_message(self, ws: WebSocketApp, message: Union[str, bytes]) -> None:
+        if not self._stop_event.is_set():
+            self.feed(message)
+
+    def _on_open(self, ws: WebSocketApp) -> None:
+        logging.info(f"Trade stream connection opened for {len(self.aggregators)} symbols ({self.stream}).")
+
+    def _on_close(self, ws: WebSocketApp, close_status_code: Optional[int], close_msg: Optional[str]) -> None:
+        if not self._stop_event.is_set():
+            logging.warning(f"Trade stream closed: Status={close_status_code}, Msg={close_msg}")
+        else:
+            logging.info("Trade stream connection closed normally.")
+
+    def _on_error(self, ws: WebSocketApp, error: Exception) -> None:
+        logging.error(f"Trade stream error: {error}")
+
+    def _run_websocket(self) -> None:
+        """Runs the combined-stream WebSocketApp, reconnecting until stopped."""
+        while not self._stop_event.is_set():
+            logging.info(f"Connecting to trade stream: {self._stream_url[:200]}")
+            self._ws = WebSocketApp(
+                self._stream_url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            self._ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
+            if self._stop_event.wait(self._RECONNECT_DELAY_SECONDS):
+                break
+        logging.info("Trade stream run_forever loop exited.")
+
+    def start(self) -> None:
+        """Opens the trade stream in a background thread."""
+        if self._ws_thread and self._ws_thread.is_alive():
+            logging.warning("Trade stream already running.")
+            return
+        self._stop_event.clear()
+        self._ws_thread = threading.Thread(target=self._run_websocket, name="TradeStreamThread", daemon=True)
+        self._ws_thread.start()
+
+    def stop(self) -> None:
+        """Closes the trade stream and waits for its thread."""
+        self._stop_event.set()
+        if self._ws:
+            self._ws.close()
+        if self._ws_thread and self._ws_thread.is_alive():
+            self._ws_thread.join(timeout=5)
+            if self._ws_thread.is_alive():
+                logging.warning("Trade stream thread did not join cleanly.")
+        logging.info("Trade stream stopped.")
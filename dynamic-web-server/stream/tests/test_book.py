@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.book import SortedDictSide, TickArraySide
+
+
+def _sides(descending: bool, max_span_ticks: int):
+    return TickArraySide(descending, 0.01, max_span_ticks=max_span_ticks), SortedDictSide(descending, 0.01)
+
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_trim_keeps_overflow_levels_within_limits(descending):
+    array_side, reference = _sides(descending, max_span_ticks=50)
+    # A window around 1000.00 and two levels far enough behind it to live in the overflow
+    sign = -1 if descending else 1
+    prices = [1000.0 + sign * i * 0.01 for i in range(5)] + [1000.0 + sign * 100.0, 1000.0 + sign * 200.0]
+    for side in (array_side, reference):
+        for price in prices:
+            side.set(price, 1.0)
+    assert array_side._far
+
+    assert sorted(array_side.trim(max_levels=6)) == sorted(reference.trim(max_levels=6))
+    assert list(array_side.items()) == list(reference.items())
+    assert len(array_side) == 6
+    worst = 1000.0 + sign * 50.005 # Off the tick grid, as distance-from-mid windows are
+    assert array_side.trim(worst_price=worst) == reference.trim(worst_price=worst) == [(1000.0 + sign * 100.0, 1.0)]
+    assert list(array_side.items()) == list(reference.items())
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_trim_matches_sorteddict(seed):
+    rng = random.Random(seed)
+    descending = seed % 2 == 0
+    array_side, reference = _sides(descending, max_span_ticks=rng.choice([50, 500, 5000]))
+    mid = 6_000_000
+    for step in range(400):
+        op = rng.random()
+        if op < 0.02:
+            ticks = np.array(sorted({rng.randint(mid - 3000, mid + 3000) for _ in range(rng.randint(1, 40))} | {100}), dtype=np.int64)
+            amounts = np.array([rng.uniform(0.1, 5) for _ in ticks])
+            array_side.load(ticks / 100.0, amounts)
+            reference.load(ticks / 100.0, amounts)
+        elif op < 0.08:
+            max_levels = rng.choice([None, 3, 10, 50, 500])
+            worst_price = rng.choice([None, mid / 100 + rng.uniform(-30, 30), rng.uniform(0, 2e5)])
+            assert sorted(array_side.trim(max_levels, worst_price)) == sorted(reference.trim(max_levels, worst_price))
+        else:
+            if rng.random() < 0.05:
+                tick = rng.choice([1, 100, rng.randint(0, 12_000_000)])
+            else:
+                mid += rng.randint(-3, 3) if rng.random() < 0.9 else rng.randint(-300, 300)
+                tick = mid + rng.randint(-2000, 2000)
+            amount = 0.0 if rng.random() < 0.35 else round(rng.uniform(0.1, 5), 3)
+            assert array_side.set(tick / 100, amount) == reference.set(tick / 100, amount)
+        assert len(array_side) == len(reference)
+        assert array_side.top(20) == reference.top(20)
+    assert list(array_side.items()) == list(reference.items())
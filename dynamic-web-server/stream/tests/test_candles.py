@@ -0,0 +1,26 @@
+from src.candles import CandleSeries
+
+
+def test_trade_after_roll_counts_as_late():
+    series = CandleSeries("BTCUSDT", 1)
+    series.add(1_000, 100.0, 1.0)
+    series.roll(2_050) # Clock closes the 1s candle before its last trade arrives
+    series.add(1_900, 101.0, 1.0)
+    series.add(2_100, 102.0, 1.0)
+    series.roll(3_050)
+
+    open_times = [row["open_time"] for row in series.history()]
+    assert open_times == [1_000, 2_000]
+    assert series.late_trades == 1
+    assert series.history()[0]["trades"] == 1
+
+
+def test_trade_older_than_live_candle_counts_as_late():
+    series = CandleSeries("BTCUSDT", 1)
+    series.add(1_000, 100.0, 1.0)
+    series.add(5_000, 101.0, 1.0)
+    series.add(3_000, 102.0, 1.0) # Gap candle never existed, but the 5s one is live
+    series.roll(6_000)
+
+    assert [row["open_time"] for row in series.history()] == [1_000, 5_000]
+    assert series.late_trades == 1
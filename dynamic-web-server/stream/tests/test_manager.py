@@ -0,0 +1,42 @@
+import socket
+import time
+
+from src.fake_exchange import FakeExchange
+from src.manager import OrderBookManager
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(condition, timeout: float = 15.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_manager_reconnects_and_resyncs_after_disconnect():
+    exchange = FakeExchange(symbols=("BTCUSDT", "ETHUSDT"), port=_free_port(), updates_per_second=20, depth=200, disconnect_interval=2)
+    exchange.start()
+    manager = OrderBookManager(
+        ["BTCUSDT", "ETHUSDT"],
+        snapshot_limit=100,
+        base_wss_url=f"{exchange.wss_url}/stream",
+        base_api_url=exchange.api_url
+    )
+    try:
+        manager.start()
+        books = manager.books.values()
+        # Every book must resync after a drop and come back live on the new connection
+        assert _wait_for(lambda: exchange.disconnects >= 1 and all(book.resync_count >= 1 for book in books))
+        resynced_at = {book.symbol: book.last_update_id for book in books}
+        assert _wait_for(lambda: all(not book.is_stale and book.last_update_id > resynced_at[book.symbol] for book in books))
+        assert manager.get_bids("BTCUSDT", 1) and manager.get_asks("ETHUSDT", 1)
+    finally:
+        manager.stop()
+        exchange.stop()
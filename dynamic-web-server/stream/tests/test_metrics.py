@@ -0,0 +1,29 @@
+from src.book import TopChanges
+from src.metrics import LatencyMetrics
+from src.publisher import PublishStats
+
+
+def test_publish_latency_is_recorded_once_per_stage():
+    metrics = LatencyMetrics()
+    stats = PublishStats(metrics)
+    changes = TopChanges([], [], [], [], 1_000, 1_050, 1.06)
+    stats.record(changes, rows=4, removed=1, published_at=1.1)
+    metrics.record_publish("BTCUSDT", changes.last_event_time, changes.last_applied_at, 1.07, 1.08, 1.1, changes.first_event_time)
+
+    snapshot = metrics.snapshot()
+    assert list(snapshot) == ["coalesce", "loop_queue", "table_update", "end_to_end", "oldest_end_to_end"]
+    assert all(snapshot[stage]["BTCUSDT"]["count"] == 1 for stage in snapshot)
+    assert abs(snapshot["oldest_end_to_end"]["BTCUSDT"]["max_ms"] - 100.0) < 1e-6
+
+    summary = stats.summary()
+    assert (summary["publishes"], summary["rows"], summary["removed_rows"]) == (1, 4, 1)
+    # PublishStats reports the histograms of the LatencyMetrics it was given, not copies of its own
+    assert summary["latency"] == {stage: snapshot[stage] for stage in ("end_to_end", "oldest_end_to_end")}
+
+
+def test_publish_stats_without_metrics_only_counts():
+    stats = PublishStats()
+    stats.record(TopChanges([], [], [], [], 1_000, 1_000, None), rows=2, removed=0)
+    summary = stats.summary()
+    assert summary["publishes"] == 1
+    assert summary["latency"] == {}
@@ -0,0 +1,50 @@
+from src.binance import BinanceOrderBook
+from src.decoder import DepthUpdate
+
+
+def _update(first: int, final: int, bids=(), asks=()) -> DepthUpdate:
+    return DepthUpdate(
+        event_type="depthUpdate",
+        event_time=first,
+        symbol="BTCUSDT",
+        first_update_id=first,
+        final_update_id=final,
+        bids=list(bids),
+        asks=list(asks)
+    )
+
+
+def _snapshot(last_update_id: int, bid_amount: float) -> dict:
+    return {"lastUpdateId": last_update_id, "bids": [["100.00", str(bid_amount)]], "asks": [["101.00", "1.0"]]}
+
+
+def test_gap_resyncs_from_a_snapshot_that_bridges_the_buffer():
+    book = BinanceOrderBook("BTCUSDT", auto_resync=False)
+    assert book.load_snapshot(_snapshot(100, 1.0))
+    book.handle_update(_update(101, 101, bids=[(100.0, 2.0)]))
+    assert book.get_bids(1) == [(100.0, 2.0)]
+    assert not book.is_stale
+
+    # 102-104 never arrive: the book goes stale and buffers from here on
+    book.handle_update(_update(105, 106, bids=[(99.0, 1.0)]))
+    book.handle_update(_update(107, 108, asks=[(101.0, 3.0)]))
+    assert book.is_stale
+    assert book.last_update_id == 101
+
+    # A snapshot older than the buffer can't bridge it and must leave the book alone
+    assert not book.load_snapshot(_snapshot(103, 5.0))
+    assert book.get_bids(1) == [(100.0, 2.0)]
+    assert book.last_update_id == 101
+    assert book.is_stale
+
+    assert book.load_snapshot(_snapshot(106, 5.0))
+    assert not book.is_stale
+    assert book.last_update_id == 108
+    assert book.get_bids(2) == [(100.0, 5.0)]
+    assert book.get_asks(1) == [(101.0, 3.0)]
+    assert book.resync_count == 1
+
+    # Back to real-time processing
+    book.handle_update(_update(109, 109, bids=[(100.5, 1.0)]))
+    assert book.get_bids(1) == [(100.5, 1.0)]
+    assert book.last_update_id == 109
@@ -0,0 +1,41 @@
+from src.binance import BinanceOrderBook
+from src.book_store import BookStore
+from src.decoder import DepthUpdate
+
+
+def _update(first: int, final: int, bids=()) -> DepthUpdate:
+    return DepthUpdate(
+        event_type="depthUpdate",
+        event_time=first,
+        symbol="BTCUSDT",
+        first_update_id=first,
+        final_update_id=final,
+        bids=list(bids)
+    )
+
+
+def _saved_store(tmp_path) -> BookStore:
+    store = BookStore(str(tmp_path))
+    store.save("BTCUSDT", [(100.0, 1.0), (99.0, 2.0)], [(101.0, 1.0)], 100)
+    return store
+
+
+def test_warm_start_resumes_when_the_buffer_follows_on(tmp_path):
+    book = BinanceOrderBook("BTCUSDT", store=_saved_store(tmp_path), auto_resync=False)
+    book.handle_update(_update(101, 102, bids=[(100.0, 3.0)]))
+
+    assert book._warm_start()
+    assert book.warm_starts == 1
+    assert not book.is_stale
+    assert book.last_update_id == 102
+    assert book.get_bids(2) == [(100.0, 3.0), (99.0, 2.0)]
+
+
+def test_warm_start_leaves_the_book_alone_when_the_stream_moved_on(tmp_path):
+    book = BinanceOrderBook("BTCUSDT", store=_saved_store(tmp_path), auto_resync=False)
+    book.handle_update(_update(105, 106, bids=[(100.0, 3.0)]))
+
+    assert not book._warm_start()
+    assert book.warm_starts == 0
+    assert book.last_update_id is None
+    assert book.get_bids(2) == []